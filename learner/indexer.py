@@ -2,15 +2,60 @@
 # Licensed under the MIT License.
 
 from . import xml_loader
-from .utils import load_json_file, save_json_file, print_with_color
+from .utils import load_json_file, save_json_file, print_with_color, get_document_hash
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+from ufo.rag.bm25 import BM25Index
+from ufo.rag.index_factory import IndexFactory
+import itertools
 import os
+import shutil
+import uuid
 
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
 
+# The manifest maps each indexed file to its content hash and its id in the docstore.
+MANIFEST_FILE = "manifest.json"
+CHECKPOINT_SUFFIX = ".checkpoint"
 
-def create_indexer(app: str, docs: str, format: str, incremental: bool, save_path: str):
+
+def load_manifest(db_path: str):
+    """
+    Load the manifest of an indexer.
+    :param db_path: The path of the indexer.
+    :return: The manifest, {file: {"hash": content hash, "id": docstore id}}.
+    """
+
+    manifest_path = os.path.join(db_path, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        return load_json_file(manifest_path)
+    return {}
+
+
+def save_indexer(db, manifest: dict, db_path: str):
+    """
+    Save an indexer together with its manifest.
+    :param db: The indexer to save.
+    :param manifest: The manifest of the indexer.
+    :param db_path: The path to save the indexer to.
+    """
+
+    IndexFactory.save_local(db, db_path)
+    save_json_file(os.path.join(db_path, MANIFEST_FILE), manifest)
+
+
+def create_indexer(
+    app: str,
+    docs: str,
+    format: str,
+    incremental: bool,
+    save_path: str,
+    num_workers: int = 1,
+    batch_size: int = 64,
+    checkpoint_interval: int = 10,
+    index_type: str = "auto",
+    train_sample_size: int = 50000,
+    storage: str = "float16",
+):
     """
     Create an indexer for the given application.
     :param app: The name of the application to create an indexer for.
@@ -18,6 +63,12 @@ def create_indexer(app: str, docs: str, format: str, incremental: bool, save_pat
     :param format: The format of the help documents.
     :param incremental: Whether to enable incremental updates.
     :param save_path: The path to save the indexer to.
+    :param num_workers: The number of worker processes used to parse the documents.
+    :param batch_size: The number of documents embedded per batch.
+    :param checkpoint_interval: The number of batches between two checkpoints.
+    :param index_type: The FAISS index type, "flat", "hnsw", "ivf_flat", "ivf_pq" or "auto" to select by the corpus size.
+    :param train_sample_size: The maximum number of documents used to train the index.
+    :param storage: The vector storage, "float32", "float16" or "int8".
     :return: The created indexer.
     """
 
@@ -26,36 +77,132 @@ def create_indexer(app: str, docs: str, format: str, incremental: bool, save_pat
     else:
         records = {}
 
+    if format == "xml":
+        embeddings = HuggingFaceEmbeddings(
+            model_name="sentence-transformers/all-mpnet-base-v2",
+            encode_kwargs={"batch_size": batch_size},
+        )
+    else:
+        raise ValueError("Invalid format: " + format)
+
+    db_file_path = os.path.join(save_path, app)
+    db_file_path = os.path.abspath(db_file_path)
+    checkpoint_path = db_file_path + CHECKPOINT_SUFFIX
+
     print_with_color("Loading documents from {docs}...".format(docs=docs), "cyan")
 
     loader = xml_loader.XMLLoader(docs)
-    documents = loader.construct_document()
+    file_hashes = {file: get_document_hash(file) for file in loader.load_file_name()}
+
+    db = None
+    manifest = {}
+
+    if os.path.exists(checkpoint_path):
+        print_with_color(
+            "Resuming from the checkpoint in {path}...".format(path=checkpoint_path),
+            "yellow",
+        )
+        db = IndexFactory.load_local(checkpoint_path, embeddings)
+        manifest = load_manifest(checkpoint_path)
+    elif incremental and app in records:
+        print_with_color("Updating the previous indexer...", "yellow")
+        db = IndexFactory.load_local(records[app], embeddings)
+        manifest = load_manifest(records[app])
+
+    # Remove the documents that are deleted or changed since they were indexed.
+    stale_files = [
+        file
+        for file, entry in manifest.items()
+        if file_hashes.get(file) != entry["hash"]
+    ]
+    if db is not None and stale_files:
+        IndexFactory.delete_documents(
+            db, [manifest[file]["id"] for file in stale_files], train_sample_size
+        )
+    for file in stale_files:
+        manifest.pop(file)
+
+    pending_files = [file for file in file_hashes if file not in manifest]
 
     print_with_color(
-        "Creating indexer for {num} documents for {app}...".format(
-            num=len(documents), app=app
+        "Creating indexer for {num} documents for {app}, {skipped} unchanged documents skipped...".format(
+            num=len(pending_files),
+            app=app,
+            skipped=len(file_hashes) - len(pending_files),
         ),
         "yellow",
     )
 
-    if format == "xml":
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-mpnet-base-v2"
+    documents = loader.iter_documents(pending_files, num_workers)
+    pending_iter = iter(pending_files)
+
+    # A trainable index is created from a first batch large enough to train it.
+    first_batch_size = batch_size
+    if db is None and IndexFactory.needs_training(
+        IndexFactory.resolve_index_type(index_type, len(pending_files))
+    ):
+        first_batch_size = max(batch_size, min(train_sample_size, len(pending_files)))
+
+    indexed = 0
+
+    for batch_index in itertools.count(1):
+        batch_files = list(
+            itertools.islice(
+                pending_iter, first_batch_size if db is None else batch_size
+            )
+        )
+        if not batch_files:
+            break
+
+        batch_documents = list(itertools.islice(documents, len(batch_files)))
+        batch_ids = [uuid.uuid4().hex for _ in batch_files]
+
+        if db is None:
+            db = IndexFactory.from_documents(
+                batch_documents,
+                embeddings,
+                index_type,
+                train_sample_size,
+                num_vectors=len(pending_files),
+                ids=batch_ids,
+                storage=storage,
+                # The full text of the documents is loaded on demand from a side file.
+                side_fields=["text"],
+            )
+        else:
+            IndexFactory.add_documents(
+                db, batch_documents, index_type, train_sample_size, ids=batch_ids
+            )
+
+        for file, doc_id in zip(batch_files, batch_ids):
+            manifest[file] = {"hash": file_hashes[file], "id": doc_id}
+        indexed += len(batch_files)
+
+        print_with_color(
+            "Indexed {done}/{total} documents.".format(
+                done=indexed,
+                total=len(pending_files),
+            ),
+            "cyan",
         )
-    else:
-        raise ValueError("Invalid format: " + format)
 
-    db = FAISS.from_documents(documents, embeddings)
+        if batch_index % checkpoint_interval == 0:
+            save_indexer(db, manifest, checkpoint_path)
 
-    if incremental:
-        if app in records:
-            print_with_color("Merging with previous indexer...", "yellow")
-            prev_db = FAISS.load_local(records[app], embeddings)
-            db.merge_from(prev_db)
+    if db is None:
+        print_with_color("No documents found in {docs}.".format(docs=docs), "red")
+        return None
 
-    db_file_path = os.path.join(save_path, app)
-    db_file_path = os.path.abspath(db_file_path)
-    db.save_local(db_file_path)
+    save_indexer(db, manifest, db_file_path)
+
+    # The keyword index is rebuilt from the docstore for the hybrid retrieval.
+    print_with_color("Building the BM25 keyword index...", "cyan")
+    BM25Index.from_docstore(db.docstore, list(db.index_to_docstore_id.values())).save(
+        db_file_path
+    )
+
+    if os.path.exists(checkpoint_path):
+        shutil.rmtree(checkpoint_path)
 
     records[app] = db_file_path
 
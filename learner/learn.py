@@ -2,6 +2,7 @@
 # Licensed under the MIT License.
 
 import argparse
+import os
 from . import indexer
 
 
@@ -24,6 +25,42 @@ args.add_argument(
     type=str,
     default="./vectordb/docs/",
 )
+args.add_argument(
+    "--workers",
+    help="The number of processes to parse the help docs.",
+    type=int,
+    default=os.cpu_count() or 1,
+)
+args.add_argument(
+    "--batch_size",
+    help="The number of help docs embedded per batch.",
+    type=int,
+    default=64,
+)
+args.add_argument(
+    "--checkpoint_interval",
+    help="The number of batches between two resumable checkpoints.",
+    type=int,
+    default=10,
+)
+args.add_argument(
+    "--index_type",
+    help="The FAISS index type: flat, hnsw, ivf_flat, ivf_pq or auto to select by the number of docs.",
+    type=str,
+    default="auto",
+)
+args.add_argument(
+    "--storage",
+    help="The vector storage: float32, float16 or int8.",
+    type=str,
+    default="float16",
+)
+args.add_argument(
+    "--train_sample_size",
+    help="The max number of help docs used to train the ivf_flat and ivf_pq indexes.",
+    type=int,
+    default=50000,
+)
 
 
 parsed_args = args.parse_args()
@@ -40,6 +77,12 @@ def main():
         parsed_args.format,
         parsed_args.incremental,
         parsed_args.save_path,
+        parsed_args.workers,
+        parsed_args.batch_size,
+        parsed_args.checkpoint_interval,
+        parsed_args.index_type,
+        parsed_args.train_sample_size,
+        parsed_args.storage,
     )
 
 
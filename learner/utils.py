@@ -2,6 +2,7 @@
 # Licensed under the MIT License.
 import os
 import json
+import hashlib
 from colorama import Fore, Style, init
 
 # init colorama
@@ -93,3 +94,24 @@ def save_json_file(file_path, data):
     
     with open(file_path, 'w') as file:
         json.dump(data, file, indent=4)
+
+
+
+def get_document_hash(file_path, suffixes=(".meta",)):
+    """
+    Compute the content hash of a document together with its companion files.
+    :param file_path: The path to the document.
+    :param suffixes: The suffixes of the companion files (e.g. the metadata file) to include in the hash.
+    :return: The hex digest of the content hash.
+    """
+
+    sha256 = hashlib.sha256()
+
+    for path in [file_path] + [file_path + suffix for suffix in suffixes]:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(65536), b''):
+                sha256.update(block)
+
+    return sha256.hexdigest()
@@ -3,6 +3,9 @@
 
 from . import basic
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
 from langchain_community.document_loaders import UnstructuredXMLLoader
 from langchain.docstore.document import Document
 import xml.etree.ElementTree as ET
@@ -90,29 +93,59 @@ class XMLLoader(basic.BasicDocumentLoader):
     
 
 
-    def construct_document(self):
+    def construct_single_document(self, file: str) -> Document:
         """
-        Construct a langchain document list.
-        :return: The langchain document list.
+        Construct a langchain document for a single file.
+        :param file: The XML file to construct the document from.
+        :return: The langchain document.
         """
-        documents = []
-        for file in self.load_file_name():
-            text = self.get_microsoft_document_text(file)
-            metadata = self.get_microsoft_document_metadata(file + ".meta")
-            title = metadata["title"]
-            summary = metadata["summary"]
-            page_content = """{title} - {summary}""".format(title=title, summary=summary)
+        text = self.get_microsoft_document_text(file)
+        metadata = self.get_microsoft_document_metadata(file + ".meta")
+        title = metadata["title"]
+        summary = metadata["summary"]
+        page_content = """{title} - {summary}""".format(title=title, summary=summary)
 
-            metadata = {
-                'title': title,
-                'summary': summary,
-                'text':text
-            }
-            document = Document(page_content=page_content, metadata=metadata)
-            
-            documents.append(document)
-        return documents
-    
+        metadata = {
+            'title': title,
+            'summary': summary,
+            'text':text
+        }
+        return Document(page_content=page_content, metadata=metadata)
 
-    
-    
+
+    def iter_documents(self, files: Optional[List[str]] = None, num_workers: int = 1, prefetch: int = 4) -> Iterator[Document]:
+        """
+        Iterate over the langchain documents of the given files, in the same order as the files.
+        The files are parsed in a process pool when more than one worker is requested. Only a bounded number of files
+        are submitted ahead of the consumer, so that the documents stream into the batches instead of piling up.
+        :param files: The files to load. If None, all files in the directory are loaded.
+        :param num_workers: The number of worker processes used to parse the files.
+        :param prefetch: The number of files parsed ahead of the consumer per worker.
+        :return: The iterator of langchain documents.
+        """
+        if files is None:
+            files = self.load_file_name()
+
+        if num_workers <= 1 or len(files) <= 1:
+            for file in files:
+                yield self.construct_single_document(file)
+            return
+
+        max_pending = num_workers * max(1, prefetch)
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            pending = deque()
+            for file in files:
+                pending.append(executor.submit(self.construct_single_document, file))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+    def construct_document(self, num_workers: int = 1):
+        """
+        Construct a langchain document list.
+        :param num_workers: The number of worker processes used to parse the files.
+        :return: The langchain document list.
+        """
+        return list(self.iter_documents(num_workers=num_workers))
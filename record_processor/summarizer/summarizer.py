@@ -7,12 +7,13 @@ from typing import Tuple
 import yaml
 from langchain.docstore.document import Document
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 
 from record_processor.parser.demonstration_record import DemonstrationRecord
 from record_processor.utils import json_parser
+from ufo.config.config import Config
 from ufo.llm.llm_call import get_completions
 from ufo.prompter.demonstration_prompter import DemonstrationPrompter
+from ufo.rag.index_factory import IndexFactory
 
 
 class DemonstrationSummarizer:
@@ -186,13 +187,26 @@ class DemonstrationSummarizer:
         embeddings = HuggingFaceEmbeddings(
             model_name="sentence-transformers/all-mpnet-base-v2"
         )
-        db = FAISS.from_documents(document_list, embeddings)
+        configs = Config.get_instance().config_data
+        index_type = configs.get("RAG_INDEX_TYPE", "auto")
+        train_sample_size = configs.get("RAG_INDEX_TRAIN_SAMPLE_SIZE", 50000)
+        storage = configs.get("RAG_INDEX_STORAGE", "float16")
 
         # Check if the db exists, if not, create a new one.
         if os.path.exists(db_path):
-            prev_db = FAISS.load_local(db_path, embeddings)
-            db.merge_from(prev_db)
+            db = IndexFactory.load_local(db_path, embeddings)
+            IndexFactory.add_documents(db, document_list, index_type, train_sample_size)
+        else:
+            # The examples are loaded on demand from a side file.
+            db = IndexFactory.from_documents(
+                document_list,
+                embeddings,
+                index_type,
+                train_sample_size,
+                storage=storage,
+                side_fields=["example"],
+            )
 
-        db.save_local(db_path)
+        IndexFactory.save_local(db, db_path)
 
         print(f"Updated vector DB successfully: {db_path}")
@@ -0,0 +1,61 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import os
+import sys
+import zlib
+from typing import List
+
+import numpy as np
+import pytest
+import yaml
+from langchain_core.embeddings import Embeddings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(ROOT, "ufo", "config")
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from ufo.config.config import Config
+
+
+def load_test_config() -> dict:
+    """
+    Load the configuration of the tests: the template of config.yaml with the developer configuration.
+    :return: The configuration.
+    """
+    configs = dict(os.environ)
+    for name in ("config.yaml.template", "config_dev.yaml", "config_prices.yaml"):
+        with open(os.path.join(CONFIG_PATH, name), "r", encoding="utf-8") as file:
+            configs.update(yaml.safe_load(file) or {})
+
+    return Config.optimize_configs(configs)
+
+
+# The modules read the configuration when they are imported, so it is set before the tests are collected.
+if Config._instance is None:
+    Config._instance = Config.__new__(Config)
+    Config._instance.config_data = load_test_config()
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic embeddings of the texts by their hash, for the vector database tests without an embedding model.
+    """
+
+    def __init__(self, dimension: int = 16) -> None:
+        self.dimension = dimension
+
+    def embed_query(self, text: str) -> List[float]:
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        vector = rng.normal(size=self.dimension)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+@pytest.fixture
+def embeddings() -> HashEmbeddings:
+    return HashEmbeddings()
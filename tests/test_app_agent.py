@@ -0,0 +1,105 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import threading
+
+import pytest
+
+# The app agent automates the application, so its module imports pywinauto.
+pytest.importorskip("pywinauto")
+
+from ufo.agents.agent.app_agent import AppAgent
+
+
+@pytest.fixture
+def app_agent():
+    # Only the prompt prefetch of the agent is used, which does not need the prompter or the puppeteer.
+    app_agent = AppAgent.__new__(AppAgent)
+    app_agent._prompt_parts = {}
+    app_agent._prefetch_executor = None
+    yield app_agent
+    if app_agent._prefetch_executor is not None:
+        app_agent._prefetch_executor.shutdown(wait=True)
+
+
+class Builder:
+    """
+    A builder of the prompt parts counting its calls.
+    """
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.parts
+
+
+def test_prompt_parts_are_prepared_once_per_round(app_agent):
+    builder = Builder(("examples", "tips", "documents"))
+
+    app_agent.prefetch_prompt_parts((0, "request"), builder)
+    for _ in range(3):
+        parts = app_agent.get_prompt_parts((0, "request"), builder)
+
+    assert parts == ("examples", "tips", "documents")
+    assert builder.calls == 1
+
+
+def test_prompt_parts_are_discarded_when_the_request_changes(app_agent):
+    first, second = Builder("first"), Builder("second")
+
+    assert app_agent.get_prompt_parts((0, "first request"), first) == "first"
+    assert app_agent.get_prompt_parts((0, "second request"), second) == "second"
+    assert list(app_agent._prompt_parts) == [(0, "second request")]
+
+    # The parts of the first request are prepared again.
+    assert app_agent.get_prompt_parts((0, "first request"), first) == "first"
+    assert first.calls == 2
+
+
+def test_prompt_parts_are_not_shared_across_rounds(app_agent):
+    builder = Builder("parts")
+
+    app_agent.get_prompt_parts((0, "continue"), builder)
+    app_agent.get_prompt_parts((1, "continue"), builder)
+
+    assert builder.calls == 2
+    assert list(app_agent._prompt_parts) == [(1, "continue")]
+
+
+def test_pending_prompt_parts_of_an_earlier_round_are_cancelled(app_agent):
+    started, release = threading.Event(), threading.Event()
+
+    def blocking_builder():
+        started.set()
+        release.wait(5)
+        return "blocking"
+
+    running = app_agent.prefetch_prompt_parts((0, "first"), blocking_builder)
+    started.wait(5)
+    queued = app_agent.prefetch_prompt_parts((1, "second"), Builder("second"))
+    stale = app_agent.prefetch_prompt_parts((2, "third"), Builder("third"))
+    release.set()
+
+    assert running.result() == "blocking"
+    assert queued.cancelled()
+    assert stale.result() == "third"
+    assert list(app_agent._prompt_parts) == [(2, "third")]
+
+
+def test_failed_prompt_parts_are_prepared_again(app_agent):
+    calls = []
+
+    def failing_builder():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("retrieval failed")
+        return "parts"
+
+    with pytest.raises(RuntimeError):
+        app_agent.get_prompt_parts((0, "request"), failing_builder)
+
+    assert app_agent._prompt_parts == {}
+    assert app_agent.get_prompt_parts((0, "request"), failing_builder) == "parts"
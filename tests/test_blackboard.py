@@ -0,0 +1,202 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import pytest
+
+# The blackboard encodes the screenshots through the photographer, which imports pywinauto.
+pytest.importorskip("pywinauto")
+
+from ufo.agents.memory.blackboard import Blackboard, ImageMemoryItemNames
+from ufo.config.config import Config
+
+configs = Config.get_instance().config_data
+
+
+@pytest.fixture
+def blackboard(monkeypatch):
+    monkeypatch.setitem(configs, "USE_CUSTOMIZATION", False)
+    return Blackboard()
+
+
+def add_screenshots(blackboard, subtasks):
+    for i, subtask in enumerate(subtasks):
+        blackboard.add_image(f"missing_{i}.png", {"index": i, "subtask": subtask})
+
+
+def selected_indices(blackboard, query=""):
+    return [
+        screenshot[ImageMemoryItemNames.METADATA]["index"]
+        for screenshot in blackboard.select_screenshots(query)
+    ]
+
+
+SUBTASKS = [
+    "open the excel workbook",
+    "type the quarterly revenue",
+    "save the excel workbook",
+    "send the email to the team",
+    "close the browser window",
+]
+
+
+def test_select_screenshots_keeps_all_by_default(blackboard, monkeypatch):
+    monkeypatch.delitem(configs, "BLACKBOARD_MAX_IMAGES", raising=False)
+    add_screenshots(blackboard, SUBTASKS)
+
+    assert selected_indices(blackboard, "excel") == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("max_images", [5, 8])
+def test_select_screenshots_under_the_limit(blackboard, monkeypatch, max_images):
+    monkeypatch.setitem(configs, "BLACKBOARD_MAX_IMAGES", max_images)
+    add_screenshots(blackboard, SUBTASKS)
+
+    assert selected_indices(blackboard) == [0, 1, 2, 3, 4]
+
+
+def test_select_screenshots_recent(blackboard, monkeypatch):
+    monkeypatch.setitem(configs, "BLACKBOARD_MAX_IMAGES", 2)
+    monkeypatch.setitem(configs, "BLACKBOARD_IMAGE_SELECTION", "recent")
+    add_screenshots(blackboard, SUBTASKS)
+
+    assert selected_indices(blackboard, "excel workbook") == [3, 4]
+
+
+def test_select_screenshots_relevant(blackboard, monkeypatch):
+    monkeypatch.setitem(configs, "BLACKBOARD_MAX_IMAGES", 2)
+    monkeypatch.setitem(configs, "BLACKBOARD_IMAGE_SELECTION", "relevant")
+    add_screenshots(blackboard, SUBTASKS)
+
+    # The selected screenshots are returned in the order they were saved.
+    assert selected_indices(blackboard, "Save the Excel workbook") == [0, 2]
+
+
+def test_select_screenshots_relevant_ties_prefer_recent(blackboard, monkeypatch):
+    monkeypatch.setitem(configs, "BLACKBOARD_MAX_IMAGES", 2)
+    monkeypatch.setitem(configs, "BLACKBOARD_IMAGE_SELECTION", "relevant")
+    add_screenshots(blackboard, SUBTASKS)
+
+    assert selected_indices(blackboard, "unrelated request") == [3, 4]
+    # Without a query the most recent screenshots are selected.
+    assert selected_indices(blackboard) == [3, 4]
+
+
+def test_select_screenshots_zero(blackboard, monkeypatch):
+    monkeypatch.setitem(configs, "BLACKBOARD_MAX_IMAGES", 0)
+    add_screenshots(blackboard, SUBTASKS)
+
+    assert selected_indices(blackboard) == []
+
+    prompt = blackboard.screenshots_to_prompt()
+    assert prompt == [
+        {
+            "type": "text",
+            "text": "[5 other screenshots on the blackboard are omitted.]",
+        }
+    ]
+
+
+def add_trajectories(blackboard, count):
+    for _ in range(count):
+        step = blackboard.trajectories.length
+        blackboard.add_trajectories(
+            {"Step": f"{step:03d}", "Subtask": "click the button", "Action": "click"}
+        )
+
+
+def item_tokens(blackboard):
+    return Blackboard.estimate_tokens(blackboard.trajectories.content[0].to_json())
+
+
+def test_trajectories_without_budget(blackboard, monkeypatch):
+    monkeypatch.delitem(configs, "BLACKBOARD_TRAJECTORY_TOKEN_BUDGET", raising=False)
+    add_trajectories(blackboard, 50)
+
+    assert blackboard.trajectories_to_prompt("[Step Trajectories:]") == (
+        blackboard.texts_to_prompt(blackboard.trajectories, "[Step Trajectories:]")
+    )
+
+
+def test_trajectories_within_budget(blackboard, monkeypatch):
+    add_trajectories(blackboard, 1)
+    # The verbatim trajectories get three quarters of the budget.
+    monkeypatch.setitem(
+        configs, "BLACKBOARD_TRAJECTORY_TOKEN_BUDGET", 4 * item_tokens(blackboard)
+    )
+    add_trajectories(blackboard, 2)
+
+    prompt = blackboard.trajectories_to_prompt("[Step Trajectories:]")
+
+    assert len(prompt) == 1
+    assert blackboard._summary_end == 0
+
+
+def test_latest_trajectory_is_kept_verbatim(blackboard, monkeypatch):
+    monkeypatch.setitem(configs, "BLACKBOARD_TRAJECTORY_TOKEN_BUDGET", 1)
+    add_trajectories(blackboard, 3)
+
+    prompt = blackboard.trajectories_to_prompt("[Step Trajectories:]")
+
+    assert blackboard._summary_end == 2
+    assert prompt[1]["text"] == (
+        f"[Step Trajectories:]\n [{blackboard.trajectories.content[2].to_json()}]"
+    )
+
+
+def test_summary_refreshes_in_batches(blackboard, monkeypatch):
+    add_trajectories(blackboard, 4)
+    monkeypatch.setitem(
+        configs, "BLACKBOARD_TRAJECTORY_TOKEN_BUDGET", 4 * item_tokens(blackboard)
+    )
+    monkeypatch.setitem(configs, "BLACKBOARD_SUMMARY_REFRESH", 5)
+
+    # Three trajectories fit, the first one is rolled with a batch of up to five,
+    # but the latest trajectory stays verbatim.
+    prompt = blackboard.trajectories_to_prompt("[Step Trajectories:]")
+    summary = prompt[0]["text"]
+    assert blackboard._summary_end == 3
+    assert summary.startswith("[Earlier Step Trajectories Summary:]\n")
+    assert summary.split("\n")[-1].startswith("Step: 002;")
+
+    # The summary prefix is unchanged until the verbatim trajectories overflow again.
+    for _ in range(2):
+        add_trajectories(blackboard, 1)
+        assert blackboard.trajectories_to_prompt("[Step Trajectories:]")[0] == {
+            "type": "text",
+            "text": summary,
+        }
+        assert blackboard._summary_end == 3
+
+    add_trajectories(blackboard, 1)
+    prompt = blackboard.trajectories_to_prompt("[Step Trajectories:]")
+    assert blackboard._summary_end == 6
+    assert prompt[0]["text"].split("\n")[-1].startswith("Step: 005;")
+
+
+def test_summary_is_bounded(blackboard, monkeypatch):
+    add_trajectories(blackboard, 1)
+    budget = 4 * item_tokens(blackboard)
+    monkeypatch.setitem(configs, "BLACKBOARD_TRAJECTORY_TOKEN_BUDGET", budget)
+    monkeypatch.setitem(configs, "BLACKBOARD_SUMMARY_REFRESH", 1)
+    add_trajectories(blackboard, 99)
+
+    summary = blackboard.trajectories_to_prompt("[Step Trajectories:]")[0]["text"]
+    lines = summary.split("\n")[1:]
+
+    assert blackboard._summary_end == 97
+    assert lines[0].endswith("earlier steps omitted)")
+    assert lines[-1].startswith("Step: 096;")
+    assert sum(Blackboard.estimate_tokens(line) for line in lines[1:]) <= budget // 4
+
+
+def test_summary_is_reset_when_the_trajectories_are_cleared(blackboard, monkeypatch):
+    monkeypatch.setitem(configs, "BLACKBOARD_TRAJECTORY_TOKEN_BUDGET", 1)
+    add_trajectories(blackboard, 3)
+    blackboard.trajectories_to_prompt("[Step Trajectories:]")
+
+    blackboard.clear()
+    add_trajectories(blackboard, 1)
+    prompt = blackboard.trajectories_to_prompt("[Step Trajectories:]")
+
+    assert blackboard._summary_end == 0
+    assert len(prompt) == 1
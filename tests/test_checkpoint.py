@@ -0,0 +1,124 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+import os
+import shutil
+import uuid
+
+import pytest
+
+from conftest import ROOT
+
+# The sessions drive the desktop, so their modules import pywinauto.
+pytest.importorskip("pywinauto")
+
+
+@pytest.fixture
+def follower_session(tmp_path, monkeypatch):
+    from ufo.config.config import Config
+    from ufo.module.sessions.session import FollowerSession
+
+    configs = Config.get_instance().config_data
+    for key in ("USE_CUSTOMIZATION", "USE_APIS", "RAG_OFFLINE_DOCS"):
+        monkeypatch.setitem(configs, key, False)
+    for key in ("RAG_ONLINE_SEARCH", "RAG_EXPERIENCE", "RAG_DEMONSTRATION"):
+        monkeypatch.setitem(configs, key, False)
+
+    # The prompt templates and the log folder are relative to the repository root.
+    monkeypatch.chdir(ROOT)
+
+    plan_file = tmp_path / "plan.json"
+    plan_file.write_text(
+        json.dumps(
+            {
+                "task": "bold the title",
+                "object": "doc.docx",
+                "steps": ["select the title", "click bold", "save"],
+            }
+        ),
+        encoding="utf-8",
+    )
+
+    task = "pytest_checkpoint_{id}".format(id=uuid.uuid4().hex[:8])
+    logs_path = os.path.join(ROOT, "logs")
+    created_logs = not os.path.exists(logs_path)
+    session = FollowerSession(task, str(plan_file), False, id=0)
+
+    yield session
+
+    session.close_loggers()
+    shutil.rmtree(os.path.join(logs_path, task), ignore_errors=True)
+    if created_logs:
+        shutil.rmtree(logs_path, ignore_errors=True)
+
+
+def test_checkpoint_round_trip(follower_session):
+    from ufo.agents.memory.memory import MemoryItem
+    from ufo.agents.states.app_agent_state import ContinueAppAgentState
+    from ufo.agents.states.host_agent_state import (
+        ContinueHostAgentState,
+        FinishHostAgentState,
+    )
+    from ufo.module.basic import BaseRound
+    from ufo.module.context import ContextNames
+    from ufo.module.sessions.session import SessionFactory
+
+    session = follower_session
+    context = session.context
+    host_agent = session._host_agent
+
+    # Round 0: the HostAgent selected the application.
+    round_0 = BaseRound(
+        session.plan_reader.get_host_agent_request(), host_agent, context, False, 0
+    )
+    session.add_round(0, round_0)
+    round_0.state = FinishHostAgentState()
+    context.set(ContextNames.APPLICATION_PROCESS_NAME, "doc.docx - Word")
+    context.set(ContextNames.APPLICATION_ROOT_NAME, "WINWORD.EXE")
+    app_agent = ContinueHostAgentState().create_app_agent(host_agent, context)
+    item = MemoryItem()
+    item.set_values_from_dict({"Step": 0, "Response": "select word"})
+    host_agent.add_memory(item)
+    host_agent.step = 1
+
+    # Round 1: the AppAgent is in the middle of the first step of the plan.
+    round_1 = BaseRound(session.plan_reader.next_step(), app_agent, context, False, 1)
+    session.add_round(1, round_1)
+    app_agent.set_state(ContinueAppAgentState())
+    round_1.state = ContinueAppAgentState()
+    item = MemoryItem()
+    item.set_values_from_dict({"Step": 1, "Action": "click_input"})
+    app_agent.add_memory(item)
+    app_agent.step = 1
+
+    context.set(ContextNames.SESSION_STEP, 2)
+    context.set(ContextNames.SESSION_COST, 0.05)
+    context.current_round_step = 1
+    context.current_round_cost = 0.03
+    context.add_to_structural_logs(
+        {"Round": 1, "SubtaskIndex": 0, "Step": 2, "Action": "click_input"}
+    )
+    host_agent.blackboard.add_trajectories({"step": 1, "action": "click"})
+
+    session.save_checkpoint()
+    checkpoint_path = os.path.join(session.log_path, "checkpoint.json")
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        saved = json.load(f)
+
+    [resumed] = SessionFactory().resume_session(session.log_path)
+
+    assert resumed.step == 2
+    assert resumed.cost == pytest.approx(0.05)
+    assert resumed._resumed_round.id == 1
+    assert resumed._resumed_round.state.name() == ContinueAppAgentState().name()
+    assert resumed.context.get(ContextNames.CURRENT_ROUND_STEP) == 1
+    assert resumed.plan_reader.get_remaining_steps() == ["click bold", "save"]
+    assert resumed._host_agent.get_active_appagent().name == app_agent.name
+    assert resumed.context.filter_structural_logs(1, 0, "Action") == ["click_input"]
+
+    # A checkpoint of the resumed session is the same as the original one.
+    resumed.save_checkpoint()
+    resumed.close_loggers()
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        assert json.load(f) == saved
@@ -0,0 +1,124 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import threading
+import time
+
+import pytest
+
+# The sessions drive the desktop, so their modules import pywinauto.
+pytest.importorskip("pywinauto")
+
+from ufo.module import interactor
+from ufo.module.basic import BaseSession
+from ufo.module.client import UFOClientManager
+from ufo.module.sessions.session import Session
+
+
+class StubSession:
+    """
+    A session recording the threads and the times of its phases.
+    """
+
+    def __init__(self, name, ui_time=0.05, finalize_time=0.2, fail=False):
+        self.log_path = f"logs/batch/{name}/"
+        self.ui_time = ui_time
+        self.finalize_time = finalize_time
+        self.fail = fail
+        self.step = 3
+        self.cost = 0.25
+        self.events = {}
+
+    def run_ui(self):
+        self.events["ui_thread"] = threading.current_thread()
+        self.events["ui_start"] = time.monotonic()
+        time.sleep(self.ui_time)
+        self.events["ui_end"] = time.monotonic()
+
+    def finalize(self):
+        self.events["finalize_thread"] = threading.current_thread()
+        time.sleep(self.finalize_time)
+        self.events["finalize_end"] = time.monotonic()
+        if self.fail:
+            raise RuntimeError("finalize failed")
+
+    def is_error(self):
+        return False
+
+
+def test_run_pipelined_finalizes_in_the_background():
+    sessions = [StubSession(f"session_{i}") for i in range(3)]
+    manager = UFOClientManager(sessions, finalize_workers=2, queue_depth=4)
+
+    manager.run_all()
+
+    for session in sessions:
+        assert session.events["ui_thread"] is threading.main_thread()
+        assert session.events["finalize_thread"].name.startswith("session-finalize")
+    # The next session runs on the desktop while the earlier one is finalized.
+    assert sessions[1].events["ui_start"] < sessions[0].events["finalize_end"]
+    assert [record["session"] for record in manager.summary] == [
+        "session_0",
+        "session_1",
+        "session_2",
+    ]
+    assert all(record["status"] == "finished" for record in manager.summary)
+    assert all(record["cost"] == 0.25 for record in manager.summary)
+
+
+def test_run_pipelined_waits_for_the_queue():
+    sessions = [StubSession(f"session_{i}") for i in range(3)]
+    manager = UFOClientManager(sessions, finalize_workers=2, queue_depth=1)
+
+    manager.run_all()
+
+    for earlier, later in zip(sessions, sessions[1:]):
+        assert later.events["ui_start"] >= earlier.events["finalize_end"]
+
+
+def test_run_pipelined_reports_a_failed_finalization():
+    sessions = [
+        StubSession("session_0", fail=True),
+        StubSession("session_1"),
+    ]
+    manager = UFOClientManager(sessions, finalize_workers=2)
+
+    manager.run_all()
+
+    assert [record["status"] for record in manager.summary] == [
+        "finalize error",
+        "finished",
+    ]
+    assert "finalize_end" in sessions[1].events
+
+
+def test_session_asks_for_the_experience_on_the_main_thread(monkeypatch):
+    asked = []
+    saved = []
+
+    monkeypatch.setattr(BaseSession, "run_ui", lambda self: None)
+    monkeypatch.setattr(BaseSession, "finalize", lambda self: None)
+    monkeypatch.setattr(BaseSession, "is_error", lambda self: False)
+    monkeypatch.setattr(BaseSession, "step", 0)
+    monkeypatch.setattr(BaseSession, "cost", 0.0)
+    monkeypatch.setattr(
+        interactor,
+        "experience_asker",
+        lambda: asked.append(threading.current_thread()) or True,
+    )
+    monkeypatch.setattr(
+        BaseSession, "experience_saver", lambda self: saved.append(self)
+    )
+
+    sessions = []
+    for _ in range(2):
+        # The stub phases do not need the agents created by the constructor.
+        session = Session.__new__(Session)
+        session._save_experience = False
+        session.log_path = f"logs/batch/session_{len(sessions)}/"
+        sessions.append(session)
+
+    UFOClientManager(sessions, finalize_workers=2).run_all()
+
+    assert asked == [threading.main_thread()] * 2
+    assert saved == sessions
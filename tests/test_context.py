@@ -0,0 +1,109 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import random
+
+import pytest
+
+# The context names the type of the application window, which is a pywinauto wrapper.
+pytest.importorskip("pywinauto")
+
+from ufo.module.context import Context, ContextNames
+
+
+class LegacyContext(Context):
+    """
+    The context before the round values were synced on write: every get synced the current round values
+    from the values of all rounds.
+    """
+
+    def get(self, key):
+        current_round_id = self._context[ContextNames.CURRENT_ROUND_ID.name]
+        for name, round_name in self._ROUND_VALUES.items():
+            self._context[name] = self._context[round_name].get(current_round_id, 0)
+        return self._context.get(key.name)
+
+    def set(self, key, value):
+        if key.name not in self._context:
+            raise KeyError(f"Key '{key}' is not a valid context name.")
+        self._context[key.name] = value
+        if key.name in self._ROUND_VALUES:
+            current_round_id = self._context[ContextNames.CURRENT_ROUND_ID.name]
+            self._context[self._ROUND_VALUES[key.name]][current_round_id] = value
+
+    def update_dict(self, key, value):
+        self._context[key.name].update(value)
+
+
+ROUND_NAMES = [
+    ContextNames.CURRENT_ROUND_ID,
+    ContextNames.CURRENT_ROUND_STEP,
+    ContextNames.CURRENT_ROUND_COST,
+    ContextNames.CURRENT_ROUND_SUBTASK_AMOUNT,
+    ContextNames.ROUND_STEP,
+    ContextNames.ROUND_COST,
+    ContextNames.ROUND_SUBTASK_AMOUNT,
+]
+
+
+def test_set_round_values():
+    context = Context()
+
+    context.set(ContextNames.CURRENT_ROUND_STEP, 3)
+    context.set(ContextNames.CURRENT_ROUND_COST, 0.5)
+    assert context.get(ContextNames.ROUND_STEP) == {0: 3}
+    assert context.get(ContextNames.ROUND_COST) == {0: 0.5}
+
+    context.set(ContextNames.CURRENT_ROUND_ID, 1)
+    assert context.get(ContextNames.CURRENT_ROUND_STEP) == 0
+    assert context.get(ContextNames.CURRENT_ROUND_COST) == 0
+
+    context.update_dict(ContextNames.ROUND_STEP, {1: 4})
+    context.set(ContextNames.ROUND_COST, {0: 0.5, 1: 2.0})
+    assert context.get(ContextNames.CURRENT_ROUND_STEP) == 4
+    assert context.get(ContextNames.CURRENT_ROUND_COST) == 2.0
+
+    context.current_round_subtask_amount = 2
+    assert context.get(ContextNames.CURRENT_ROUND_SUBTASK_AMOUNT) == 2
+    assert context.get(ContextNames.ROUND_SUBTASK_AMOUNT) == {1: 2}
+
+    context.set(ContextNames.CURRENT_ROUND_ID, 0)
+    assert context.get(ContextNames.CURRENT_ROUND_STEP) == 3
+    assert context.current_round_step == 3
+    assert context.get(ContextNames.CURRENT_ROUND_SUBTASK_AMOUNT) == 0
+
+
+def test_set_matches_the_legacy_context():
+    rng = random.Random(0)
+    context, legacy = Context(), LegacyContext()
+
+    for _ in range(2000):
+        operation = rng.randrange(4)
+        if operation == 0:
+            key, value = ContextNames.CURRENT_ROUND_ID, rng.randrange(4)
+            arguments = ("set", key, value)
+        elif operation == 1:
+            key = rng.choice(ROUND_NAMES[1:4])
+            arguments = ("set", key, rng.randrange(100))
+        elif operation == 2:
+            key = rng.choice(ROUND_NAMES[4:])
+            arguments = ("update_dict", key, {rng.randrange(4): rng.randrange(100)})
+        else:
+            key = rng.choice(ROUND_NAMES[4:])
+            arguments = ("set", key, {i: rng.randrange(100) for i in range(4)})
+
+        method, key, value = arguments
+        # Each context gets its own copy of a dictionary value.
+        getattr(context, method)(key, dict(value) if isinstance(value, dict) else value)
+        getattr(legacy, method)(key, dict(value) if isinstance(value, dict) else value)
+
+        for name in ROUND_NAMES:
+            assert context.get(name) == legacy.get(name), (arguments, name)
+
+
+def test_set_invalid_key():
+    context = Context()
+    del context._context[ContextNames.REQUEST.name]
+
+    with pytest.raises(KeyError):
+        context.set(ContextNames.REQUEST, "request")
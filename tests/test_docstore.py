@@ -0,0 +1,102 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import os
+import pickle
+
+import pytest
+from langchain.docstore.document import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+from ufo.rag import migrate
+from ufo.rag.docstore import SIDE_FILE, SideFileDocstore
+from ufo.rag.index_factory import IndexFactory
+
+
+def make_documents(num):
+    return [
+        Document(
+            page_content="title {i}".format(i=i),
+            metadata={"title": "title {i}".format(i=i), "text": "text " * (i + 1)},
+        )
+        for i in range(num)
+    ]
+
+
+def test_side_file_round_trip(tmp_path):
+    docstore = SideFileDocstore(
+        ["text"], {str(i): document for i, document in enumerate(make_documents(3))}
+    )
+
+    docstore.save(str(tmp_path))
+
+    # The fields are dropped from the documents in memory, and read from the side file on demand.
+    assert "text" not in docstore._dict["1"].metadata
+    assert os.path.getsize(tmp_path / SIDE_FILE) > 0
+    document = docstore.search("1")
+    assert document.metadata == {"title": "title 1", "text": "text text "}
+    assert document.page_content == "title 1"
+
+    # A second save keeps the fields already in the side file.
+    docstore.add({"3": Document(page_content="new", metadata={"text": "new text"})})
+    docstore.save(str(tmp_path))
+    assert docstore.search("0").metadata["text"] == "text "
+    assert docstore.search("3").metadata["text"] == "new text"
+
+    docstore.delete(["0"])
+    assert isinstance(docstore.search("0"), str)
+    docstore.close()
+
+
+def test_pickled_docstore_is_attached_again(tmp_path):
+    docstore = SideFileDocstore(
+        ["text"], {str(i): document for i, document in enumerate(make_documents(2))}
+    )
+    docstore.save(str(tmp_path))
+
+    # The memory-mapped side file is not pickled.
+    restored = pickle.loads(pickle.dumps(docstore))
+    docstore.close()
+    assert restored._mmap is None
+    with pytest.raises(ValueError):
+        restored.search("1")
+
+    restored.attach(str(tmp_path))
+    assert restored.search("1").metadata["text"] == "text text "
+    restored.close()
+
+
+def test_vector_database_round_trip(tmp_path, embeddings):
+    db = IndexFactory.from_documents(
+        make_documents(10), embeddings, storage="float16", side_fields=["text"]
+    )
+    IndexFactory.save_local(db, str(tmp_path))
+    db.docstore.close()
+
+    loaded = IndexFactory.load_local(str(tmp_path), embeddings)
+
+    assert IndexFactory.get_storage(loaded.index) == IndexFactory.FLOAT16
+    [document] = loaded.similarity_search("title 4", k=1)
+    assert document.metadata == {"title": "title 4", "text": "text " * 5}
+    loaded.docstore.close()
+
+
+def test_migrate_to_compressed_storage_and_side_file(tmp_path, embeddings):
+    source, output = tmp_path / "source", tmp_path / "output"
+    db = IndexFactory.from_documents(make_documents(10), embeddings)
+    assert isinstance(db.docstore, InMemoryDocstore)
+    IndexFactory.save_local(db, str(source))
+    (source / "manifest.json").write_text("{}", encoding="utf-8")
+
+    migrate.migrate(str(source), str(output), "int8", ["text"])
+
+    # The other files of the database are copied, and the vectors are not re-embedded.
+    assert (output / "manifest.json").exists()
+    assert (output / SIDE_FILE).exists()
+    migrated = IndexFactory.load_local(str(output), embeddings)
+    assert isinstance(migrated.docstore, SideFileDocstore)
+    assert IndexFactory.get_storage(migrated.index) == IndexFactory.INT8
+    assert migrated.index.ntotal == 10
+    [document] = migrated.similarity_search("title 7", k=1)
+    assert document.metadata == {"title": "title 7", "text": "text " * 8}
+    migrated.docstore.close()
@@ -0,0 +1,159 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+
+import pytest
+
+# The evaluation agent reads the application window, so its module imports pywinauto.
+pytest.importorskip("pywinauto")
+
+from ufo.module import evaluation_service
+from ufo.module.evaluation_service import (
+    EvaluationService,
+    EvaluationTask,
+    evaluate_folders,
+    task_from_logs,
+)
+from ufo.prompter.eva_prompter import EvaluationAgentPrompter
+
+select_screenshot_steps = EvaluationAgentPrompter.select_screenshot_steps
+
+
+@pytest.mark.parametrize("max_images", [-1, 5, 10])
+def test_select_screenshot_steps_without_limit(max_images):
+    assert select_screenshot_steps([1, 2, 3, 4, 5], max_images) == {1, 2, 3, 4, 5}
+
+
+def test_select_screenshot_steps_zero_and_one():
+    assert select_screenshot_steps([1, 2, 3], 0) == set()
+    assert select_screenshot_steps([1, 2, 3], 1) == {3}
+
+
+@pytest.mark.parametrize("num_steps", [3, 7, 10, 31])
+@pytest.mark.parametrize("max_images", [2, 3, 4])
+def test_select_screenshot_steps_evenly(num_steps, max_images):
+    steps = list(range(1, num_steps + 1))
+
+    selected = select_screenshot_steps(steps, max_images)
+
+    assert len(selected) == min(num_steps, max_images)
+    assert {steps[0], steps[-1]} <= selected
+
+
+def test_select_screenshot_steps_spacing():
+    assert select_screenshot_steps(list(range(10)), 4) == {0, 3, 6, 9}
+
+
+def write_session(folder, requests, evaluation=None):
+    folder.mkdir(parents=True)
+    with open(folder / "response.log", "w", encoding="utf-8") as f:
+        for step, request in enumerate(requests):
+            f.write(
+                json.dumps(
+                    {"Step": step, "Request": request, "Application": "WINWORD.EXE"}
+                )
+                + "\n"
+            )
+        # A truncated line of an interrupted session is skipped.
+        f.write('{"Step": \n')
+    if evaluation is not None:
+        with open(folder / "evaluation.log", "w", encoding="utf-8") as f:
+            f.write(json.dumps(evaluation) + "\n")
+    return str(folder)
+
+
+def test_task_from_logs_single_request(tmp_path):
+    log_path = write_session(tmp_path / "session", ["write a poem", "write a poem"])
+
+    task = task_from_logs(log_path)
+
+    assert task.request == "write a poem"
+    assert task.app_root_name == "WINWORD.EXE"
+    assert task.log_path == log_path
+
+
+def test_task_from_logs_multiple_requests(tmp_path):
+    log_path = write_session(
+        tmp_path / "session", ["write a poem", "save it", "write a poem"]
+    )
+
+    task = task_from_logs(log_path)
+
+    assert json.loads(task.request) == [
+        {"request_0": "write a poem"},
+        {"request_1": "save it"},
+    ]
+
+
+def test_task_from_logs_uses_the_evaluated_request(tmp_path):
+    log_path = write_session(
+        tmp_path / "session",
+        ["write a poem", "save it"],
+        evaluation={"complete": "yes", "request": "write and save a poem"},
+    )
+
+    assert task_from_logs(log_path).request == "write and save a poem"
+
+
+@pytest.fixture
+def fake_evaluate(monkeypatch):
+    evaluated = []
+
+    def evaluate_task(task):
+        evaluated.append(task)
+        if "broken" in task.log_path:
+            raise RuntimeError("evaluation failed")
+        return {"complete": "yes", "request": task.request}, 0.5
+
+    monkeypatch.setattr(evaluation_service, "evaluate_task", evaluate_task)
+    return evaluated
+
+
+def test_evaluate_folders_skips_the_evaluated_sessions(tmp_path, fake_evaluate):
+    write_session(tmp_path / "a", ["request a"], evaluation={"complete": "no"})
+    write_session(tmp_path / "b", ["request b"])
+    write_session(tmp_path / "broken", ["request c"])
+
+    summary = evaluate_folders(str(tmp_path), workers=2)
+
+    assert summary == [
+        {"session": "a", "complete": "no", "cost": 0.0, "skipped": True},
+        {"session": "b", "complete": "yes", "cost": 0.5},
+        {"session": "broken", "complete": "error", "cost": 0.0},
+    ]
+    assert sorted(task.request for task in fake_evaluate) == ["request b", "request c"]
+    result = json.loads((tmp_path / "b" / "evaluation.log").read_text())
+    assert result == {"complete": "yes", "request": "request b"}
+    assert not (tmp_path / "broken" / "evaluation.log").exists()
+
+
+def test_evaluate_folders_force(tmp_path, fake_evaluate):
+    write_session(
+        tmp_path / "a", ["request a"], evaluation={"complete": "no", "request": "a"}
+    )
+
+    summary = evaluate_folders(str(tmp_path), workers=1, force=True)
+
+    assert summary == [{"session": "a", "complete": "yes", "cost": 0.5}]
+    lines = (tmp_path / "a" / "evaluation.log").read_text().splitlines()
+    # The new result is appended after the earlier one.
+    assert [json.loads(line)["complete"] for line in lines] == ["no", "yes"]
+
+
+def test_evaluation_service_propagates_the_exception(fake_evaluate):
+    with EvaluationService(workers=2, queue_size=1) as service:
+        failed = service.submit(EvaluationTask(log_path="logs/broken", request="r"))
+        succeeded = service.submit(EvaluationTask(log_path="logs/fine", request="r"))
+
+        with pytest.raises(RuntimeError, match="evaluation failed"):
+            failed.result(timeout=5)
+        assert succeeded.result(timeout=5) == ({"complete": "yes", "request": "r"}, 0.5)
+        # The workers keep running after a failed evaluation.
+        assert (
+            service.evaluate(EvaluationTask(log_path="logs/x", request="r"))[1] == 0.5
+        )
+        threads = list(service._threads)
+
+    assert len(threads) == 2
+    assert not any(thread.is_alive() for thread in threads)
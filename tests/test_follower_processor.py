@@ -0,0 +1,82 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import pytest
+
+# The processors drive the application, so their modules import pywinauto.
+pytest.importorskip("pywinauto")
+
+from ufo.agents.processors.follower_agent_processor import FollowerAppAgentProcessor
+from ufo.agents.states.app_agent_state import AppAgentStatus
+from ufo.config.config import Config
+from ufo.module.context import Context, ContextNames
+from ufo.module.sessions.plan_compiler import PlanStep
+
+configs = Config.get_instance().config_data
+
+CONTROL_INFO = [
+    {"label": "1", "control_text": "Home", "control_type": "TabItem"},
+    {"label": "2", "control_text": "Home", "control_type": "Button"},
+]
+
+
+@pytest.fixture
+def make_processor(monkeypatch):
+    monkeypatch.setitem(configs, "FOLLOWER_DIRECT_ACTION", True)
+    monkeypatch.setitem(configs, "TRAJECTORY_CACHE", False)
+
+    def make_processor(plan_step, round_step=0):
+        # Only the replay of the plan step is used, which does not need the agent or the window.
+        processor = FollowerAppAgentProcessor.__new__(FollowerAppAgentProcessor)
+        processor._context = Context()
+        processor.context.set(ContextNames.CURRENT_ROUND_STEP, round_step)
+        processor.plan_step = plan_step
+        processor._control_info = CONTROL_INFO
+        processor._agent_status_manager = AppAgentStatus
+        return processor
+
+    return make_processor
+
+
+def test_direct_response_replays_the_recorded_action(make_processor):
+    step = PlanStep(
+        request="Click 'Home' tab",
+        control_text="Home",
+        control_type="TabItem",
+        function="click_input",
+        args={"button": "left"},
+    )
+
+    response = make_processor(step).get_direct_response()
+
+    assert response["ControlLabel"] == "1"
+    assert response["ControlText"] == "Home"
+    assert response["Function"] == "click_input"
+    assert response["Args"] == {"button": "left"}
+    assert response["Status"] == "FINISH"
+
+
+def test_direct_response_of_an_api_call(make_processor):
+    step = PlanStep(request="Type", function="set_edit_text", args={"text": "a"})
+
+    response = make_processor(step).get_direct_response()
+
+    assert response["ControlLabel"] == ""
+    assert response["Function"] == "set_edit_text"
+
+
+def test_ambiguous_control_falls_back_to_the_llm(make_processor):
+    step = PlanStep(request="Click 'Home'", control_text="Home", function="click")
+
+    assert make_processor(step).get_direct_response() is None
+
+
+def test_only_the_first_step_of_the_round_is_replayed(make_processor, monkeypatch):
+    step = PlanStep(request="Type", function="set_edit_text")
+
+    assert make_processor(step, round_step=1).get_direct_response() is None
+    assert make_processor(PlanStep(request="Type")).get_direct_response() is None
+    assert make_processor(None).get_direct_response() is None
+
+    monkeypatch.setitem(configs, "FOLLOWER_DIRECT_ACTION", False)
+    assert make_processor(step).get_direct_response() is None
@@ -0,0 +1,47 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import importlib.util
+import os
+
+import pytest
+
+from ufo.utils.importtime import (
+    HEAVY_MODULES,
+    ROOT_PATH,
+    STARTUP_MODULE,
+    check_import,
+    measure_import,
+    parse_importtime,
+)
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      3000 |       3000 |     torch
+import time:       500 |       3500 |   ufo.rag.retriever
+import time:       800 |       4420 | ufo.module.sessions.session
+"""
+
+
+def test_heavy_module_in_importtime_output_is_reported():
+    times = parse_importtime(IMPORTTIME_OUTPUT)
+    result = {
+        "module": STARTUP_MODULE,
+        "seconds": times[STARTUP_MODULE][1] / 1e6,
+        "heavy_modules": sorted(name for name in times if name in HEAVY_MODULES),
+    }
+
+    assert times["torch"] == (3000, 3000)
+    assert check_import(result, None) == ["torch is imported at startup."]
+    assert len(check_import(result, 0.001)) == 2
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("pywinauto") is None
+    or not os.path.exists(os.path.join(ROOT_PATH, "ufo", "config", "config.yaml")),
+    reason="The startup module needs pywinauto and ufo/config/config.yaml.",
+)
+def test_startup_does_not_import_heavy_modules():
+    result = measure_import(STARTUP_MODULE, repeats=1)
+
+    assert check_import(result, None) == []
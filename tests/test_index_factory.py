@@ -0,0 +1,103 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import pytest
+from langchain.docstore.document import Document
+
+from ufo.rag.index_factory import IndexFactory
+
+
+def make_documents(start, end):
+    return [
+        Document(page_content="document {i}".format(i=i), metadata={"i": i})
+        for i in range(start, end)
+    ]
+
+
+def make_ids(start, end):
+    return ["id-{i}".format(i=i) for i in range(start, end)]
+
+
+def assert_consistent(db):
+    """
+    Check that each position of the index maps to a stored document, and each stored document to a position.
+    """
+    assert sorted(db.index_to_docstore_id) == list(range(db.index.ntotal))
+    assert set(db.index_to_docstore_id.values()) == set(db.docstore._dict)
+
+
+def test_select_index_type_thresholds():
+    assert IndexFactory.select_index_type(0) == IndexFactory.FLAT
+    assert (
+        IndexFactory.select_index_type(IndexFactory.FLAT_MAX_VECTORS - 1)
+        == IndexFactory.FLAT
+    )
+    assert (
+        IndexFactory.select_index_type(IndexFactory.FLAT_MAX_VECTORS)
+        == IndexFactory.HNSW
+    )
+    assert (
+        IndexFactory.select_index_type(IndexFactory.HNSW_MAX_VECTORS)
+        == IndexFactory.IVF_FLAT
+    )
+    assert (
+        IndexFactory.select_index_type(IndexFactory.IVF_FLAT_MAX_VECTORS)
+        == IndexFactory.IVF_PQ
+    )
+
+
+def test_resolve_index_type_falls_back_without_enough_training_vectors():
+    assert IndexFactory.resolve_index_type("ivf_pq", 1000) == IndexFactory.IVF_FLAT
+    assert IndexFactory.resolve_index_type("ivf_flat", 50) == IndexFactory.FLAT
+    assert IndexFactory.resolve_index_type("HNSW", 10) == IndexFactory.HNSW
+    with pytest.raises(ValueError):
+        IndexFactory.resolve_index_type("lsh", 10)
+
+
+def test_flat_index_is_rebuilt_when_the_corpus_grows(embeddings, monkeypatch):
+    monkeypatch.setattr(IndexFactory, "FLAT_MAX_VECTORS", 20)
+
+    db = IndexFactory.from_documents(
+        make_documents(0, 10), embeddings, ids=make_ids(0, 10)
+    )
+    assert IndexFactory.get_index_type(db.index) == IndexFactory.FLAT
+
+    IndexFactory.add_documents(db, make_documents(10, 15), ids=make_ids(10, 15))
+    assert IndexFactory.get_index_type(db.index) == IndexFactory.FLAT
+
+    IndexFactory.add_documents(db, make_documents(15, 25), ids=make_ids(15, 25))
+    assert IndexFactory.get_index_type(db.index) == IndexFactory.HNSW
+    assert db.index.ntotal == 25
+    assert_consistent(db)
+
+    # The vectors are moved to the new index without re-embedding the documents.
+    [document] = db.similarity_search("document 17", k=1)
+    assert document.metadata["i"] == 17
+
+
+def test_explicit_index_type_is_not_rebuilt(embeddings, monkeypatch):
+    monkeypatch.setattr(IndexFactory, "FLAT_MAX_VECTORS", 5)
+
+    db = IndexFactory.from_documents(make_documents(0, 10), embeddings, "flat")
+    IndexFactory.add_documents(db, make_documents(10, 20), "flat")
+
+    assert IndexFactory.get_index_type(db.index) == IndexFactory.FLAT
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_delete_documents_keeps_docstore_ids_consistent(embeddings, index_type):
+    db = IndexFactory.from_documents(
+        make_documents(0, 20), embeddings, index_type, ids=make_ids(0, 20)
+    )
+
+    IndexFactory.delete_documents(db, ["id-3", "id-7", "id-19"])
+
+    assert db.index.ntotal == 17
+    assert IndexFactory.get_index_type(db.index) == index_type
+    assert_consistent(db)
+    assert not {"id-3", "id-7", "id-19"} & set(db.index_to_docstore_id.values())
+
+    # Each remaining position still points to the document of its vector.
+    for i in (0, 8, 18):
+        [document] = db.similarity_search("document {i}".format(i=i), k=1)
+        assert document.metadata["i"] == i
@@ -0,0 +1,64 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import gzip
+import json
+import logging
+
+import pytest
+
+from ufo.module.log_writer import (
+    AsyncLogHandler,
+    JSONLineFormatter,
+    close_logger,
+    create_file_handler,
+    flush_logger,
+)
+
+
+def test_async_handler_writes_entries_as_logged(tmp_path):
+    log_file = tmp_path / "response.log"
+    target = logging.FileHandler(log_file, encoding="utf-8")
+    target.setFormatter(JSONLineFormatter())
+
+    logger = logging.getLogger("test_async_handler")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(AsyncLogHandler(target))
+
+    entry = {"Step": 1, "Results": ["clicked"]}
+    logger.info(entry)
+    # The caller changes the entry while it may still be queued.
+    entry["Results"].append("typed")
+    logger.info("plain line")
+    flush_logger(logger)
+    close_logger(logger)
+
+    lines = log_file.read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0]) == {"Step": 1, "Results": ["clicked"]}
+    assert lines[1] == "plain line"
+
+
+def test_compressed_file_handler(tmp_path):
+    handler = create_file_handler(str(tmp_path / "request.log"), "gzip")
+    handler.setFormatter(JSONLineFormatter())
+    handler.emit(logging.makeLogRecord({"msg": {"step": 1}}))
+    handler.close()
+
+    assert not (tmp_path / "request.log").exists()
+    with gzip.open(tmp_path / "request.log.gz", "rt", encoding="utf-8") as file:
+        assert [json.loads(line) for line in file] == [{"step": 1}]
+
+
+@pytest.mark.parametrize("log_filename", ["response.log", "evaluation.log"])
+def test_logs_read_back_cannot_be_compressed(tmp_path, log_filename):
+    with pytest.raises(ValueError):
+        create_file_handler(str(tmp_path / log_filename), "gzip")
+
+    handler = create_file_handler(str(tmp_path / log_filename), "")
+    handler.close()
+
+
+def test_unsupported_compression(tmp_path):
+    with pytest.raises(ValueError):
+        create_file_handler(str(tmp_path / "request.log"), "bz2")
@@ -0,0 +1,108 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+
+import pytest
+
+from ufo.agents.memory.memory import Memory, MemoryItem
+
+
+def make_item(**values):
+    memory_item = MemoryItem()
+    memory_item.set_values_from_dict(values)
+    return memory_item
+
+
+@pytest.fixture
+def memory():
+    memory = Memory()
+    for step, action in [(1, "a"), (2, "b"), (1, "c"), (3, "d"), (2, "e")]:
+        memory.add_memory_item(make_item(step=step, action=action))
+    return memory
+
+
+def scan_steps(memory, steps):
+    # The linear scan the step index replaces.
+    return [item.to_dict() for item in memory.content if item.step in steps]
+
+
+@pytest.mark.parametrize("steps", [[1], [2, 1], [3, 2, 1, 1], [4], []])
+def test_filter_memory_from_steps_matches_a_scan(memory, steps):
+    assert memory.filter_memory_from_steps(steps) == scan_steps(memory, steps)
+
+
+def test_get_memory_item_returns_the_latest_item_of_a_step(memory):
+    assert memory.get_memory_item(1).action == "c"
+    assert memory.get_memory_item(3).action == "d"
+    assert memory.get_memory_item(4) is None
+
+
+def test_delete_memory_item_keeps_the_index_consistent(memory):
+    memory.delete_memory_item(1)
+    memory.add_memory_item(make_item(step=1, action="f"))
+
+    assert [item.action for item in memory.content] == ["b", "d", "e", "f"]
+    assert memory.filter_memory_from_steps([1, 2]) == scan_steps(memory, [1, 2])
+    assert memory.get_memory_item(1).action == "f"
+
+    memory.delete_memory_item(4)
+    assert memory.length == 4
+
+
+def test_load_and_clear_rebuild_the_index(memory):
+    items = [make_item(step=5, action="x"), make_item(action="no step")]
+    memory.load(items)
+
+    assert memory.filter_memory_from_steps([1, 5]) == [{"step": 5, "action": "x"}]
+    assert memory.get_memory_item(None).action == "no step"
+
+    memory.clear()
+    assert memory.filter_memory_from_steps([5]) == []
+    assert memory.get_memory_item(5) is None
+
+
+def test_to_dict_keeps_the_fields_of_each_item():
+    first = make_item(step=1, action="click", control={"label": "1"})
+    second = make_item(step=2, comment="done")
+
+    assert first.to_dict() == {"step": 1, "action": "click", "control": {"label": "1"}}
+    assert list(first.to_dict()) == ["step", "action", "control"]
+    assert second.to_dict() == {"step": 2, "comment": "done"}
+    assert first.attributes == ["step", "action", "control"]
+    assert first.step == 1
+    with pytest.raises(AttributeError):
+        second.action
+
+    # The dictionary is a copy of the fields.
+    first.to_dict()["action"] = "type"
+    assert first.get_value("action") == "click"
+
+
+def test_to_json_matches_the_fields(memory):
+    assert memory.to_json() == json.dumps(memory.list_content)
+    assert json.loads(memory.content[0].to_json()) == memory.content[0].to_dict()
+
+
+def test_to_json_is_cached_until_a_field_is_set():
+    memory_item = make_item(step=1, action="click")
+    json_string = memory_item.to_json()
+
+    assert memory_item.to_json() is json_string
+
+    memory_item.set_value("action", "type")
+    assert json.loads(memory_item.to_json()) == {"step": 1, "action": "type"}
+
+
+def test_to_json_follows_values_changed_in_place():
+    memory_item = make_item(step=1, controls=["OK"], log={})
+    memory_item.to_json()
+
+    memory_item.get_value("controls").append("Cancel")
+    memory_item.log["x"] = 1
+
+    assert json.loads(memory_item.to_json()) == {
+        "step": 1,
+        "controls": ["OK", "Cancel"],
+        "log": {"x": 1},
+    }
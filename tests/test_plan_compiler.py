@@ -0,0 +1,201 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+
+import pytest
+
+from ufo.module.sessions.plan_compiler import (
+    PlanStep,
+    compile_steps,
+    validate_plan,
+    validate_plan_files,
+    validate_step,
+)
+from ufo.module.sessions.plan_reader import PlanReader
+
+CLICK_HOME = {
+    "request": "Click 'Home' tab",
+    "ControlText": "Home",
+    "ControlType": "TabItem",
+    "Function": "click_input",
+    "Args": {"button": "left", "double": False},
+}
+
+SET_TEXT = {
+    "request": "Type the title",
+    "Function": "set_edit_text",
+    "Args": {"text": "Title"},
+}
+
+CONTROL_INFO = [
+    {"label": "1", "control_text": "Home", "control_type": "TabItem"},
+    {"label": "2", "control_text": "Insert", "control_type": "TabItem"},
+    {"label": "3", "control_text": "Home", "control_type": "Button"},
+    {"label": "4", "control_text": "Save", "control_class": "Button"},
+]
+
+
+@pytest.mark.parametrize("step", ["Open the file", CLICK_HOME, SET_TEXT])
+def test_validate_valid_step(step):
+    assert validate_step(step, 0) == []
+
+
+@pytest.mark.parametrize(
+    "step, problem",
+    [
+        ("  ", "Step 3 is empty."),
+        (42, "Step 3 must be a string or an object, not int."),
+        ({"Function": "click_input"}, "Step 3 has no request."),
+        ({"request": "r", "Function": 1}, "Step 3: Function must be a string."),
+        (
+            {"request": "r", "Function": "f", "Args": []},
+            "Step 3: Args must be an object.",
+        ),
+        (
+            {"request": "r", "ControlText": "Home"},
+            "Step 3 has a recorded control or arguments but no Function.",
+        ),
+        ({"request": "r", "Label": "1"}, "Step 3 has unknown keys: Label."),
+    ],
+)
+def test_validate_invalid_step(step, problem):
+    assert problem in validate_step(step, 2)
+
+
+def test_validate_plan():
+    plan = {"task": "Write", "object": "doc.docx", "steps": ["Open", CLICK_HOME]}
+
+    assert validate_plan(plan) == []
+    assert validate_plan([]) == ["The plan must be an object."]
+    assert validate_plan({"task": " ", "steps": []}) == [
+        "The plan has no task.",
+        "The plan has no object.",
+        "The plan has no steps.",
+    ]
+    assert validate_plan({**plan, "steps": ["Open", ""]}) == ["Step 2 is empty."]
+
+
+def test_compile_steps():
+    steps = compile_steps(["Open the file", CLICK_HOME, SET_TEXT])
+
+    assert steps[0] == PlanStep(request="Open the file")
+    assert not steps[0].is_direct
+    assert steps[1] == PlanStep(
+        request="Click 'Home' tab",
+        control_text="Home",
+        control_type="TabItem",
+        function="click_input",
+        args={"button": "left", "double": False},
+    )
+    assert steps[2].is_direct
+    assert steps[2].control_text is None
+
+
+def test_compile_steps_rejects_invalid_steps():
+    with pytest.raises(ValueError, match="Step 2 has no request"):
+        compile_steps(["Open the file", {"Function": "click_input"}])
+
+
+def test_match_control_unique():
+    assert compile_steps([CLICK_HOME])[0].match_control(CONTROL_INFO) == "1"
+
+
+def test_match_control_by_class():
+    step = PlanStep(
+        request="Save", control_text="Save", control_type="Button", function="click"
+    )
+
+    assert step.match_control(CONTROL_INFO) == "4"
+
+
+def test_match_control_ambiguous():
+    # Without a control type, both controls named "Home" match.
+    step = PlanStep(request="Home", control_text="Home", function="click_input")
+
+    assert step.match_control(CONTROL_INFO) is None
+
+
+def test_match_control_type_mismatch():
+    step = PlanStep(
+        request="Insert",
+        control_text="Insert",
+        control_type="Button",
+        function="click_input",
+    )
+
+    assert step.match_control(CONTROL_INFO) is None
+    assert step.match_control([]) is None
+
+
+def test_match_control_api_call():
+    assert compile_steps([SET_TEXT])[0].match_control(CONTROL_INFO) == ""
+    assert compile_steps([SET_TEXT])[0].match_control([]) == ""
+
+
+def test_to_raw_round_trip():
+    raw_steps = ["Open the file", CLICK_HOME, SET_TEXT]
+    steps = compile_steps(raw_steps)
+
+    assert [step.to_raw() for step in steps] == raw_steps
+    assert compile_steps([step.to_raw() for step in steps]) == steps
+
+
+@pytest.fixture
+def plan_file(tmp_path):
+    plan = {
+        "task": "Format the title",
+        "object": "doc.docx",
+        "steps": ["Open the file", CLICK_HOME, SET_TEXT],
+    }
+    plan_file = tmp_path / "plan.json"
+    plan_file.write_text(json.dumps(plan), encoding="utf-8")
+    return str(plan_file)
+
+
+def test_plan_reader_next_step(plan_file):
+    reader = PlanReader(plan_file)
+
+    assert reader.get_initial_request() == "Format the title in doc.docx"
+
+    requests = []
+    while not reader.task_finished():
+        requests.append(reader.next_step())
+        assert reader.current_step.request == requests[-1]
+
+    assert requests == ["Open the file", "Click 'Home' tab", "Type the title"]
+    assert reader.next_step() is None
+    assert reader.current_step is None
+
+
+def test_plan_reader_remaining_steps_round_trip(plan_file):
+    reader = PlanReader(plan_file)
+    reader.next_step()
+    remaining = reader.get_remaining_steps()
+
+    assert remaining == [CLICK_HOME, SET_TEXT]
+
+    restored = PlanReader(plan_file)
+    restored.set_remaining_steps(json.loads(json.dumps(remaining)))
+
+    assert list(restored.remaining_steps) == list(reader.remaining_steps)
+    assert restored.next_step() == "Click 'Home' tab"
+    assert restored.current_step.is_direct
+
+
+def test_plan_reader_rejects_invalid_plan(tmp_path):
+    plan_file = tmp_path / "plan.json"
+    plan_file.write_text(json.dumps({"task": "t", "steps": []}), encoding="utf-8")
+
+    with pytest.raises(ValueError, match="no object"):
+        PlanReader(str(plan_file))
+
+
+def test_validate_plan_files(plan_file, tmp_path):
+    broken = tmp_path / "broken.json"
+    broken.write_text("{", encoding="utf-8")
+
+    results = validate_plan_files([plan_file, str(broken)])
+
+    assert results[plan_file] == []
+    assert results[str(broken)][0].startswith("The plan file cannot be loaded")
@@ -0,0 +1,35 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+from types import SimpleNamespace
+
+from ufo.rag.retriever import OfflineDocRetriever
+
+
+def make_document(doc_id):
+    return SimpleNamespace(id=doc_id)
+
+
+def test_fuse_min_max_normalizes_both_rankings():
+    retriever = OfflineDocRetriever.__new__(OfflineDocRetriever)
+    retriever.alpha = 0.5
+    a, b, c = make_document("a"), make_document("b"), make_document("c")
+
+    # The BM25 scores are all close, so only their spread counts after the normalization.
+    fused = retriever.fuse(
+        [(a, 0.2), (b, 0.5), (c, 1.0)],
+        [(c, 10.2), (b, 10.1), (a, 10.0)],
+        top_k=3,
+    )
+
+    assert fused == [b, a, c]
+
+
+def test_fuse_with_equal_keyword_scores():
+    retriever = OfflineDocRetriever.__new__(OfflineDocRetriever)
+    retriever.alpha = 0.5
+    a, b = make_document("a"), make_document("b")
+
+    fused = retriever.fuse([], [(a, 0.0), (b, 0.0)], top_k=1)
+
+    assert fused == [a]
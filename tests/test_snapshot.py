@@ -0,0 +1,122 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import threading
+
+import pytest
+from PIL import Image
+
+# The package of the snapshot imports the screenshot module, which imports pywinauto.
+pytest.importorskip("pywinauto")
+
+from ufo.automator.ui_control import snapshot
+from ufo.automator.ui_control.snapshot import WindowSnapshotTaker, capture_rect
+
+
+class FakeWindow:
+    """
+    A window moving by 10 pixels during each of its first captures.
+    """
+
+    def __init__(self, moves=0):
+        self.rect = (0, 0, 200, 100)
+        self.moves = moves
+        self.threads = {"rectangle": set(), "enumerate": set(), "capture": set()}
+        self.captured_rects = []
+
+    def rectangle(self):
+        self.threads["rectangle"].add(threading.current_thread())
+        return self.rect
+
+    def enumerate_controls(self):
+        self.threads["enumerate"].add(threading.current_thread())
+        return ["control"]
+
+    def capture(self, rect):
+        self.threads["capture"].add(threading.current_thread())
+        self.captured_rects.append(rect)
+        if self.moves > 0:
+            self.moves -= 1
+            left, top, right, bottom = self.rect
+            self.rect = (left + 10, top, right + 10, bottom)
+        return Image.new("RGB", (rect[2] - rect[0], rect[3] - rect[1]))
+
+    def take(self, concurrent=True, max_retries=1):
+        return WindowSnapshotTaker(concurrent, max_retries).take(
+            self.rectangle, self.enumerate_controls, self.capture
+        )
+
+
+def test_snapshot_of_a_still_window():
+    window = FakeWindow()
+
+    result = window.take()
+
+    assert result.consistent
+    assert result.attempts == 1
+    assert result.control_list == ["control"]
+    assert result.window_rect == (0, 0, 200, 100)
+    assert result.screenshot.size == (200, 100)
+
+
+def test_snapshot_is_taken_again_when_the_window_moves():
+    window = FakeWindow(moves=1)
+
+    result = window.take()
+
+    assert result.consistent
+    assert result.attempts == 2
+    # The second capture is of the rectangle the window moved to.
+    assert window.captured_rects == [(0, 0, 200, 100), (10, 0, 210, 100)]
+    assert result.window_rect == (10, 0, 210, 100)
+
+
+def test_snapshot_of_a_window_which_keeps_moving():
+    window = FakeWindow(moves=10)
+
+    result = window.take(max_retries=2)
+
+    assert not result.consistent
+    assert result.attempts == 3
+    assert result.window_rect == (30, 0, 230, 100)
+
+
+def test_only_the_capture_runs_on_the_capture_thread():
+    window = FakeWindow(moves=1)
+
+    window.take()
+
+    main_thread = threading.current_thread()
+    assert window.threads["rectangle"] == {main_thread}
+    assert window.threads["enumerate"] == {main_thread}
+    (capture_thread,) = window.threads["capture"]
+    assert capture_thread.name.startswith("window-capture")
+
+
+def test_serial_snapshot():
+    window = FakeWindow(moves=1)
+
+    result = window.take(concurrent=False)
+
+    assert result.consistent
+    assert result.attempts == 2
+    assert window.threads["capture"] == {threading.current_thread()}
+
+
+def test_capture_rect(monkeypatch, tmp_path):
+    grabs = []
+
+    def grab(bbox=None, all_screens=False):
+        grabs.append((bbox, all_screens))
+        return Image.new("RGB", (bbox[2] - bbox[0], bbox[3] - bbox[1]))
+
+    monkeypatch.setattr(snapshot.ImageGrab, "grab", grab)
+
+    screenshot = capture_rect((-100, 0, 100, 50), save_path=str(tmp_path / "s.png"))
+
+    assert screenshot.size == (200, 50)
+    assert grabs == [((-100, 0, 100, 50), True)]
+    assert (tmp_path / "s.png").exists()
+    # A minimized window has an empty rectangle.
+    assert capture_rect((0, 0, 0, 0)) is None
+    assert len(grabs) == 1
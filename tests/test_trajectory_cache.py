@@ -0,0 +1,254 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+
+import pytest
+
+from ufo.module.sessions.plan_compiler import PlanStep
+from ufo.module.trajectory_cache import (
+    TrajectoryCache,
+    TrajectoryReplay,
+    benchmark,
+    extract_trajectories,
+    normalize_request,
+    trajectory_key,
+)
+
+CONTROL_INFO = [
+    {"label": "1", "control_text": "Insert", "control_type": "TabItem"},
+    {"label": "2", "control_text": "Table", "control_type": "Button"},
+]
+
+# The same control twice, so the recorded control is ambiguous.
+AMBIGUOUS_CONTROL_INFO = [
+    {"label": "1", "control_text": "Insert", "control_type": "TabItem"},
+    {"label": "2", "control_text": "Insert", "control_type": "TabItem"},
+]
+
+
+@pytest.fixture
+def logs_reader():
+    # The logs are read with the evaluation service, which imports the agents and pywinauto.
+    pytest.importorskip("pywinauto")
+
+
+@pytest.mark.parametrize(
+    "request_text",
+    [
+        "Insert a table",
+        "1. Insert a table.",
+        "2) insert   a TABLE!",
+        "  insert, a table ",
+    ],
+)
+def test_normalize_request(request_text):
+    assert normalize_request(request_text) == "insert a table"
+
+
+def test_trajectory_key():
+    assert trajectory_key("WINWORD.EXE", "1. Insert a table.") == (
+        "winword.exe|insert a table"
+    )
+    assert trajectory_key(None, "Insert a table") == "|insert a table"
+
+
+def step_log(step, status="CONTINUE", control_text="Insert", **kwargs):
+    return {
+        "Step": step,
+        "Agent": "ActAgent",
+        "Round": 0,
+        "SubtaskIndex": 0,
+        "Subtask": "Insert a table",
+        "Application": "WINWORD.EXE",
+        "ControlText": control_text,
+        "ControlType": "TabItem",
+        "Function": "click_input",
+        "Args": {"button": "left"},
+        "Status": status,
+        "Cost": 0.1,
+        "Latency": 2.0,
+        **kwargs,
+    }
+
+
+def write_session(folder, logs, evaluation=None, control_items=None):
+    folder.mkdir(parents=True)
+    with open(folder / "response.log", "w", encoding="utf-8") as f:
+        for log in logs:
+            f.write(json.dumps(log) + "\n")
+    if evaluation is not None:
+        with open(folder / "evaluation.log", "w", encoding="utf-8") as f:
+            f.write(json.dumps(evaluation) + "\n")
+    if control_items is not None:
+        with open(folder / "request.log", "w", encoding="utf-8") as f:
+            for step, items in control_items.items():
+                f.write(json.dumps({"step": step, "control_items": items}) + "\n")
+    return str(folder)
+
+
+def test_extract_finished_trajectory(tmp_path, logs_reader):
+    log_path = write_session(
+        tmp_path / "session",
+        [
+            {"Step": 0, "Agent": "HostAgent", "Subtask": "Insert a table"},
+            step_log(1),
+            step_log(2, status="FINISH", control_text="Table", Function="click"),
+        ],
+    )
+
+    (trajectory,) = extract_trajectories(log_path)
+
+    assert trajectory["success"]
+    assert trajectory["key"] == "winword.exe|insert a table"
+    assert [action["Function"] for action in trajectory["actions"]] == [
+        "click_input",
+        "click",
+    ]
+    assert trajectory["steps"] == [1, 2]
+    assert trajectory["costs"] == [0.1, 0.1]
+
+
+@pytest.mark.parametrize("status", ["FAIL", "CONFIRM", "PENDING"])
+def test_uncacheable_status(tmp_path, logs_reader, status):
+    log_path = write_session(
+        tmp_path / "session",
+        [step_log(1, status=status), step_log(2, status="FINISH")],
+    )
+
+    (trajectory,) = extract_trajectories(log_path)
+
+    assert not trajectory["success"]
+
+
+def test_unfinished_trajectory(tmp_path, logs_reader):
+    log_path = write_session(tmp_path / "session", [step_log(1), step_log(2)])
+
+    assert not extract_trajectories(log_path)[0]["success"]
+
+
+def test_failed_session_is_uncacheable(tmp_path, logs_reader):
+    log_path = write_session(
+        tmp_path / "session",
+        [step_log(1, status="FINISH")],
+        evaluation={"complete": "no"},
+    )
+
+    assert not extract_trajectories(log_path)[0]["success"]
+
+    cache = TrajectoryCache(path=str(tmp_path / "cache.json"))
+    assert cache.add_from_logs(log_path) == 0
+    assert cache.trajectories == {}
+
+
+def test_subtasks_are_separate_trajectories(tmp_path, logs_reader):
+    log_path = write_session(
+        tmp_path / "session",
+        [
+            step_log(1, status="FINISH"),
+            step_log(2, status="FINISH", SubtaskIndex=1, Subtask="Save the file"),
+        ],
+    )
+
+    trajectories = extract_trajectories(log_path)
+
+    assert [trajectory["request"] for trajectory in trajectories] == [
+        "Insert a table",
+        "Save the file",
+    ]
+    assert all(trajectory["success"] for trajectory in trajectories)
+
+
+def test_replay_of_the_cached_actions():
+    actions = [
+        PlanStep(
+            request="Insert a table",
+            control_text="Insert",
+            control_type="TabItem",
+            function="click_input",
+        ),
+        PlanStep(request="Insert a table", function="set_edit_text"),
+    ]
+    replay = TrajectoryReplay("winword.exe|insert a table", actions)
+
+    assert replay.next_action(CONTROL_INFO) == ("1", actions[0], False)
+    assert replay.next_action([]) == ("", actions[1], True)
+    assert replay.next_action(CONTROL_INFO) is None
+    assert replay.replayed == 2
+    assert not replay.active
+
+
+def test_replay_stops_at_the_first_mismatch():
+    actions = [
+        PlanStep(
+            request="Insert a table",
+            control_text=text,
+            control_type=control_type,
+            function="click_input",
+        )
+        for text, control_type in [
+            ("Insert", "TabItem"),
+            ("Insert", "Button"),
+            ("Table", "Button"),
+        ]
+    ]
+    replay = TrajectoryReplay("winword.exe|insert a table", actions)
+
+    assert replay.next_action(CONTROL_INFO) == ("1", actions[0], False)
+    # The control of the second action has another type.
+    assert replay.next_action(CONTROL_INFO) is None
+    # The third action matches, but the replay does not resume.
+    assert replay.next_action(CONTROL_INFO) is None
+    assert not replay.active
+    assert replay.replayed == 1
+    assert list(replay.actions) == actions[1:]
+
+
+def test_replay_stops_on_an_ambiguous_control():
+    action = PlanStep(
+        request="Insert a table",
+        control_text="Insert",
+        control_type="TabItem",
+        function="click_input",
+    )
+    replay = TrajectoryReplay("winword.exe|insert a table", [action])
+
+    assert replay.next_action(AMBIGUOUS_CONTROL_INFO) is None
+    assert replay.replayed == 0
+
+
+def test_cache_round_trip(tmp_path, logs_reader):
+    log_path = write_session(
+        tmp_path / "session", [step_log(1), step_log(2, status="FINISH")]
+    )
+    cache_path = str(tmp_path / "cache" / "trajectories.json")
+
+    assert TrajectoryCache(path=cache_path).add_from_logs(log_path) == 1
+
+    replay = TrajectoryCache(path=cache_path).start_replay(
+        "WINWORD.EXE", "1. insert a table"
+    )
+    assert len(replay.actions) == 2
+    assert replay.actions[0].control_text == "Insert"
+    assert TrajectoryCache(path=cache_path).start_replay("EXCEL.EXE", "x") is None
+
+
+def test_benchmark_verifies_the_logged_controls(tmp_path, logs_reader):
+    logs = [step_log(1), step_log(2, status="FINISH")]
+    write_session(tmp_path / "a", logs, control_items={1: CONTROL_INFO})
+    write_session(
+        tmp_path / "b",
+        logs,
+        control_items={1: CONTROL_INFO, 2: AMBIGUOUS_CONTROL_INFO},
+    )
+
+    results = benchmark(str(tmp_path))
+
+    assert results["subtasks"] == 2
+    assert results["hits"] == 2
+    # The second step of session a logged no controls, so it is verified against its recorded control only.
+    assert results["unverified_steps"] == 1
+    # The control of the second step of session b is ambiguous.
+    assert results["replayed_steps"] == 3
+    assert results["full_replays"] == 1
+    assert results["replay_rate"] == 0.75
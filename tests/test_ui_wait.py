@@ -0,0 +1,121 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+from PIL import Image
+
+from ufo.utils.ui_wait import FrameSequenceProbe, UIIdleWaiter
+
+
+class FakeClock:
+    """
+    A clock advanced by the sleeps of the waiter.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def frame(color):
+    return Image.new("RGB", (320, 240), color)
+
+
+def make_waiter(probe, clock, timeout=5.0):
+    return UIIdleWaiter(
+        probe,
+        timeout,
+        interval=0.2,
+        stable_frames=2,
+        clock=clock.clock,
+        sleep=clock.sleep,
+    )
+
+
+def test_idle_after_frames_stop_changing():
+    clock = FakeClock()
+    probe = FrameSequenceProbe(
+        [frame("black"), frame("white"), frame("red"), frame("red"), frame("red")]
+    )
+
+    result = make_waiter(probe, clock).wait()
+
+    assert result.idle
+    assert result.polls == 5
+    assert probe.captures == 5
+    assert clock.sleeps == [0.2] * 4
+    assert abs(result.elapsed - 0.8) < 1e-9
+
+
+def test_timeout_while_frames_change():
+    clock = FakeClock()
+    probe = FrameSequenceProbe([frame("black"), frame("white")] * 10)
+
+    result = make_waiter(probe, clock, timeout=1.0).wait()
+
+    assert not result.idle
+    assert abs(result.elapsed - 1.0) < 1e-9
+    assert abs(sum(clock.sleeps) - 1.0) < 1e-9
+
+
+def test_wait_for_ready_window_and_idle_cursor():
+    clock = FakeClock()
+    probe = FrameSequenceProbe(
+        [frame("red")],
+        ready=[False, False, True],
+        busy=[True, True, True, True, False],
+    )
+
+    result = make_waiter(probe, clock).wait()
+
+    assert result.idle
+    assert result.polls == 5
+
+
+def test_missing_frames_are_not_stable():
+    clock = FakeClock()
+    probe = FrameSequenceProbe([None, None, None, frame("red"), frame("red")])
+
+    result = make_waiter(probe, clock).wait()
+
+    assert result.idle
+    assert result.polls == 6
+
+
+def test_min_wait_before_the_first_poll():
+    clock = FakeClock()
+    # The first poll comes after the minimum wait, then the polls are an interval apart.
+    probe = FrameSequenceProbe([frame("red"), frame("red"), frame("red")])
+
+    result = UIIdleWaiter(
+        probe,
+        5.0,
+        interval=0.2,
+        stable_frames=2,
+        min_wait=0.5,
+        clock=clock.clock,
+        sleep=clock.sleep,
+    ).wait()
+
+    assert result.idle
+    assert clock.sleeps == [0.5, 0.2, 0.2]
+    assert abs(result.elapsed - 0.9) < 1e-9
+
+
+def test_min_wait_is_bounded_by_the_timeout():
+    clock = FakeClock()
+    probe = FrameSequenceProbe([frame("black"), frame("white")])
+
+    result = UIIdleWaiter(
+        probe, 0.3, min_wait=1.0, clock=clock.clock, sleep=clock.sleep
+    ).wait()
+
+    assert not result.idle
+    assert result.polls == 1
+    assert abs(result.elapsed - 0.3) < 1e-9
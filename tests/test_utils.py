@@ -0,0 +1,64 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+
+import pytest
+
+from ufo.utils import iter_json_lines, tail_lines
+
+
+@pytest.fixture
+def json_lines(tmp_path):
+    file_path = tmp_path / "response.log"
+    records = [{"Step": i, "Text": "é" * i} for i in range(10)]
+    file_path.write_text(
+        "".join(json.dumps(record) + "\n" for record in records), encoding="utf-8"
+    )
+    return str(file_path), records
+
+
+@pytest.mark.parametrize("last_k", [1, 3, 10, 20])
+@pytest.mark.parametrize("block_size", [7, 65536])
+def test_tail_lines(json_lines, last_k, block_size):
+    file_path, records = json_lines
+    lines = open(file_path, encoding="utf-8").read().splitlines()
+
+    assert tail_lines(file_path, last_k, block_size) == lines[-last_k:]
+
+
+@pytest.mark.parametrize("last_k", [0, -1])
+def test_tail_lines_reads_all_lines_for_zero(json_lines, last_k):
+    file_path, records = json_lines
+
+    assert [json.loads(line) for line in tail_lines(file_path, last_k)] == records
+
+
+def test_tail_lines_without_final_line_break(tmp_path):
+    file_path = tmp_path / "log.txt"
+    file_path.write_bytes(b"a\r\nb\r\nc")
+
+    assert tail_lines(str(file_path), 2, block_size=2) == ["b", "c"]
+    assert tail_lines(str(file_path), 0) == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize("last_k, expected", [(-1, 10), (0, 10), (2, 2)])
+def test_iter_json_lines(json_lines, last_k, expected):
+    file_path, records = json_lines
+
+    assert list(iter_json_lines(file_path, last_k)) == records[-expected:]
+
+
+def test_iter_json_lines_on_error(tmp_path):
+    file_path = tmp_path / "response.log"
+    file_path.write_text('{"Step": 0}\nnot json\n\n{"Step": 1}\n', encoding="utf-8")
+    errors = []
+
+    records = iter_json_lines(
+        str(file_path), on_error=lambda line, _: errors.append(line)
+    )
+
+    assert list(records) == [{"Step": 0}, {"Step": 1}]
+    assert errors == ["not json"]
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_lines(str(file_path)))
@@ -0,0 +1,78 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import os
+import time
+
+from ufo.rag.web_cache import EmbeddingFileStore, WebPageCache
+
+
+def test_expired_entries_are_removed_when_opened(tmp_path):
+    cache = WebPageCache(str(tmp_path), ttl=60)
+    cache.set("https://example.com/old", "old")
+    cache.set("https://example.com/new", "new")
+
+    old_path = cache.get_entry_path("https://example.com/old")
+    past = time.time() - 120
+    os.utime(old_path, (past, past))
+
+    cache = WebPageCache(str(tmp_path), ttl=60)
+
+    assert not os.path.exists(old_path)
+    assert cache.get("https://example.com/new") == "new"
+
+
+def test_oldest_entries_are_removed_over_the_size_limit(tmp_path):
+    cache = WebPageCache(str(tmp_path), ttl=3600)
+    for i in range(5):
+        cache.set("https://example.com/{i}".format(i=i), "x" * 1000)
+        mtime = time.time() - 100 + i
+        os.utime(
+            cache.get_entry_path("https://example.com/{i}".format(i=i)), (mtime, mtime)
+        )
+
+    cache.max_bytes = 2500
+    removed = cache.prune()
+
+    assert removed == 3
+    assert cache.get("https://example.com/0") is None
+    assert cache.get("https://example.com/4") == "x" * 1000
+
+
+def test_cache_is_pruned_every_interval_writes(tmp_path):
+    cache = WebPageCache(str(tmp_path), ttl=3600, max_bytes=2500)
+    cache.PRUNE_INTERVAL = 4
+    for i in range(4):
+        cache.set("https://example.com/{i}".format(i=i), "x" * 1000)
+
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_least_recently_used_embeddings_are_removed(tmp_path):
+    store = EmbeddingFileStore(str(tmp_path), max_bytes=350)
+    store.PRUNE_INTERVAL = 1000
+    for i in range(5):
+        store.mset([("model/key{i}".format(i=i), b"x" * 100)])
+        past = time.time() - 100 + i
+        os.utime(tmp_path / "model" / "key{i}".format(i=i), (past, past))
+
+    # Reading an embedding makes it the most recently used.
+    assert store.mget(["model/key0"]) == [b"x" * 100]
+
+    assert store.prune() == 2
+    assert store.mget(["model/key0", "model/key1", "model/key2", "model/key4"]) == [
+        b"x" * 100,
+        None,
+        None,
+        b"x" * 100,
+    ]
+
+
+def test_embedding_store_is_pruned_every_interval_writes(tmp_path):
+    store = EmbeddingFileStore(str(tmp_path), max_bytes=250)
+    store.PRUNE_INTERVAL = 4
+    store.mset([("key{i}".format(i=i), b"x" * 100) for i in range(3)])
+    assert len(os.listdir(tmp_path)) == 3
+
+    store.mset([("key3", b"x" * 100)])
+    assert len(os.listdir(tmp_path)) == 2
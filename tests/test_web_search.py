@@ -0,0 +1,121 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from ufo.config.config import Config
+from ufo.rag.web_search import BingSearchWeb
+
+# The delay of the slow pages of the stub server.
+PAGE_DELAY = 0.5
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """
+    The local HTTP stub of the web pages: /slow/<n> answers after PAGE_DELAY, /hang after 5 seconds,
+    and /large/<size> with <size> bytes.
+    """
+
+    def do_GET(self):
+        if self.path.startswith("/slow/"):
+            time.sleep(PAGE_DELAY)
+            body = "<html><body><p>page {n}</p></body></html>".format(
+                n=self.path.rsplit("/", 1)[1]
+            ).encode("utf-8")
+        elif self.path == "/hang":
+            time.sleep(5)
+            body = b"<html></html>"
+        elif self.path.startswith("/large/"):
+            body = b"a" * int(self.path.rsplit("/", 1)[1])
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    yield "http://127.0.0.1:{port}".format(port=httpd.server_address[1])
+
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def bing(tmp_path, monkeypatch):
+    configs = Config.get_instance().config_data
+    monkeypatch.setitem(configs, "RAG_ONLINE_CACHE_PATH", str(tmp_path))
+    monkeypatch.setitem(configs, "RAG_ONLINE_FETCH_WORKERS", 4)
+    monkeypatch.setitem(configs, "RAG_ONLINE_FETCH_TIMEOUT", 2)
+    monkeypatch.setitem(configs, "RAG_ONLINE_FETCH_MAX_BYTES", 1000)
+
+    return BingSearchWeb(endpoint="http://127.0.0.1:1/search")
+
+
+def test_pages_are_fetched_concurrently(server, bing):
+    results = [
+        {
+            "name": "page {i}".format(i=i),
+            "url": "{server}/slow/{i}".format(server=server, i=i),
+            "snippet": "",
+        }
+        for i in range(4)
+    ]
+
+    start = time.time()
+    documents = bing.create_documents(results)
+    elapsed = time.time() - start
+
+    # Four pages fetched one after another would take 4 * PAGE_DELAY.
+    assert elapsed < 3 * PAGE_DELAY
+    assert [document.page_content for document in documents] == [
+        "page {i}".format(i=i) for i in range(4)
+    ]
+    assert [document.metadata["name"] for document in documents] == [
+        result["name"] for result in results
+    ]
+
+    # The pages are read from the cache the second time.
+    start = time.time()
+    bing.create_documents(results)
+    assert time.time() - start < PAGE_DELAY
+
+
+def test_request_times_out(server, bing):
+    bing.timeout = 0.3
+
+    start = time.time()
+    with pytest.raises(requests.exceptions.Timeout):
+        bing.fetch_url(server + "/hang")
+    assert time.time() - start < 2
+
+    # The page of a timed-out request is an empty document.
+    [document] = bing.get_url_text(server + "/hang")
+    assert document.page_content == ""
+
+
+def test_download_is_truncated_to_max_bytes(server, bing):
+    text = bing.fetch_url(server + "/large/100000")
+
+    assert text == "a" * 1000
+    assert bing.page_cache.get(server + "/large/100000") == text
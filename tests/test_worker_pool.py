@@ -0,0 +1,159 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import os
+import threading
+import time
+
+import pytest
+
+from ufo.module.worker_pool import (
+    ERROR,
+    FINISHED,
+    LOST,
+    BatchCoordinator,
+    SocketCoordinatorTransport,
+    SocketWorkerTransport,
+    run_local_batch,
+    run_worker,
+)
+
+
+def stub_runner(task):
+    """
+    Run a task without a desktop. The behavior of each attempt is chosen by the name of the plan file.
+    """
+    name = os.path.splitext(os.path.basename(task["plan_file"]))[0]
+    attempt = task["attempt"]
+
+    if name == "fail" or (name == "flaky" and attempt == 0):
+        raise RuntimeError("{name} failed".format(name=name))
+    if name == "crash" and attempt == 0:
+        os._exit(1)
+    if name == "slow" and attempt == 0:
+        time.sleep(30)
+    if name == "late":
+        # The first attempt times out and fails while the retry is running.
+        time.sleep(3.0 if attempt == 0 else 1.5)
+        if attempt == 0:
+            raise RuntimeError("late failure")
+
+    return {"status": FINISHED, "steps": 1, "cost": 0.0, "plan": name}
+
+
+def results_by_plan(results):
+    return {os.path.basename(result["plan_file"]): result for result in results}
+
+
+def test_local_batch_success_and_failure():
+    results = run_local_batch(
+        "test",
+        ["ok.json", "fail.json", "flaky.json"],
+        2,
+        runner=stub_runner,
+        max_retries=1,
+        task_timeout=30,
+        poll_interval=0.1,
+    )
+
+    assert [os.path.basename(result["plan_file"]) for result in results] == [
+        "ok.json",
+        "fail.json",
+        "flaky.json",
+    ]
+    results = results_by_plan(results)
+    assert results["ok.json"]["status"] == FINISHED
+    assert results["ok.json"]["attempts"] == 1
+    assert results["fail.json"]["status"] == ERROR
+    assert results["fail.json"]["attempts"] == 2
+    assert "fail failed" in results["fail.json"]["error"]
+    assert results["flaky.json"]["status"] == FINISHED
+    assert results["flaky.json"]["attempts"] == 2
+
+
+def test_local_batch_timeout_terminates_attempt():
+    start = time.time()
+    results = run_local_batch(
+        "test",
+        ["slow.json", "ok.json"],
+        1,
+        runner=stub_runner,
+        max_retries=1,
+        task_timeout=1,
+        poll_interval=0.1,
+    )
+
+    # The only worker is replaced after the timeout, instead of sleeping to the end of the first attempt.
+    assert time.time() - start < 20
+    results = results_by_plan(results)
+    assert results["slow.json"]["status"] == FINISHED
+    assert results["slow.json"]["attempts"] == 2
+    assert results["ok.json"]["status"] == FINISHED
+
+
+def test_local_batch_dead_worker_is_lost():
+    results = run_local_batch(
+        "test",
+        ["crash.json"],
+        1,
+        runner=stub_runner,
+        max_retries=0,
+        task_timeout=30,
+        poll_interval=0.1,
+    )
+
+    assert results[0]["status"] == LOST
+    assert results[0]["attempts"] == 1
+
+
+@pytest.fixture
+def socket_batch():
+    transport = SocketCoordinatorTransport(host="127.0.0.1")
+    workers = []
+
+    def start_workers(num_workers):
+        for i in range(num_workers):
+            worker = threading.Thread(
+                target=run_worker,
+                args=(
+                    SocketWorkerTransport(*transport.address),
+                    "remote-{i}".format(i=i),
+                    stub_runner,
+                ),
+                daemon=True,
+            )
+            worker.start()
+            workers.append(worker)
+        return transport
+
+    yield start_workers
+
+    transport.close()
+    for worker in workers:
+        worker.join(timeout=5)
+
+
+def test_socket_batch_success_and_failure(socket_batch):
+    transport = socket_batch(2)
+    results = BatchCoordinator(
+        transport, max_retries=1, task_timeout=30, poll_interval=0.1
+    ).run("test", ["ok.json", "fail.json", "flaky.json"])
+
+    results = results_by_plan(results)
+    assert results["ok.json"]["status"] == FINISHED
+    assert results["fail.json"]["status"] == ERROR
+    assert results["fail.json"]["attempts"] == 2
+    assert results["flaky.json"]["status"] == FINISHED
+    assert results["flaky.json"]["attempts"] == 2
+
+
+def test_socket_batch_drops_late_result_of_timed_out_attempt(socket_batch):
+    transport = socket_batch(2)
+    results = BatchCoordinator(
+        transport, max_retries=1, task_timeout=2, poll_interval=0.1
+    ).run("test", ["late.json"])
+
+    # The failure of the first attempt arrives while the retry runs, and is not counted against the retry.
+    assert results[0]["status"] == FINISHED
+    assert results[0]["attempts"] == 2
+    assert results[0]["attempt"] == 1
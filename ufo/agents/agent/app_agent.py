@@ -5,7 +5,8 @@
 from __future__ import annotations
 
 import os
-from typing import Dict, List, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from ufo import utils
 from ufo.agents.agent.basic import BasicAgent
@@ -15,6 +16,8 @@ from ufo.automator import puppeteer
 from ufo.config.config import Config
 from ufo.module import interactor
 from ufo.module.context import Context
+from ufo.module.trajectory_cache import TrajectoryReplay, get_trajectory_cache
+from ufo.module.warmup import get_warmup, retriever_key
 from ufo.prompter.agent_prompter import AppAgentPrompter
 
 configs = Config.get_instance().config_data
@@ -62,6 +65,30 @@ class AppAgent(BasicAgent):
         self.Puppeteer = self.create_puppteer_interface()
         self.set_state(ContinueAppAgentState())
 
+        # The prompt parts which do not depend on the screenshot, prepared in the background for the round id and the request.
+        self._prompt_parts: Dict[Tuple[int, str], Future] = {}
+        self._prefetch_executor: Optional[ThreadPoolExecutor] = None
+
+        # The replay of the cached actions of the current subtask, and the round, index and text of the subtask.
+        self._trajectory_replay: Optional[TrajectoryReplay] = None
+        self._trajectory_replay_subtask: Optional[Tuple[int, int, str]] = None
+
+    @property
+    def process_name(self) -> str:
+        """
+        Get the process name of the app.
+        :return: The process name of the app.
+        """
+        return self._process_name
+
+    @property
+    def app_root_name(self) -> str:
+        """
+        Get the root name of the app.
+        :return: The root name of the app.
+        """
+        return self._app_root_name
+
     def get_prompter(
         self,
         is_visual: bool,
@@ -130,7 +157,7 @@ class AppAgent(BasicAgent):
 
         if not self.blackboard.is_empty():
 
-            blackboard_prompt = self.blackboard.blackboard_to_prompt()
+            blackboard_prompt = self.blackboard.blackboard_to_prompt(subtask)
             appagent_prompt_user_message = (
                 blackboard_prompt + appagent_prompt_user_message
             )
@@ -286,6 +313,81 @@ class AppAgent(BasicAgent):
 
         return examples, tips
 
+    def get_trajectory_replay(
+        self, subtask_id: Tuple[int, int, str], is_first_step: bool
+    ) -> Optional[TrajectoryReplay]:
+        """
+        Get the replay of the cached actions of a subtask. The trajectory cache is looked up at the first step of the
+        subtask only, so that a subtask resumed or taken over by the LLM is not replayed from its start.
+        :param subtask_id: The round, the index and the text of the subtask.
+        :param is_first_step: Whether it is the first step of the subtask.
+        :return: The replay with actions left, or None.
+        """
+        if self._trajectory_replay_subtask != subtask_id:
+            self._trajectory_replay_subtask = subtask_id
+            self._trajectory_replay = None
+
+            if is_first_step:
+                self._trajectory_replay = get_trajectory_cache().start_replay(
+                    self.app_root_name, subtask_id[2]
+                )
+
+                if self._trajectory_replay is not None:
+                    utils.print_with_color(
+                        "Replaying the {num} cached actions of the subtask.".format(
+                            num=len(self._trajectory_replay.actions)
+                        ),
+                        "magenta",
+                    )
+
+        replay = self._trajectory_replay
+        if replay is None or not replay.active or not replay.actions:
+            return None
+
+        return replay
+
+    def prefetch_prompt_parts(
+        self, key: Tuple[int, str], builder: Callable[[], Any]
+    ) -> Future:
+        """
+        Prepare the prompt parts which do not depend on the screenshot, e.g. the retrieved examples and documents,
+        on a background thread. They only depend on the request, so they are prepared once for the steps of a round.
+        :param key: The round id and the request of the round. The parts of another round are discarded, even for the same request.
+        :param builder: The function preparing the prompt parts.
+        :return: The future of the prompt parts.
+        """
+        future = self._prompt_parts.get(key)
+
+        if future is None:
+            # Only the parts of the current round are kept, a pending retrieval of an earlier round is cancelled.
+            for stale_future in self._prompt_parts.values():
+                stale_future.cancel()
+
+            if self._prefetch_executor is None:
+                self._prefetch_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="prompt-prefetch"
+                )
+            future = self._prefetch_executor.submit(builder)
+            self._prompt_parts = {key: future}
+
+        return future
+
+    def get_prompt_parts(self, key: Tuple[int, str], builder: Callable[[], Any]) -> Any:
+        """
+        Get the prompt parts of a round, waiting for them if they are still being prepared.
+        :param key: The round id and the request of the round.
+        :param builder: The function preparing the prompt parts, if they are not prefetched.
+        :return: The prompt parts.
+        """
+        future = self.prefetch_prompt_parts(key, builder)
+
+        try:
+            return future.result()
+        except Exception:
+            # The failed parts are prepared again in the next step.
+            self._prompt_parts.pop(key, None)
+            raise
+
     def process(self, context: Context) -> None:
         """
         Process the agent.
@@ -348,8 +450,10 @@ class AppAgent(BasicAgent):
         :param db_path: The path to the experience database.
         :return: The experience retriever.
         """
-        self.experience_retriever = self.retriever_factory.create_retriever(
-            "experience", db_path
+        # The experience index may be preloaded by the warm-up of the session.
+        self.experience_retriever = get_warmup().take(
+            retriever_key("experience", db_path),
+            lambda: self.retriever_factory.create_retriever("experience", db_path),
         )
 
     def build_human_demonstration_retriever(self, db_path: str) -> None:
@@ -358,8 +462,10 @@ class AppAgent(BasicAgent):
         :param db_path: The path to the human demonstration database.
         :return: The human demonstration retriever.
         """
-        self.human_demonstration_retriever = self.retriever_factory.create_retriever(
-            "demonstration", db_path
+        # The demonstration index may be preloaded by the warm-up of the session.
+        self.human_demonstration_retriever = get_warmup().take(
+            retriever_key("demonstration", db_path),
+            lambda: self.retriever_factory.create_retriever("demonstration", db_path),
         )
 
     def context_provision(self, request: str = "") -> None:
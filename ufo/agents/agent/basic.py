@@ -44,12 +44,22 @@ class BasicAgent(ABC):
         self._name = name
         self._status = self.status_manager.CONTINUE.value
         self._register_self()
-        self.retriever_factory = retriever.RetrieverFactory()
+        self._retriever_factory = None
         self._memory = Memory()
         self._host = None
         self._processor: Optional[BaseProcessor] = None
         self._state = None
 
+    @property
+    def retriever_factory(self) -> retriever.RetrieverFactory:
+        """
+        Get the retriever factory. The retriever dependencies are imported when the first retriever is built.
+        :return: The retriever factory.
+        """
+        if self._retriever_factory is None:
+            self._retriever_factory = retriever.RetrieverFactory()
+        return self._retriever_factory
+
     @property
     def status(self) -> str:
         """
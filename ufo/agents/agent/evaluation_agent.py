@@ -113,7 +113,8 @@ class EvaluationAgent(BasicAgent):
         """
         pass
 
-    def print_response(self, response_dict: Dict[str, Any]) -> None:
+    @staticmethod
+    def print_response(response_dict: Dict[str, Any]) -> None:
         """
         Print the response of the evaluation.
         :param response_dict: The response dictionary.
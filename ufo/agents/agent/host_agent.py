@@ -4,7 +4,6 @@
 
 from __future__ import annotations
 
-import time
 from typing import Dict, List, Union
 
 from pywinauto.controls.uiawrapper import UIAWrapper
@@ -21,6 +20,7 @@ from ufo.automator.ui_control.inspector import ControlInspectorFacade
 from ufo.config.config import Config
 from ufo.module.context import Context
 from ufo.prompter.agent_prompter import HostAgentPrompter
+from ufo.utils.ui_wait import wait_for_ui_idle
 
 configs = Config.get_instance().config_data
 
@@ -161,6 +161,13 @@ class HostAgent(BasicAgent):
         """
         return self._active_appagent
 
+    def set_active_appagent(self, agent_name: str) -> None:
+        """
+        Set the active app agent.
+        :param agent_name: The name of the app agent.
+        """
+        self._active_appagent = self.appagent_dict[agent_name]
+
     @property
     def blackboard(self):
         """
@@ -195,7 +202,7 @@ class HostAgent(BasicAgent):
         )
 
         if not self.blackboard.is_empty():
-            blackboard_prompt = self.blackboard.blackboard_to_prompt()
+            blackboard_prompt = self.blackboard.blackboard_to_prompt(request)
             hostagent_prompt_user_message = (
                 blackboard_prompt + hostagent_prompt_user_message
             )
@@ -216,7 +223,7 @@ class HostAgent(BasicAgent):
         utils.print_with_color("Opening the required application or file...", "yellow")
         file_manager = openfile.FileController()
         results = file_manager.execute_code(app_file_info)
-        time.sleep(configs.get("SLEEP_TIME", 5))
+        wait_for_ui_idle()
         desktop_windows_dict = ControlInspectorFacade(
             configs["CONTROL_BACKEND"]
         ).get_desktop_app_dict(remove_empty=True)
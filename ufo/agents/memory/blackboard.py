@@ -2,13 +2,16 @@
 # Licensed under the MIT License.
 
 import json
+import math
 import os
+import re
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 from ufo.agents.memory.memory import Memory, MemoryItem
 from ufo.automator.ui_control.screenshot import PhotographerFacade
 from ufo.config.config import Config
+from ufo.utils import iter_json_lines
 
 configs = Config.get_instance().config_data
 
@@ -21,16 +24,16 @@ class ImageMemoryItemNames:
 
     METADATA: str = "metadata"
     IMAGE_PATH: str = "image_path"
-    IMAGE_STR: str = "image_str"
 
 
 @dataclass
 class ImageMemoryItem(MemoryItem):
     """
-    The class for the image memory item.
+    The class for the image memory item. It only keeps a handle to the image file,
+    which is encoded when the image is added to a prompt.
     """
 
-    _memory_attributes = list(ImageMemoryItemNames.__annotations__.keys())
+    __slots__ = ()
 
 
 class Blackboard:
@@ -47,6 +50,14 @@ class Blackboard:
         self._trajectories: Memory = Memory()
         self._screenshots: Memory = Memory()
 
+        # The JSON strings of the text memory items, memoized by the id of their memory.
+        self._serialized_items: Dict[int, List[str]] = {}
+
+        # The trajectories before this index are rolled into the summary.
+        self._summary_end = 0
+        self._summary_lines: List[str] = []
+        self._trajectory_summary = ""
+
         if configs.get("USE_CUSTOMIZATION", False):
             self.load_questions(
                 configs.get("QA_PAIR_FILE", ""), configs.get("QA_PAIR_NUM", -1)
@@ -134,28 +145,19 @@ class Blackboard:
         metadata: Optional[Dict[str, str]] = None,
     ) -> None:
         """
-        Add the image to the blackboard.
+        Add the image to the blackboard. Only the path of the image is stored, the image is encoded when it is added to a prompt.
         :param screenshot_path: The path of the image.
         :param metadata: The metadata of the image.
         """
 
-        if os.path.exists(screenshot_path):
-
-            screenshot_str = PhotographerFacade().encode_image_from_path(
-                screenshot_path
-            )
-        else:
+        if not os.path.exists(screenshot_path):
             print(f"Screenshot path {screenshot_path} does not exist.")
-            screenshot_str = ""
 
         image_memory_item = ImageMemoryItem()
         image_memory_item.set_values_from_dict(
             {
-                ImageMemoryItemNames.METADATA: metadata.get(
-                    ImageMemoryItemNames.METADATA
-                ),
+                ImageMemoryItemNames.METADATA: metadata,
                 ImageMemoryItemNames.IMAGE_PATH: screenshot_path,
-                ImageMemoryItemNames.IMAGE_STR: screenshot_str,
             }
         )
 
@@ -199,6 +201,23 @@ class Blackboard:
         for qa in qa_list:
             self.add_questions(qa)
 
+    def serialize_items(self, memory: Memory) -> List[str]:
+        """
+        Get the JSON strings of the items in a memory. The items are only appended to the blackboard,
+        so the strings of the unchanged prefix are memoized and only the new items are serialized.
+        :param memory: The memory.
+        :return: The JSON strings of the items.
+        """
+        serialized = self._serialized_items.setdefault(id(memory), [])
+
+        if len(serialized) > memory.length:
+            serialized.clear()
+
+        for item in memory.content[len(serialized) :]:
+            serialized.append(item.to_json())
+
+        return serialized
+
     def texts_to_prompt(self, memory: Memory, prefix: str) -> List[str]:
         """
         Convert the data to a prompt.
@@ -206,19 +225,208 @@ class Blackboard:
         """
 
         user_content = [
-            {"type": "text", "text": f"{prefix}\n {json.dumps(memory.list_content)}"}
+            {
+                "type": "text",
+                "text": f"{prefix}\n [{', '.join(self.serialize_items(memory))}]",
+            }
         ]
 
         return user_content
 
-    def screenshots_to_prompt(self) -> List[str]:
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """
+        Estimate the number of tokens of a text, about 4 characters per token.
+        :param text: The text.
+        :return: The estimated number of tokens.
+        """
+        return len(text) // 4 + 1
+
+    def trajectories_to_prompt(self, prefix: str) -> List[str]:
+        """
+        Convert the trajectories to a prompt within the BLACKBOARD_TRAJECTORY_TOKEN_BUDGET.
+        The recent trajectories are kept verbatim and the older ones are rolled into a summary.
+        :param prefix: The prefix of the verbatim trajectories.
+        :return: The prompt.
+        """
+        budget = configs.get("BLACKBOARD_TRAJECTORY_TOKEN_BUDGET", -1)
+
+        if budget < 0:
+            return self.texts_to_prompt(self.trajectories, prefix)
+
+        serialized = self.serialize_items(self.trajectories)
+        if len(serialized) < self._summary_end:
+            self._reset_summary()
+
+        self._update_summary(serialized, budget)
+
+        user_content = []
+        if self._summary_end > 0:
+            user_content.append(
+                {
+                    "type": "text",
+                    "text": f"[Earlier Step Trajectories Summary:]\n{self._trajectory_summary}",
+                }
+            )
+        user_content.append(
+            {
+                "type": "text",
+                "text": f"{prefix}\n [{', '.join(serialized[self._summary_end :])}]",
+            }
+        )
+
+        return user_content
+
+    def _update_summary(self, serialized: List[str], budget: int) -> None:
+        """
+        Roll the oldest trajectories into the summary until the verbatim ones fit in three quarters of the budget,
+        the summary is bounded to the remaining quarter. The summary is refreshed every BLACKBOARD_SUMMARY_REFRESH rolled trajectories, so that the prompt prefix stays
+        unchanged between refreshes. The latest trajectory is always kept verbatim.
+        :param serialized: The JSON strings of the trajectories.
+        :param budget: The token budget of the trajectories.
+        """
+        verbatim_budget = budget - budget // 4
+        start = len(serialized)
+        used = 0
+
+        while start > self._summary_end:
+            tokens = self.estimate_tokens(serialized[start - 1])
+            if used + tokens > verbatim_budget:
+                break
+            used += tokens
+            start -= 1
+
+        if start <= self._summary_end:
+            return
+
+        refresh = max(1, configs.get("BLACKBOARD_SUMMARY_REFRESH", 5))
+        end = min(
+            len(serialized) - 1,
+            self._summary_end
+            + math.ceil((start - self._summary_end) / refresh) * refresh,
+        )
+
+        if end <= self._summary_end:
+            return
+
+        for item in self.trajectories.content[self._summary_end : end]:
+            self._summary_lines.append(self.summarize_trajectory(item.to_dict()))
+        self._summary_end = end
+
+        # The oldest lines are dropped first from the summary.
+        lines = []
+        used = 0
+        for line in reversed(self._summary_lines):
+            used += self.estimate_tokens(line)
+            if used > budget // 4:
+                break
+            lines.append(line)
+
+        omitted = len(self._summary_lines) - len(lines)
+        if omitted > 0:
+            lines.append(f"({omitted} earlier steps omitted)")
+
+        self._trajectory_summary = "\n".join(reversed(lines))
+
+    @staticmethod
+    def summarize_trajectory(trajectory: Dict[str, Any]) -> str:
+        """
+        Summarize a trajectory into one line with the BLACKBOARD_SUMMARY_KEYS.
+        :param trajectory: The trajectory.
+        :return: The summary line.
+        """
+        max_length = configs.get("BLACKBOARD_SUMMARY_VALUE_LENGTH", 100)
+        fields = []
+
+        for key in configs.get(
+            "BLACKBOARD_SUMMARY_KEYS",
+            ["Step", "Subtask", "Action", "ControlText", "Results"],
+        ):
+            value = trajectory.get(key)
+            if value in (None, "", [], {}):
+                continue
+            value = value if isinstance(value, str) else json.dumps(value)
+            if len(value) > max_length:
+                value = value[:max_length] + "..."
+            fields.append(f"{key}: {value}")
+
+        return "; ".join(fields)
+
+    def _reset_summary(self) -> None:
+        """
+        Reset the summary of the trajectories.
+        """
+        self._summary_end = 0
+        self._summary_lines = []
+        self._trajectory_summary = ""
+
+    def select_screenshots(self, query: str = "") -> List[Dict[str, str]]:
+        """
+        Select the screenshots to add to a prompt, at most BLACKBOARD_MAX_IMAGES of them.
+        With the "relevant" BLACKBOARD_IMAGE_SELECTION, the screenshots whose metadata share the most words with the query are selected,
+        otherwise the most recent ones.
+        :param query: The query to select the relevant screenshots for, e.g. the current request.
+        :return: The selected screenshots in the order they were saved.
+        """
+        screenshots = self.screenshots.list_content
+        max_images = configs.get("BLACKBOARD_MAX_IMAGES", -1)
+
+        if max_images < 0 or len(screenshots) <= max_images:
+            return screenshots
+
+        if configs.get("BLACKBOARD_IMAGE_SELECTION", "recent") == "relevant" and query:
+            query_words = self._words(query)
+            ranked = sorted(
+                range(len(screenshots)),
+                key=lambda i: (
+                    len(
+                        query_words
+                        & self._words(
+                            json.dumps(
+                                screenshots[i].get(ImageMemoryItemNames.METADATA, "")
+                            )
+                        )
+                    ),
+                    i,
+                ),
+                reverse=True,
+            )
+            selected = sorted(ranked[:max_images])
+        else:
+            selected = range(len(screenshots) - max_images, len(screenshots))
+
+        return [screenshots[i] for i in selected]
+
+    @staticmethod
+    def _words(text: str) -> set:
         """
-        Convert the images to a prompt.
+        Get the set of lower-cased words in a text.
+        :param text: The text.
+        :return: The set of words.
+        """
+        return set(re.findall(r"\w+", text.lower()))
+
+    def screenshots_to_prompt(self, query: str = "") -> List[str]:
+        """
+        Convert the images to a prompt. The images are encoded through the shared encoded image cache.
+        :param query: The query to select the relevant screenshots for.
         :return: The prompt.
         """
 
         user_content = []
-        for screenshot_dict in self.screenshots.list_content:
+        screenshots = self.select_screenshots(query)
+
+        omitted = self.screenshots.length - len(screenshots)
+        if omitted > 0:
+            user_content.append(
+                {
+                    "type": "text",
+                    "text": f"[{omitted} other screenshots on the blackboard are omitted.]",
+                }
+            )
+
+        for screenshot_dict in screenshots:
+            image_path = screenshot_dict.get(ImageMemoryItemNames.IMAGE_PATH, "")
             user_content.append(
                 {
                     "type": "text",
@@ -227,20 +435,25 @@ class Blackboard:
                     ),
                 }
             )
+            if not os.path.exists(image_path):
+                continue
             user_content.append(
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": screenshot_dict.get(ImageMemoryItemNames.IMAGE_STR, "")
+                        "url": PhotographerFacade.encode_image_from_path_cached(
+                            image_path
+                        )
                     },
                 }
             )
 
         return user_content
 
-    def blackboard_to_prompt(self) -> List[str]:
+    def blackboard_to_prompt(self, query: str = "") -> List[str]:
         """
         Convert the blackboard to a prompt.
+        :param query: The query to select the relevant screenshots for, e.g. the current request.
         :return: The prompt.
         """
         prefix = [
@@ -254,8 +467,8 @@ class Blackboard:
             prefix
             + self.texts_to_prompt(self.questions, "[Questions & Answers:]")
             + self.texts_to_prompt(self.requests, "[Request History:]")
-            + self.texts_to_prompt(self.trajectories, "[Step Trajectories:]")
-            + self.screenshots_to_prompt()
+            + self.trajectories_to_prompt("[Step Trajectories:]")
+            + self.screenshots_to_prompt(query)
         )
 
         return blackboard_prompt
@@ -280,9 +493,11 @@ class Blackboard:
         self.requests.clear()
         self.trajectories.clear()
         self.screenshots.clear()
+        self._serialized_items.clear()
+        self._reset_summary()
 
     @staticmethod
-    def read_json_file(file_path: str, last_k=-1) -> Dict[str, str]:
+    def read_json_file(file_path: str, last_k=-1) -> List[Dict[str, str]]:
         """
         Read the json file.
         :param file_path: The path of the file.
@@ -290,27 +505,20 @@ class Blackboard:
         :return: The data in the file.
         """
 
-        data_list = []
-
         # Check if the file exists
-        if os.path.exists(file_path):
-            # Open the file and read the lines
-            with open(file_path, "r", encoding="utf-8") as file:
-                lines = file.readlines()
-
-            # If last_k is not -1, only read the last k lines
-            if last_k != -1:
-                lines = lines[-last_k:]
-
-            # Parse the lines as JSON
-            for line in lines:
-                try:
-                    data = json.loads(line.strip())
-                    data_list.append(data)
-                except json.JSONDecodeError:
-                    print(f"Warning: Unable to parse line as JSON: {line}")
-
-        return data_list
+        if not os.path.exists(file_path):
+            return []
+
+        # Only the tail of the file is read when last_k is set.
+        return list(
+            iter_json_lines(
+                file_path,
+                last_k,
+                on_error=lambda line, _: print(
+                    f"Warning: Unable to parse line as JSON: {line}"
+                ),
+            )
+        )
 
 
 if __name__ == "__main__":
@@ -3,36 +3,72 @@
 
 from __future__ import annotations
 
+import argparse
 import json
+import time
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+# The values which cannot be changed in place, so that the JSON string of an item holding only them stays valid.
+_FROZEN_TYPES = (str, int, float, bool, type(None))
 
 
 @dataclass
 class MemoryItem:
     """
     This data class represents a memory item of an agent at one step.
+    The fields of each item are kept in its own dictionary, in the order they are first set.
     """
 
-    _memory_attributes = []
+    __slots__ = ("_values", "_json_cache")
+
+    def __post_init__(self) -> None:
+        """
+        Initialize the fields of the memory item.
+        """
+        self._values: Dict[str, Any] = {}
+        self._json_cache: Optional[str] = None
+
+    def __getattr__(self, key: str) -> Any:
+        """
+        Get a field of the memory item as an attribute, e.g. item.step.
+        :param key: The key of the field.
+        :return: The value of the field.
+        """
+        # The slots are looked up here when they are not set yet, e.g. while unpickling.
+        if key in MemoryItem.__slots__ or key.startswith("__"):
+            raise AttributeError(key)
+
+        try:
+            return self._values[key]
+        except KeyError:
+            raise AttributeError(
+                "'{cls}' object has no attribute '{key}'".format(
+                    cls=type(self).__name__, key=key
+                )
+            ) from None
 
     def to_dict(self) -> Dict[str, str]:
         """
         Convert the MemoryItem to a dictionary.
         :return: The dictionary.
         """
-        return {
-            key: value
-            for key, value in self.__dict__.items()
-            if key in self._memory_attributes
-        }
+        return dict(self._values)
 
     def to_json(self) -> str:
         """
-        Convert the memory item to a JSON string.
+        Convert the memory item to a JSON string. The string is cached until a field is set,
+        only if the values cannot be changed in place, e.g. a list returned by get_value.
         :return: The JSON string.
         """
-        return json.dumps(self.to_dict())
+        if self._json_cache is not None:
+            return self._json_cache
+
+        json_string = json.dumps(self._values)
+        if all(isinstance(value, _FROZEN_TYPES) for value in self._values.values()):
+            self._json_cache = json_string
+
+        return json_string
 
     def filter(self, keys: List[str] = []) -> None:
         """
@@ -41,7 +77,7 @@ class MemoryItem:
         :return: The filtered memory item.
         """
 
-        return {key: value for key, value in self.to_dict().items() if key in keys}
+        return {key: value for key, value in self._values.items() if key in keys}
 
     def set_value(self, key: str, value: str) -> None:
         """
@@ -49,10 +85,8 @@ class MemoryItem:
         :param key: The key of the field.
         :param value: The value of the field.
         """
-        setattr(self, key, value)
-
-        if key not in self._memory_attributes:
-            self._memory_attributes.append(key)
+        self._values[key] = value
+        self._json_cache = None
 
     def set_values_from_dict(self, values: Dict[str, Any]) -> None:
         """
@@ -69,7 +103,7 @@ class MemoryItem:
         :return: The value of the field.
         """
 
-        return getattr(self, key, None)
+        return self._values.get(key)
 
     def get_values(self, keys: List[str]) -> dict:
         """
@@ -85,16 +119,49 @@ class MemoryItem:
         Get the attributes of the memory item.
         :return: The attributes.
         """
-        return self._memory_attributes
+        return list(self._values)
 
 
 @dataclass
 class Memory:
     """
     This data class represents a memory of an agent.
+    The items are indexed by their step, so that they can be looked up without scanning the memory.
     """
 
     _content: List[MemoryItem] = field(default_factory=list)
+    # The items of each step with their positions of insertion, in the order of the memory.
+    _step_index: Dict[Any, List[Tuple[int, MemoryItem]]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+    _next_position: int = field(default=0, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        """
+        Index the initial content of the memory.
+        """
+        self._rebuild_index()
+
+    def _rebuild_index(self) -> None:
+        """
+        Rebuild the step index from the content of the memory.
+        """
+        self._step_index = {}
+        self._next_position = 0
+
+        for memory_item in self._content:
+            self._index_item(memory_item)
+
+    def _index_item(self, memory_item: MemoryItem) -> None:
+        """
+        Add a memory item to the step index.
+        :param memory_item: The memory item to index.
+        """
+        if memory_item is not None:
+            self._step_index.setdefault(getattr(memory_item, "step", None), []).append(
+                (self._next_position, memory_item)
+            )
+        self._next_position += 1
 
     def load(self, content: List[MemoryItem]) -> None:
         """
@@ -102,6 +169,7 @@ class Memory:
         :param content: The content to load.
         """
         self._content = content
+        self._rebuild_index()
 
     def filter_memory_from_steps(self, steps: List[int]) -> List[Dict[str, str]]:
         """
@@ -109,7 +177,12 @@ class Memory:
         :param steps: The steps to filter.
         :return: The filtered memory.
         """
-        return [item.to_dict() for item in self._content if item.step in steps]
+        entries = [
+            entry for step in set(steps) for entry in self._step_index.get(step, [])
+        ]
+        entries.sort(key=lambda entry: entry[0])
+
+        return [memory_item.to_dict() for _, memory_item in entries]
 
     def filter_memory_from_keys(self, keys: List[str]) -> List[Dict[str, str]]:
         """
@@ -125,12 +198,14 @@ class Memory:
         :param memory_item: The memory item to add.
         """
         self._content.append(memory_item)
+        self._index_item(memory_item)
 
     def clear(self) -> None:
         """
         Clear the memory.
         """
         self._content = []
+        self._rebuild_index()
 
     @property
     def length(self) -> int:
@@ -140,12 +215,29 @@ class Memory:
         """
         return len(self._content)
 
+    def get_memory_item(self, step: int) -> Optional[MemoryItem]:
+        """
+        Get the latest memory item of a step.
+        :param step: The step of the memory item.
+        :return: The memory item, or None if there is no item for the step.
+        """
+        entries = self._step_index.get(step)
+        if not entries:
+            return None
+        return entries[-1][1]
+
     def delete_memory_item(self, step: int) -> None:
         """
         Delete a memory item from the memory.
         :param step: The step of the memory item to delete.
         """
-        self._content = [item for item in self._content if item.step != step]
+        entries = self._step_index.pop(step, None)
+        if not entries:
+            return
+
+        deleted = {id(memory_item) for _, memory_item in entries}
+        self._content = [item for item in self._content if id(item) not in deleted]
+        self._rebuild_index()
 
     def to_json(self) -> str:
         """
@@ -153,8 +245,11 @@ class Memory:
         :return: The JSON string.
         """
 
-        return json.dumps(
-            [item.to_dict() for item in self._content if item is not None]
+        # The items are serialized separately, so their cached JSON strings are joined.
+        return "[{items}]".format(
+            items=", ".join(
+                item.to_json() for item in self._content if item is not None
+            )
         )
 
     def get_latest_item(self) -> MemoryItem:
@@ -188,3 +283,71 @@ class Memory:
         :return: The boolean value indicating if the memory is empty.
         """
         return self.length == 0
+
+
+def benchmark(
+    num_steps: int = 10000,
+    num_keys: int = 20,
+    num_checkpoints: int = 5,
+    repeats: int = 1000,
+) -> List[Dict[str, float]]:
+    """
+    Benchmark the cost of serializing a memory item as a session accumulates steps.
+    Every step sets a key of its own besides the common keys, so the cost must not grow with the number of steps.
+    :param num_steps: The number of steps of the session.
+    :param num_keys: The number of common keys of each memory item.
+    :param num_checkpoints: The number of times the cost is measured during the session.
+    :param repeats: The number of serializations per measurement.
+    :return: The benchmark results at each checkpoint.
+    """
+    memory = Memory()
+    interval = max(1, num_steps // num_checkpoints)
+    results = []
+
+    for step in range(1, num_steps + 1):
+        memory_item = MemoryItem()
+        memory_item.set_values_from_dict(
+            {"Step": step, **{"Field{i}".format(i=i): i for i in range(num_keys)}}
+        )
+        memory_item.set_value("Step{step}Result".format(step=step), "")
+        memory.add_memory_item(memory_item)
+
+        if step % interval:
+            continue
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            memory_item.to_dict()
+        to_dict_time = (time.perf_counter() - start) / repeats
+
+        results.append(
+            {
+                "steps": step,
+                "to_dict_us": to_dict_time * 1e6,
+                "attributes": len(memory_item.attributes),
+            }
+        )
+
+    return results
+
+
+if __name__ == "__main__":
+
+    from ufo.utils import print_with_color
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_steps", type=int, default=10000)
+    parser.add_argument("--num_keys", type=int, default=20)
+    parser.add_argument("--num_checkpoints", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=1000)
+    args = parser.parse_args()
+
+    for result in benchmark(
+        args.num_steps, args.num_keys, args.num_checkpoints, args.repeats
+    ):
+        print_with_color(
+            "{steps} steps: to_dict {to_dict_us:.2f}us per item with {attributes} attributes".format(
+                **result
+            ),
+            "cyan",
+        )
@@ -5,18 +5,22 @@
 import json
 import os
 import time
-from typing import TYPE_CHECKING, Dict, List, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 from pywinauto.controls.uiawrapper import UIAWrapper
 
 from ufo import utils
 from ufo.agents.processors.basic import BaseProcessor
 from ufo.automator.ui_control.control_filter import ControlFilterFactory
+from ufo.automator.ui_control.snapshot import WindowSnapshotTaker, capture_rect
 from ufo.config.config import Config
 from ufo.module.context import Context, ContextNames
+from ufo.module.sessions.plan_compiler import PlanStep
+from ufo.module.warmup import control_filter_key, get_warmup
 
 if TYPE_CHECKING:
     from ufo.agents.agent.app_agent import AppAgent
+    from ufo.module.trajectory_cache import TrajectoryReplay
 
 configs = Config.get_instance().config_data
 BACKEND = configs["CONTROL_BACKEND"]
@@ -46,6 +50,9 @@ class AppAgentProcessor(BaseProcessor):
         self._image_url = []
         self.control_filter_factory = ControlFilterFactory()
         self.filtered_annotation_dict = None
+        self.snapshot_taker = WindowSnapshotTaker()
+        self._control_type = ""
+        self._direct_response: Optional[Dict[str, Any]] = None
 
     @property
     def action(self) -> str:
@@ -77,11 +84,28 @@ class AppAgentProcessor(BaseProcessor):
             "magenta",
         )
 
+    def get_control_list(self) -> List[UIAWrapper]:
+        """
+        Get the control elements in the application window if the control items are not provided for reannotation.
+        :return: The control elements.
+        """
+        if type(self.control_reannotate) == list and len(self.control_reannotate) > 0:
+            return self.control_reannotate
+
+        return self.control_inspector.find_control_elements_in_descendants(
+            self.application_window,
+            control_type_list=configs["CONTROL_LIST"],
+            class_name_list=configs["CONTROL_LIST"],
+        )
+
     def capture_screenshot(self) -> None:
         """
         Capture the screenshot.
         """
 
+        # The prompt parts which do not depend on the screenshot are prepared while the screenshot and the controls are collected.
+        self.prefetch_prompt_parts()
+
         # Define the paths for the screenshots saved.
         screenshot_save_path = self.log_path + f"action_step{self.session_step}.png"
         annotated_screenshot_save_path = (
@@ -99,35 +123,36 @@ class AppAgentProcessor(BaseProcessor):
             }
         )
 
-        # Get the control elements in the application window if the control items are not provided for reannotation.
-        if type(self.control_reannotate) == list and len(self.control_reannotate) > 0:
-            control_list = self.control_reannotate
-        else:
-            control_list = self.control_inspector.find_control_elements_in_descendants(
-                self.application_window,
-                control_type_list=configs["CONTROL_LIST"],
-                class_name_list=configs["CONTROL_LIST"],
+        # Get the control elements while the clean screenshot of the window rectangle is captured on a background thread.
+        snapshot = self.snapshot_taker.take(
+            self.application_window.rectangle,
+            self.get_control_list,
+            lambda rect: capture_rect(rect, save_path=screenshot_save_path),
+        )
+
+        if not snapshot.consistent:
+            utils.print_with_color(
+                "Warning: The application window kept moving while the screenshot was captured.",
+                "yellow",
             )
 
         # Get the annotation dictionary for the control items, in a format of {control_label: control_element}.
         self._annotation_dict = self.photographer.get_annotation_dict(
-            self.application_window, control_list, annotation_type="number"
+            self.application_window, snapshot.control_list, annotation_type="number"
         )
 
         # Attempt to filter out irrelevant control items based on the previous plan.
         self.filtered_annotation_dict = self.get_filtered_annotation_dict(
             self._annotation_dict
         )
-        self.photographer.capture_app_window_screenshot(
-            self.application_window, save_path=screenshot_save_path
-        )
 
-        # Capture the screenshot of the selected control items with annotation and save it.
+        # Annotate the selected control items on the clean screenshot and save it.
         self.photographer.capture_app_window_screenshot_with_annotation_dict(
             self.application_window,
             self.filtered_annotation_dict,
             annotation_type="number",
             save_path=annotated_screenshot_save_path,
+            screenshot=snapshot.screenshot,
         )
 
         # If the configuration is set to include the last screenshot with selected controls tagged, save the last screenshot.
@@ -193,17 +218,16 @@ class AppAgentProcessor(BaseProcessor):
 
     def get_prompt_message(self) -> None:
         """
-        Get the prompt message for the AppAgent.
+        Get the prompt message for the AppAgent. No prompt is needed if a cached action is replayed.
         """
 
-        examples, tips = self.demonstration_prompt_helper()
+        self._direct_response = self.get_direct_response()
 
-        # Get the external knowledge prompt for the AppAgent using the offline and online retrievers.
-        external_knowledge_prompt = self.app_agent.external_knowledge_prompt_helper(
-            self.request,
-            configs["RAG_OFFLINE_DOCS_RETRIEVED_TOPK"],
-            configs["RAG_ONLINE_RETRIEVED_TOPK"],
-        )
+        if self._direct_response is not None:
+            self._prompt_message = []
+            return
+
+        examples, tips, external_knowledge_prompt = self.get_prompt_parts()
 
         # Construct the prompt message for the AppAgent.
         self._prompt_message = self.app_agent.message_constructor(
@@ -221,22 +245,25 @@ class AppAgentProcessor(BaseProcessor):
         )
 
         # Log the prompt message. Only save them in debug mode.
-        log = json.dumps(
-            {
-                "step": self.session_step,
-                "prompt": self._prompt_message,
-                "control_items": self._control_info,
-                "filted_control_items": self.filtered_control_info,
-                "status": "",
-            }
-        )
+        log = {
+            "step": self.session_step,
+            "prompt": self._prompt_message,
+            "control_items": self._control_info,
+            "filted_control_items": self.filtered_control_info,
+            "status": "",
+        }
         self.request_logger.debug(log)
 
     def get_response(self) -> None:
         """
-        Get the response from the LLM.
+        Get the response from the LLM, or the response replaying a cached action without calling the LLM.
         """
 
+        if self._direct_response is not None:
+            self._response = json.dumps(self._direct_response)
+            self.cost = 0.0
+            return
+
         # Try to get the response from the LLM. If an error occurs, catch the exception and log the error.
         try:
             self._response, self.cost = self.app_agent.get_response(
@@ -291,6 +318,16 @@ class AppAgentProcessor(BaseProcessor):
                 control_selected.draw_outline(colour="red", thickness=3)
                 time.sleep(configs.get("RECTANGLE_TIME", 0))
 
+            # The control type is logged, so that the action can be replayed on the same control from the trajectory cache.
+            type_field = "control_type" if BACKEND == "uia" else "control_class"
+            self._control_type = (
+                self.control_inspector.get_control_info(
+                    control_selected, [type_field]
+                ).get(type_field, "")
+                if control_selected
+                else ""
+            )
+
             self.app_agent.Puppeteer.receiver_manager.create_ui_control_receiver(
                 control_selected, self.application_window
             )
@@ -364,11 +401,13 @@ class AppAgentProcessor(BaseProcessor):
             "SubtaskIndex": self.round_subtask_amount,
             "Action": self.action,
             "ActionType": self.app_agent.Puppeteer.get_command_types(self._operation),
+            "ControlType": self._control_type,
             "Request": self.request,
             "Agent": "ActAgent",
             "AgentName": self.app_agent.name,
             "Application": app_root,
             "Cost": self._cost,
+            "Latency": self.latency,
             "Results": self._results,
         }
         self._memory_data.set_values_from_dict(self._response_json)
@@ -379,9 +418,8 @@ class AppAgentProcessor(BaseProcessor):
 
         self.app_agent.add_memory(self._memory_data)
 
-        # Log the memory item.
-        self.context.add_to_structural_logs(self._memory_data.to_dict())
-        self.log(self._memory_data.to_dict())
+        # Log the memory item when the step ends.
+        self.log_memory()
 
         # Only memorize the keys in the HISTORY_KEYS list to feed into the prompt message in the future steps.
         memorized_action = {
@@ -428,6 +466,137 @@ class AppAgentProcessor(BaseProcessor):
         )
         self.app_agent.Puppeteer.save_to_xml(xml_save_path)
 
+    def get_trajectory_replay(self) -> Optional["TrajectoryReplay"]:
+        """
+        Get the replay of the cached actions of the current subtask, if the trajectory cache is enabled.
+        :return: The replay with actions left, or None.
+        """
+
+        if not configs.get("TRAJECTORY_CACHE", False):
+            return None
+
+        subtask_id = (self.round_num, self.round_subtask_amount, self.subtask)
+
+        # It is the first step of the subtask if the AppAgent has not acted on it yet, e.g. also after a resume.
+        latest_item = self.app_agent.memory.get_latest_item()
+        is_first_step = (
+            latest_item is None
+            or (
+                latest_item.get_value("Round"),
+                latest_item.get_value("SubtaskIndex"),
+                latest_item.get_value("Subtask"),
+            )
+            != subtask_id
+        )
+
+        return self.app_agent.get_trajectory_replay(subtask_id, is_first_step)
+
+    def has_direct_action(self) -> bool:
+        """
+        Check if the step is expected to replay an action without calling the LLM.
+        :return: True if an action is expected to be replayed, False otherwise.
+        """
+
+        return self.get_trajectory_replay() is not None
+
+    def get_direct_response(self) -> Optional[Dict[str, Any]]:
+        """
+        Get the response replaying the next cached action of the subtask, verified against the current controls.
+        :return: The response, or None if the step is to be completed with the LLM.
+        """
+
+        replay = self.get_trajectory_replay()
+
+        if replay is None:
+            return None
+
+        next_action = replay.next_action(self._control_info)
+
+        if next_action is None:
+            utils.print_with_color(
+                "The cached action does not match the window, complete the subtask with the LLM.",
+                "yellow",
+            )
+            return None
+
+        control_label, action, is_last = next_action
+
+        return self.replay_response(
+            control_label,
+            action,
+            (
+                self._agent_status_manager.FINISH.value
+                if is_last
+                else self._agent_status_manager.CONTINUE.value
+            ),
+            "The cached action of the subtask is replayed without calling the LLM.",
+        )
+
+    @staticmethod
+    def replay_response(
+        control_label: str, action: PlanStep, status: str, comment: str
+    ) -> Dict[str, Any]:
+        """
+        Compose the response of a recorded action replayed without calling the LLM.
+        :param control_label: The label of the control of the action.
+        :param action: The recorded action.
+        :param status: The status of the step.
+        :param comment: The comment of the response.
+        :return: The response.
+        """
+
+        return {
+            "Observation": "",
+            "Thought": "Replay the recorded action.",
+            "ControlLabel": control_label,
+            "ControlText": action.control_text or "",
+            "Function": action.function,
+            "Args": action.args,
+            "Status": status,
+            "Plan": "<FINISH>" if status == "FINISH" else [],
+            "Comment": comment,
+        }
+
+    def build_prompt_parts(self) -> Tuple[List[str], List[str], str]:
+        """
+        Retrieve the prompt parts which do not depend on the screenshot.
+        :return: The examples, the tips and the external knowledge prompt for the AppAgent.
+        """
+
+        examples, tips = self.demonstration_prompt_helper()
+
+        # Get the external knowledge prompt for the AppAgent using the offline and online retrievers.
+        external_knowledge_prompt = self.app_agent.external_knowledge_prompt_helper(
+            self.request,
+            configs["RAG_OFFLINE_DOCS_RETRIEVED_TOPK"],
+            configs["RAG_ONLINE_RETRIEVED_TOPK"],
+        )
+
+        return examples, tips, external_knowledge_prompt
+
+    def prefetch_prompt_parts(self) -> None:
+        """
+        Start preparing the prompt parts which do not depend on the screenshot in the background.
+        """
+
+        if configs.get("PROMPT_PREFETCH", False) and not self.has_direct_action():
+            self.app_agent.prefetch_prompt_parts(
+                (self.round_num, self.request), self.build_prompt_parts
+            )
+
+    def get_prompt_parts(self) -> Tuple[List[str], List[str], str]:
+        """
+        Get the prompt parts which do not depend on the screenshot, prefetched if PROMPT_PREFETCH is enabled.
+        :return: The examples, the tips and the external knowledge prompt for the AppAgent.
+        """
+
+        if configs.get("PROMPT_PREFETCH", False):
+            return self.app_agent.get_prompt_parts(
+                (self.round_num, self.request), self.build_prompt_parts
+            )
+
+        return self.build_prompt_parts()
+
     def demonstration_prompt_helper(self) -> Tuple[List[str], List[str]]:
         """
         Get the examples and tips for the AppAgent using the demonstration retriever.
@@ -498,8 +667,13 @@ class AppAgentProcessor(BaseProcessor):
 
         # Filter the annotation dictionary based on the semantic similarity of the control text and plan with their embeddings.
         if "semantic" in control_filter_type_lower:
-            model_semantic = self.control_filter_factory.create_control_filter(
-                "semantic", configs["CONTROL_FILTER_MODEL_SEMANTIC_NAME"]
+            model_semantic = get_warmup().take(
+                control_filter_key(
+                    "semantic", configs["CONTROL_FILTER_MODEL_SEMANTIC_NAME"]
+                ),
+                lambda: self.control_filter_factory.create_control_filter(
+                    "semantic", configs["CONTROL_FILTER_MODEL_SEMANTIC_NAME"]
+                ),
             )
             filtered_semantic_dict = model_semantic.control_filter(
                 annotation_dict, plans, configs["CONTROL_FILTER_TOP_K_SEMANTIC"]
@@ -512,8 +686,11 @@ class AppAgentProcessor(BaseProcessor):
 
         # Filter the annotation dictionary based on the icon image icon and plan with their embeddings.
         if "icon" in control_filter_type_lower:
-            model_icon = self.control_filter_factory.create_control_filter(
-                "icon", configs["CONTROL_FILTER_MODEL_ICON_NAME"]
+            model_icon = get_warmup().take(
+                control_filter_key("icon", configs["CONTROL_FILTER_MODEL_ICON_NAME"]),
+                lambda: self.control_filter_factory.create_control_filter(
+                    "icon", configs["CONTROL_FILTER_MODEL_ICON_NAME"]
+                ),
             )
 
             cropped_icons_dict = self.photographer.get_cropped_icons_dict(
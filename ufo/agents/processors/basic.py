@@ -2,11 +2,11 @@
 # Licensed under the MIT License.
 
 
-import json
 import time
 import traceback
 from abc import ABC, abstractmethod
-from typing import List
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
 
 from pywinauto.controls.uiawrapper import UIAWrapper
 
@@ -17,6 +17,7 @@ from ufo.automator.ui_control.inspector import ControlInspectorFacade
 from ufo.automator.ui_control.screenshot import PhotographerFacade
 from ufo.config.config import Config
 from ufo.module.context import Context, ContextNames
+from ufo.utils.ui_wait import wait_for_ui_idle
 
 configs = Config.get_instance().config_data
 BACKEND = configs["CONTROL_BACKEND"]
@@ -50,12 +51,18 @@ class BaseProcessor(ABC):
         self._control_text = None
         self._response_json = {}
         self._memory_data = MemoryItem()
+        # Whether the memory item of the step is to be logged when the step ends.
+        self._log_memory = False
         self._results = None
         self._question_list = []
         self._agent_status_manager = self.agent.status_manager
         self._is_resumed = False
         self._action = None
         self._plan = None
+        self._start_time = time.time()
+        # The wall time of each phase of the step, and the (phase, start, duration, step) of each timed phase.
+        self._time_cost: Dict[str, float] = {}
+        self._trace_events: List[Tuple[str, float, float, int]] = []
 
     def process(self) -> None:
         """
@@ -74,49 +81,64 @@ class BaseProcessor(ABC):
         11. Update the step.
         """
 
-        # Step 1: Print the step information.
-        self.print_step_info()
+        self._start_time = time.time()
 
-        # Step 2: Capture the screenshot.
-        self.capture_screenshot()
+        try:
+            # Step 1: Print the step information.
+            self.print_step_info()
 
-        # Step 3: Get the control information.
-        self.get_control_info()
+            # Step 2: Capture the screenshot.
+            with self.time_phase("capture_screenshot"):
+                self.capture_screenshot()
 
-        # Step 4: Get the prompt message.
-        self.get_prompt_message()
+            # Step 3: Get the control information.
+            with self.time_phase("get_control_info"):
+                self.get_control_info()
 
-        # Step 5: Get the response.
-        self.get_response()
+            # Step 4: Get the prompt message.
+            with self.time_phase("get_prompt_message"):
+                self.get_prompt_message()
 
-        if self.is_error():
-            return
+            # Step 5: Get the response.
+            with self.time_phase("get_response"):
+                self.get_response()
 
-        # Step 6: Update the context.
-        self.update_cost()
+            if self.is_error():
+                return
 
-        # Step 7: Parse the response, if there is no error.
-        self.parse_response()
+            # Step 6: Update the context.
+            self.update_cost()
 
-        if self.is_error() or self.is_paused():
-            # If the session is pending, update the step and memory, and return.
-            if self.is_pending():
-                self.update_step()
-                self.update_memory()
+            # Step 7: Parse the response, if there is no error.
+            with self.time_phase("parse_response"):
+                self.parse_response()
+
+            if self.is_error() or self.is_paused():
+                # If the session is pending, update the step and memory, and return.
+                if self.is_pending():
+                    self.update_step()
+                    with self.time_phase("update_memory"):
+                        self.update_memory()
 
-            return
+                return
 
-        # Step 8: Execute the action.
-        self.execute_action()
+            # Step 8: Execute the action.
+            with self.time_phase("execute_action"):
+                self.execute_action()
 
-        # Step 9: Update the memory.
-        self.update_memory()
+            # Step 9: Update the memory.
+            with self.time_phase("update_memory"):
+                self.update_memory()
 
-        # Step 10: Update the status.
-        self.update_status()
+            # Step 10: Update the status.
+            with self.time_phase("update_status"):
+                self.update_status()
 
-        # Step 11: Update the context.
-        self.update_step()
+            # Step 11: Update the context.
+            self.update_step()
+
+        finally:
+            self.update_time_cost()
 
     def resume(self) -> None:
         """
@@ -124,21 +146,76 @@ class BaseProcessor(ABC):
         """
 
         self._is_resumed = True
+        self._time_cost = {}
+
+        try:
+            # Step 1: Execute the action.
+            with self.time_phase("execute_action"):
+                self.execute_action()
 
-        # Step 1: Execute the action.
-        self.execute_action()
+            # Step 2: Update the memory.
+            with self.time_phase("update_memory"):
+                self.update_memory()
 
-        # Step 2: Update the memory.
-        self.update_memory()
+            # Step 3: Update the status.
+            with self.time_phase("update_status"):
+                self.update_status()
 
-        # Step 3: Update the status.
-        self.update_status()
+            # Step 4: Update the step.
+            self.update_step()
 
-        # Step 4: Update the step.
-        self.update_step()
+        finally:
+            self.update_time_cost()
 
         self._is_resumed = False
 
+    @contextmanager
+    def time_phase(self, phase: str) -> Iterator[None]:
+        """
+        Measure the wall time of a phase of the step.
+        :param phase: The name of the phase.
+        """
+        start = time.time()
+        step = self.session_step
+
+        try:
+            yield
+        finally:
+            duration = time.time() - start
+            self._time_cost[phase] = self._time_cost.get(phase, 0) + duration
+            self._trace_events.append((phase, start, duration, step))
+
+    def update_time_cost(self) -> None:
+        """
+        Add the time cost of the phases of the step to the round and the session, and record their trace events if configured.
+        The memory item of the step is logged here, with the time cost of all the phases of the step.
+        """
+        self.context.add_time_cost(self._time_cost)
+
+        if self._log_memory:
+            self._log_memory = False
+            self._memory_data.set_values_from_dict({"TimeCost": self.time_cost})
+            self.context.add_to_structural_logs(self._memory_data.to_dict())
+            self.log(self._memory_data.to_dict())
+
+        if configs.get("TRACE_EXPORT", False):
+            trace = self.context.get(ContextNames.TIME_TRACE)
+            for phase, start, duration, step in self._trace_events:
+                trace.append(
+                    {
+                        "name": phase,
+                        "cat": self.agent.__class__.__name__,
+                        "ph": "X",
+                        "ts": start * 1e6,
+                        "dur": duration * 1e6,
+                        "pid": self.context.get(ContextNames.ID),
+                        "tid": self.agent.name,
+                        "args": {"step": step, "round": self.round_num},
+                    }
+                )
+
+        self._trace_events = []
+
     @abstractmethod
     def print_step_info(self) -> None:
         """
@@ -203,7 +280,7 @@ class BaseProcessor(ABC):
         self.agent.status = self.status
 
         if self.status != self._agent_status_manager.FINISH.value:
-            time.sleep(configs["SLEEP_TIME"])
+            wait_for_ui_idle(self.application_window)
 
     @property
     def context(self) -> Context:
@@ -436,6 +513,22 @@ class BaseProcessor(ABC):
         """
         self._action = action
 
+    @property
+    def time_cost(self) -> Dict[str, float]:
+        """
+        Get the wall time of each phase of the step so far.
+        :return: The time cost in seconds of each phase.
+        """
+        return {phase: round(seconds, 3) for phase, seconds in self._time_cost.items()}
+
+    @property
+    def latency(self) -> float:
+        """
+        Get the time elapsed since the step started.
+        :return: The latency in seconds.
+        """
+        return time.time() - self._start_time
+
     @property
     def plan(self) -> str:
         """
@@ -621,6 +714,12 @@ class BaseProcessor(ABC):
 
         return self.status == self._agent_status_manager.CONFIRM.value
 
+    def log_memory(self) -> None:
+        """
+        Log the memory item of the step when the step ends, once the time cost of all its phases is known.
+        """
+        self._log_memory = True
+
     def log(self, response_json: dict) -> None:
         """
         Set the result of the session, and log the result.
@@ -629,20 +728,19 @@ class BaseProcessor(ABC):
         return: The response json.
         """
 
-        self.logger.info(json.dumps(response_json))
+        # The response is serialized by the log writer, off the critical path of the step.
+        self.logger.info(response_json)
 
     def error_log(self, response_str: str, error: str) -> None:
         """
         Error handler for the session.
         """
-        log = json.dumps(
-            {
-                "step": self.session_step,
-                "status": self._agent_status_manager.ERROR.value,
-                "response": response_str,
-                "error": error,
-            }
-        )
+        log = {
+            "step": self.session_step,
+            "status": self._agent_status_manager.ERROR.value,
+            "response": response_str,
+            "error": error,
+        }
         self.logger.info(log)
 
     @property
@@ -669,13 +767,11 @@ class BaseProcessor(ABC):
         Error handler for the LLM error.
         """
         error_trace = traceback.format_exc()
-        log = json.dumps(
-            {
-                "step": self.session_step,
-                "prompt": self._prompt_message,
-                "status": str(error_trace),
-            }
-        )
+        log = {
+            "step": self.session_step,
+            "prompt": self._prompt_message,
+            "status": str(error_trace),
+        }
         utils.print_with_color(
             "Error occurs when calling LLM: {e}".format(e=str(error_trace)), "red"
         )
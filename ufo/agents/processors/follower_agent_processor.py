@@ -2,11 +2,11 @@
 # Licensed under the MIT License.
 
 
-import json
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
+from ufo import utils
 from ufo.agents.processors.app_agent_processor import AppAgentProcessor
 from ufo.config.config import Config
-from typing import TYPE_CHECKING
 from ufo.module.context import Context, ContextNames
 
 if TYPE_CHECKING:
@@ -27,19 +27,69 @@ class FollowerAppAgentProcessor(AppAgentProcessor):
         """
         super().__init__(agent, context)
         self.subtask = self.context.get(ContextNames.REQUEST)
+        self.plan_step = self.context.get(ContextNames.PLAN_STEP)
+
+    def has_plan_action(self) -> bool:
+        """
+        Check if the recorded action of the plan step is to be replayed, at the first step of the round.
+        :return: True if the recorded action is to be replayed, False otherwise.
+        """
+
+        return (
+            configs.get("FOLLOWER_DIRECT_ACTION", True)
+            and self.plan_step is not None
+            and self.plan_step.is_direct
+            and self.round_step == 0
+        )
+
+    def has_direct_action(self) -> bool:
+        """
+        Check if the step is expected to replay the recorded action of the plan step or a cached action.
+        :return: True if an action is expected to be replayed, False otherwise.
+        """
+
+        return self.has_plan_action() or super().has_direct_action()
+
+    def get_direct_response(self) -> Optional[Dict[str, Any]]:
+        """
+        Get the response replaying the recorded action of the plan step, resolved to a control of the window.
+        Otherwise, a cached action of the step may be replayed.
+        :return: The response, or None if the step is to be followed with the LLM.
+        """
+
+        if self.has_plan_action():
+            control_label = self.plan_step.match_control(self._control_info)
+
+            if control_label is not None:
+                return self.replay_response(
+                    control_label,
+                    self.plan_step,
+                    self._agent_status_manager.FINISH.value,
+                    "The recorded action of the plan step is replayed without calling the LLM.",
+                )
+
+            utils.print_with_color(
+                "The control [{text}] of the recorded action is not found or ambiguous, follow the step with the LLM.".format(
+                    text=self.plan_step.control_text
+                ),
+                "yellow",
+            )
+
+        return super().get_direct_response()
 
     def get_prompt_message(self) -> None:
         """
         Get the prompt message for the AppAgent in the follower mode. It may accept additional prompts as input.
+        No prompt is needed if the recorded action of the plan step or a cached action is replayed.
         """
 
-        examples, tips = self.demonstration_prompt_helper()
+        self._direct_response = self.get_direct_response()
 
-        external_knowledge_prompt = self.app_agent.external_knowledge_prompt_helper(
-            self.request,
-            configs["RAG_OFFLINE_DOCS_RETRIEVED_TOPK"],
-            configs["RAG_ONLINE_RETRIEVED_TOPK"],
-        )
+        if self._direct_response is not None:
+            self._prompt_message = []
+            return
+
+        examples, tips, external_knowledge_prompt = self.get_prompt_parts()
 
         # Get the current state of the application and the state difference between the current state and the previous state.
         current_state = {}
@@ -61,13 +111,11 @@ class FollowerAppAgentProcessor(AppAgentProcessor):
             include_last_screenshot=configs["INCLUDE_LAST_SCREENSHOT"],
         )
 
-        log = json.dumps(
-            {
-                "step": self.session_step,
-                "prompt": self._prompt_message,
-                "control_items": self._control_info,
-                "filted_control_items": self.filtered_control_info,
-                "status": "",
-            }
-        )
+        log = {
+            "step": self.session_step,
+            "prompt": self._prompt_message,
+            "control_items": self._control_info,
+            "filted_control_items": self.filtered_control_info,
+            "status": "",
+        }
         self.request_logger.debug(log)
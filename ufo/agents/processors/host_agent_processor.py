@@ -1,8 +1,6 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-
-import json
 from typing import TYPE_CHECKING
 
 from pywinauto.controls.uiawrapper import UIAWrapper
@@ -100,15 +98,13 @@ class HostAgentProcessor(BaseProcessor):
         )
 
         # Log the prompt message. Only save them in debug mode.
-        log = json.dumps(
-            {
-                "step": self.session_step,
-                "prompt": self._prompt_message,
-                "control_items": self._desktop_windows_info,
-                "filted_control_items": self._desktop_windows_info,
-                "status": "",
-            }
-        )
+        log = {
+            "step": self.session_step,
+            "prompt": self._prompt_message,
+            "control_items": self._desktop_windows_info,
+            "filted_control_items": self._desktop_windows_info,
+            "status": "",
+        }
         self.request_logger.debug(log)
 
     def get_response(self) -> None:
@@ -244,6 +240,7 @@ class HostAgentProcessor(BaseProcessor):
             "AgentName": self.host_agent.name,
             "Application": self.app_root,
             "Cost": self._cost,
+            "Latency": self.latency,
             "Results": "",
         }
 
@@ -251,9 +248,8 @@ class HostAgentProcessor(BaseProcessor):
         self._memory_data.set_values_from_dict(additional_memory)
         self.host_agent.add_memory(self._memory_data)
 
-        # Log the memory item.
-        self.context.add_to_structural_logs(self._memory_data.to_dict())
-        self.log(self._memory_data.to_dict())
+        # Log the memory item when the step ends.
+        self.log_memory()
 
         # Only memorize the keys in the HISTORY_KEYS list to feed into the prompt message in the future steps.
         memorized_action = {
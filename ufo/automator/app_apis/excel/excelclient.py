@@ -3,11 +3,13 @@
 
 from typing import Any, Dict, List, Type
 
-import pandas as pd
-
+from ufo import utils
 from ufo.automator.app_apis.basic import WinCOMCommand, WinCOMReceiverBasic
 from ufo.automator.basic import CommandBasic
 
+# Lazy import pandas, which is only used when a table is read from the workbook.
+pd = utils.LazyImport("pandas")
+
 
 class ExcelWinCOMReceiver(WinCOMReceiverBasic):
     """
@@ -5,11 +5,13 @@ from __future__ import annotations
 
 from typing import Any, Dict, Type
 
-import html2text
-import requests
-
+from ufo import utils
 from ufo.automator.basic import CommandBasic, ReceiverBasic
 
+# Lazy import the web dependencies, which are only used by the web receiver.
+html2text = utils.LazyImport("html2text")
+requests = utils.LazyImport("requests")
+
 
 class WebReceiver(ReceiverBasic):
     """
@@ -4,7 +4,9 @@
 import base64
 import mimetypes
 import os
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from io import BytesIO
 from typing import Dict, List, Optional
 
@@ -309,11 +311,23 @@ class AnnotationDecorator(PhotographerDecorator):
         return cropped_icons_dict
 
     def capture_with_annotation_dict(
-        self, annotation_dict: Dict[str, UIAWrapper], save_path: Optional[str] = None
+        self,
+        annotation_dict: Dict[str, UIAWrapper],
+        save_path: Optional[str] = None,
+        screenshot: Optional[Image.Image] = None,
     ):
+        """
+        Capture a screenshot with the annotations of the controls.
+        :param annotation_dict: The dictionary of the controls with annotation labels as keys.
+        :param save_path: The path to save the screenshot.
+        :param screenshot: The screenshot of the window to annotate, captured again if None.
+        :return: The screenshot with annotations.
+        """
 
         window_rect = self.photographer.control.rectangle()
-        screenshot_annotated = self.photographer.capture()
+        screenshot_annotated = (
+            self.photographer.capture() if screenshot is None else screenshot.copy()
+        )
 
         color_dict = configs["ANNOTATION_COLORS"]
 
@@ -366,6 +380,56 @@ class PhotographerFactory:
             raise ValueError("Invalid screenshot type")
 
 
+class EncodedImageCache:
+    """
+    A LRU cache of the base64 encoded image files, shared by all the agents.
+    An entry is keyed by the path of the image and invalidated when the file is modified.
+    """
+
+    def __init__(self, max_size: int = 32) -> None:
+        """
+        Create a new EncodedImageCache.
+        :param max_size: The maximum number of encoded images to keep.
+        """
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, image_path: str, mime_type: Optional[str] = None) -> str:
+        """
+        Get the base64 string of an image file, encode it if it is not cached.
+        :param image_path: The path of the image file.
+        :param mime_type: The mime type of the image.
+        :return: The base64 string.
+        """
+        stat = os.stat(image_path)
+        key = (os.path.abspath(image_path), mime_type)
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == version:
+                self._cache.move_to_end(key)
+                return entry[1]
+
+        image_url = PhotographerFacade.encode_image_from_path(image_path, mime_type)
+
+        with self._lock:
+            self._cache[key] = (version, image_url)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+        return image_url
+
+    def clear(self) -> None:
+        """
+        Clear the cache.
+        """
+        with self._lock:
+            self._cache.clear()
+
+
 class PhotographerFacade:
     """
     The facade class for the photographer.
@@ -373,6 +437,9 @@ class PhotographerFacade:
 
     _instance = None
 
+    # The encoded images are shared by the prompts of all the agents.
+    encoded_image_cache = EncodedImageCache(configs.get("ENCODED_IMAGE_CACHE_SIZE", 32))
+
     def __new__(cls):
         """
         Singleton pattern.
@@ -434,6 +501,7 @@ class PhotographerFacade:
         color_diff: bool = True,
         color_default: str = "#FFF68F",
         save_path: Optional[str] = None,
+        screenshot: Optional[Image.Image] = None,
     ) -> Image.Image:
         """
         Capture the control screenshot with annotations.
@@ -442,15 +510,17 @@ class PhotographerFacade:
         :param annotation_type: The type of the annotation.
         :param color_diff: Whether to use different colors for different control types.
         :param color_default: The default color of the annotation.
+        :param save_path: The path to save the screenshot.
+        :param screenshot: The screenshot of the control to annotate, captured again if None.
         :return: The screenshot.
         """
-        screenshot = self.screenshot_factory.create_screenshot("app_window", control)
+        photographer = self.screenshot_factory.create_screenshot("app_window", control)
         sub_control_list = list(annotation_control_dict.values())
-        screenshot = AnnotationDecorator(
-            screenshot, sub_control_list, annotation_type, color_diff, color_default
+        photographer = AnnotationDecorator(
+            photographer, sub_control_list, annotation_type, color_diff, color_default
         )
-        return screenshot.capture_with_annotation_dict(
-            annotation_control_dict, save_path
+        return photographer.capture_with_annotation_dict(
+            annotation_control_dict, save_path, screenshot
         )
 
     def capture_app_window_screenshot_with_annotation(
@@ -553,6 +623,18 @@ class PhotographerFacade:
         image.save(buffered, format="PNG")
         return base64.b64encode(buffered.getvalue()).decode("utf-8")
 
+    @classmethod
+    def encode_image_from_path_cached(
+        cls, image_path: str, mime_type: Optional[str] = None
+    ) -> str:
+        """
+        Encode an image file to base64 string through the shared encoded image cache.
+        :param image_path: The path of the image file.
+        :param mime_type: The mime type of the image.
+        :return: The base64 string.
+        """
+        return cls.encoded_image_cache.encode(image_path, mime_type)
+
     @staticmethod
     def encode_image_from_path(image_path: str, mime_type: Optional[str] = None) -> str:
         """
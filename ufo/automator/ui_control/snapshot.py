@@ -0,0 +1,224 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+This module takes a snapshot of the application window at a step: its screenshot and its control elements.
+The screenshot is captured on a background thread while the control elements are enumerated, since the two do not
+depend on each other until the screenshot is annotated. The window rectangle is read before and after, and a
+snapshot taken while the window moved or resized is discarded and taken again.
+
+The UIA wrappers of the window are only called on the calling thread: the rectangles are read there, and the
+capture thread grabs the screen region of the rectangle with a plain GDI screen grab, which needs no COM.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageGrab
+
+from ufo.config.config import Config
+
+configs = Config.get_instance().config_data
+
+
+def rect_to_tuple(rect: Any) -> Tuple[int, int, int, int]:
+    """
+    Get the coordinates of a window rectangle.
+    :param rect: The rectangle, a RECT or a tuple of (left, top, right, bottom).
+    :return: The coordinates (left, top, right, bottom).
+    """
+    if isinstance(rect, tuple):
+        return rect
+    return (rect.left, rect.top, rect.right, rect.bottom)
+
+
+def capture_rect(
+    rect: Tuple[int, int, int, int], save_path: Optional[str] = None
+) -> Optional[Image.Image]:
+    """
+    Capture the screen region of a window rectangle, as the capture_as_image of the window does, without calling the window.
+    :param rect: The window rectangle (left, top, right, bottom) in screen coordinates.
+    :param save_path: The path to save the screenshot.
+    :return: The screenshot, or None if the rectangle is empty, e.g. for a minimized window.
+    """
+    left, top, right, bottom = rect
+    if right <= left or bottom <= top:
+        return None
+
+    # The rectangle is in the coordinates of the virtual screen, which spans all the monitors.
+    screenshot = ImageGrab.grab(bbox=rect, all_screens=True)
+    if save_path is not None:
+        screenshot.save(save_path)
+    return screenshot
+
+
+@dataclass
+class WindowSnapshot:
+    """
+    The screenshot and the control elements of the application window, taken at the same window rectangle.
+    """
+
+    screenshot: Optional[Image.Image]
+    control_list: List[Any]
+    window_rect: Optional[Tuple[int, int, int, int]]
+    consistent: bool = True
+    attempts: int = 1
+    time_cost: Dict[str, float] = field(default_factory=dict)
+
+
+class WindowSnapshotTaker:
+    """
+    Take the snapshots of the application window, capturing the screenshot concurrently with the control enumeration.
+    """
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, concurrent: Optional[bool] = None, max_retries: int = 1) -> None:
+        """
+        Initialize the snapshot taker.
+        :param concurrent: Whether to capture the screenshot concurrently with the control enumeration. Default is CONCURRENT_CAPTURE.
+        :param max_retries: The number of times a snapshot is taken again when the window moved or resized.
+        """
+        self.concurrent = (
+            configs.get("CONCURRENT_CAPTURE", True)
+            if concurrent is None
+            else concurrent
+        )
+        self.max_retries = max_retries
+
+    @classmethod
+    def get_executor(cls) -> ThreadPoolExecutor:
+        """
+        Get the executor of the capture thread, shared by all the snapshot takers.
+        :return: The executor.
+        """
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="window-capture"
+                )
+            return cls._executor
+
+    @staticmethod
+    def _timed(func: Callable[[], Any]) -> Tuple[Any, float]:
+        """
+        Call a function and measure its time.
+        :param func: The function.
+        :return: The result and the time in seconds.
+        """
+        start = time.perf_counter()
+        result = func()
+        return result, time.perf_counter() - start
+
+    def take(
+        self,
+        get_window_rect: Callable[[], Any],
+        enumerate_controls: Callable[[], List[Any]],
+        capture_window: Callable[[Tuple[int, int, int, int]], Optional[Image.Image]],
+    ) -> WindowSnapshot:
+        """
+        Take a snapshot of the application window.
+        :param get_window_rect: The function to read the window rectangle, run on the calling thread.
+        :param enumerate_controls: The function to enumerate the control elements, run on the calling thread.
+        :param capture_window: The function to capture the screenshot of the window rectangle read before, run on the capture thread.
+        It must not call the UIA wrappers, which belong to the calling thread, e.g. capture_rect.
+        :return: The snapshot. It is marked inconsistent if the window still moved after the retries.
+        """
+
+        for attempt in range(1, self.max_retries + 2):
+            start = time.perf_counter()
+            rect_before = rect_to_tuple(get_window_rect())
+
+            if self.concurrent:
+                future = self.get_executor().submit(
+                    self._timed, lambda: capture_window(rect_before)
+                )
+                control_list, enumerate_time = self._timed(enumerate_controls)
+                screenshot, capture_time = future.result()
+            else:
+                control_list, enumerate_time = self._timed(enumerate_controls)
+                screenshot, capture_time = self._timed(
+                    lambda: capture_window(rect_before)
+                )
+
+            rect_after = rect_to_tuple(get_window_rect())
+
+            snapshot = WindowSnapshot(
+                screenshot=screenshot,
+                control_list=control_list,
+                window_rect=rect_after,
+                consistent=rect_before == rect_after,
+                attempts=attempt,
+                time_cost={
+                    "enumerate": enumerate_time,
+                    "capture": capture_time,
+                    "total": time.perf_counter() - start,
+                },
+            )
+
+            if snapshot.consistent:
+                break
+
+        return snapshot
+
+
+def benchmark(
+    enumerate_latency: float = 0.3,
+    capture_latency: float = 0.15,
+    steps: int = 10,
+) -> Dict[str, float]:
+    """
+    Benchmark the snapshot of a window with fake latencies of the control enumeration and the screenshot capture.
+    :param enumerate_latency: The time in seconds to enumerate the control elements.
+    :param capture_latency: The time in seconds to capture the screenshot.
+    :param steps: The number of snapshots to take.
+    :return: The mean time in seconds of a snapshot, taken serially and concurrently.
+    """
+
+    def enumerate_controls() -> List[Any]:
+        time.sleep(enumerate_latency)
+        return []
+
+    def capture_window(rect: Tuple[int, int, int, int]) -> Image.Image:
+        time.sleep(capture_latency)
+        return Image.new("RGB", (64, 64))
+
+    def get_window_rect() -> Tuple[int, int, int, int]:
+        return (0, 0, 64, 64)
+
+    results = {}
+    for name, concurrent in [("serial", False), ("concurrent", True)]:
+        taker = WindowSnapshotTaker(concurrent=concurrent)
+        start = time.perf_counter()
+        for _ in range(steps):
+            taker.take(get_window_rect, enumerate_controls, capture_window)
+        results[name] = (time.perf_counter() - start) / steps
+
+    return results
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    from ufo.utils import print_with_color
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--enumerate_latency", type=float, default=0.3)
+    parser.add_argument("--capture_latency", type=float, default=0.15)
+    parser.add_argument("--steps", type=int, default=10)
+    args = parser.parse_args()
+
+    results = benchmark(args.enumerate_latency, args.capture_latency, args.steps)
+    print_with_color(
+        "Snapshot per step: serial {serial:.3f}s, concurrent {concurrent:.3f}s, saved {saved:.3f}s.".format(
+            serial=results["serial"],
+            concurrent=results["concurrent"],
+            saved=results["serial"] - results["concurrent"],
+        ),
+        "yellow",
+    )
@@ -0,0 +1,70 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+Evaluate the session folders of historical logs with the EvaluationAgent, e.g.
+
+    python -m ufo.evaluate logs/{task_name}
+
+The sessions are evaluated concurrently on the evaluation service, and the results are appended to the
+evaluation.log of each session folder. The sessions that are already evaluated are skipped unless --force is set.
+"""
+
+import argparse
+import time
+
+from ufo.module.evaluation_service import evaluate_folders
+from ufo.utils import print_with_color
+
+
+def main() -> None:
+    """
+    Evaluate the session folders of a logs folder.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Evaluate the session folders of historical logs."
+    )
+    parser.add_argument(
+        "logs_dir", help="The session folder, or the folder of the session folders."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of concurrent evaluations. Default is EVA_WORKERS.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Evaluate again the sessions that are already evaluated.",
+    )
+    args = parser.parse_args()
+
+    start = time.time()
+    summary = evaluate_folders(args.logs_dir, workers=args.workers, force=args.force)
+
+    for record in summary:
+        print_with_color(
+            "{session}: complete {complete}, ${cost:.2f}{skipped}".format(
+                session=record["session"],
+                complete=record["complete"],
+                cost=record["cost"],
+                skipped=" (already evaluated)" if record.get("skipped") else "",
+            ),
+            "green" if record["complete"] == "yes" else "red",
+        )
+
+    print_with_color(
+        "Evaluated {num} sessions: {complete} complete, total cost ${cost:.2f}, wall time {total:.1f}s.".format(
+            num=len(summary),
+            complete=sum(record["complete"] == "yes" for record in summary),
+            cost=sum(record["cost"] for record in summary),
+            total=time.time() - start,
+        ),
+        "yellow",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,11 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-import json
 import os
 import re
 
 from ufo.automator.ui_control.screenshot import PhotographerFacade
-from ufo.utils import print_with_color
+from ufo.utils import iter_json_lines, print_with_color
 
 
 class ExperienceLogLoader:
@@ -33,19 +32,15 @@ class ExperienceLogLoader:
         :return: The response log.
         """
 
-        response = []
         response_log_path = os.path.join(self.log_path, "response.log")
-        with open(response_log_path, "r", encoding="utf-8") as file:
-            # Read the lines and split them into a list
-            response_log = file.readlines()
-        for response_string in response_log:
-            try:
-                response.append(json.loads(response_string))
-            except json.JSONDecodeError:
-                print_with_color(
+        return list(
+            iter_json_lines(
+                response_log_path,
+                on_error=lambda response_string, _: print_with_color(
                     f"Error loading response log: {response_string}", "yellow"
-                )
-        return response
+                ),
+            )
+        )
 
     @staticmethod
     def find_max_number_in_filenames(log_path) -> int:
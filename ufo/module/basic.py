@@ -17,9 +17,8 @@ For more details definition of the state pattern, please refer to the state.py m
 import json
 import logging
 import os
-import time
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, Optional
 
 from pywinauto.controls.uiawrapper import UIAWrapper
 
@@ -29,10 +28,18 @@ from ufo.agents.agent.basic import BasicAgent
 from ufo.agents.agent.evaluation_agent import EvaluationAgent
 from ufo.agents.agent.host_agent import AgentFactory, HostAgent
 from ufo.agents.states.basic import AgentState, AgentStatus
+from ufo.agents.states.host_agent_state import ContinueHostAgentState
 from ufo.automator.ui_control.screenshot import PhotographerFacade
 from ufo.config.config import Config
-from ufo.experience.summarizer import ExperienceSummarizer
+from ufo.module import checkpoint, log_writer
 from ufo.module.context import Context, ContextNames
+from ufo.module.evaluation_service import EvaluationTask, get_evaluation_service
+from ufo.module.trajectory_cache import get_trajectory_cache
+from ufo.module.warmup import warm_up_session
+from ufo.utils.ui_wait import wait_for_ui_idle
+
+# Lazy import the experience summarizer, which loads the embedding and index dependencies.
+experience_summarizer = utils.LazyImport("..experience.summarizer")
 
 configs = Config.get_instance().config_data
 
@@ -94,9 +101,10 @@ class BaseRound(ABC):
 
         self.context.set(ContextNames.CURRENT_ROUND_ID, self.id)
 
-    def run(self) -> None:
+    def run(self, on_step: Optional[Callable[["BaseRound"], None]] = None) -> None:
         """
         Run the round.
+        :param on_step: The function called with the round after each step, e.g. to save a checkpoint.
         """
 
         while not self.is_finished():
@@ -109,10 +117,13 @@ class BaseRound(ABC):
 
             # If the subtask ends, capture the last snapshot of the application.
             if self.state.is_subtask_end():
-                time.sleep(configs["SLEEP_TIME"])
+                wait_for_ui_idle(self.application_window)
                 self.capture_last_snapshot(sub_round_id=self.subtask_amount)
                 self.subtask_amount += 1
 
+            if on_step is not None:
+                on_step(self)
+
         self.agent.blackboard.add_requests(
             {"request_{i}".format(i=self.id), self.request}
         )
@@ -321,6 +332,13 @@ class BaseSession(ABC):
 
         self._should_evaluate = should_evaluate
         self._id = id
+        self._task = task
+
+        # Start loading the configured models and indexes while the user types the request.
+        warm_up_session()
+
+        # The unfinished round of a resumed session, which runs before the new rounds.
+        self._resumed_round: Optional[BaseRound] = None
 
         # Logging-related properties
         self.log_path = f"logs/{task}/"
@@ -347,20 +365,50 @@ class BaseSession(ABC):
         Run the session.
         """
 
+        self.run_ui()
+        self.finalize()
+
+    def run_ui(self) -> None:
+        """
+        Run the rounds of the session, i.e. the phase of the session interacting with the desktop.
+        """
+
+        # The resources handed over to an earlier session of a batch are loaded again.
+        warm_up_session()
+
         while not self.is_finished():
 
-            round = self.create_new_round()
+            round = self._resumed_round or self.create_new_round()
+            self._resumed_round = None
             if round is None:
                 break
-            round.run()
+            round.run(on_step=self.on_step_end)
 
         if self.application_window is not None:
             self.capture_last_snapshot()
 
+        if configs.get("CHECKPOINT_INTERVAL", 0) > 0:
+            self.save_checkpoint(completed=True)
+
+    def finalize(self) -> None:
+        """
+        Evaluate the session and write its logs. This phase does not interact with the desktop or ask the user,
+        so that it can run in the background while the next session runs. The user is asked in run_ui.
+        """
+
         if self._should_evaluate and not self.is_error():
             self.evaluation()
 
+        if configs.get("TRAJECTORY_CACHE", False) and not self.is_error():
+            self.update_trajectory_cache()
+
         self.print_cost()
+        self.print_time_cost()
+
+        if configs.get("TRACE_EXPORT", False):
+            self.export_trace()
+
+        self.close_loggers()
 
     @abstractmethod
     def create_new_round(self) -> Optional[BaseRound]:
@@ -514,7 +562,7 @@ class BaseSession(ABC):
             "Summarizing and saving the execution flow as experience...", "yellow"
         )
 
-        summarizer = ExperienceSummarizer(
+        summarizer = experience_summarizer.ExperienceSummarizer(
             configs["APP_AGENT"]["VISUAL_MODE"],
             configs["EXPERIENCE_PROMPT"],
             configs["APPAGENT_EXAMPLE_PROMPT"],
@@ -554,6 +602,68 @@ class BaseSession(ABC):
                 "yellow",
             )
 
+    def print_time_cost(self) -> None:
+        """
+        Print the time cost of each phase of the steps, in the session and in each round.
+        """
+        session_time_cost = self.context.get(ContextNames.SESSION_TIME_COST)
+
+        if not session_time_cost:
+            return
+
+        utils.print_with_color(
+            "Total time cost of the session: {summary}".format(
+                summary=self.format_time_cost(session_time_cost)
+            ),
+            "yellow",
+        )
+
+        for round_id, round_time_cost in sorted(
+            self.context.get(ContextNames.ROUND_TIME_COST).items()
+        ):
+            utils.print_with_color(
+                "Time cost of round {round_id}: {summary}".format(
+                    round_id=round_id, summary=self.format_time_cost(round_time_cost)
+                ),
+                "yellow",
+            )
+
+    @staticmethod
+    def format_time_cost(time_cost: Dict[str, float]) -> str:
+        """
+        Format the time cost of the phases, the slowest phase first.
+        :param time_cost: The time cost in seconds of each phase.
+        :return: The formatted time cost.
+        """
+        total = sum(time_cost.values())
+        phases = ", ".join(
+            "{phase} {seconds:.1f}s ({percent:.0f}%)".format(
+                phase=phase,
+                seconds=seconds,
+                percent=100 * seconds / total if total else 0,
+            )
+            for phase, seconds in sorted(
+                time_cost.items(), key=lambda item: item[1], reverse=True
+            )
+        )
+        return "{total:.1f}s, {phases}".format(total=total, phases=phases)
+
+    def export_trace(self) -> None:
+        """
+        Export the trace events of the phases of the steps to trace.json in the log folder,
+        in the Chrome trace format, which can be opened in chrome://tracing or Perfetto.
+        """
+        trace_path = os.path.join(self.log_path, "trace.json")
+
+        with open(trace_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "traceEvents": self.context.get(ContextNames.TIME_TRACE),
+                    "displayTimeUnit": "ms",
+                },
+                f,
+            )
+
     def is_error(self):
         """
         Check if the session is in error state.
@@ -589,28 +699,208 @@ class BaseSession(ABC):
         Evaluate the session.
         """
         utils.print_with_color("Evaluating the session...", "yellow")
-        evaluator = EvaluationAgent(
-            name="eva_agent",
-            app_root_name=self.context.get(ContextNames.APPLICATION_ROOT_NAME),
-            is_visual=configs["APP_AGENT"]["VISUAL_MODE"],
-            main_prompt=configs["EVALUATION_PROMPT"],
-            example_prompt="",
-            api_prompt=configs["API_PROMPT"],
-        )
 
-        requests = self.request_to_evaluate()
-        result, cost = evaluator.evaluate(request=requests, log_path=self.log_path)
+        # The evaluation reads the response log, so the queued records must be written first.
+        log_writer.flush_logger(self.context.get(ContextNames.LOGGER))
 
-        # Add additional information to the evaluation result.
-        additional_info = {"level": "session", "request": requests, "id": 0}
-        result.update(additional_info)
+        # The evaluation runs on the shared evaluation service, which bounds the concurrent evaluations of a batch.
+        task = EvaluationTask(
+            log_path=self.log_path,
+            request=self.request_to_evaluate(),
+            app_root_name=self.context.get(ContextNames.APPLICATION_ROOT_NAME),
+        )
+        result, cost = get_evaluation_service().evaluate(task)
 
         self.cost += cost
 
-        evaluator.print_response(result)
+        EvaluationAgent.print_response(result)
 
         self.evaluation_logger.info(json.dumps(result))
 
+    def update_trajectory_cache(self) -> None:
+        """
+        Add the successful subtask trajectories of the session to the trajectory cache, to be replayed when they repeat.
+        """
+
+        # The trajectories are extracted from the response log and the evaluation log, so their records must be written first.
+        log_writer.flush_logger(self.context.get(ContextNames.LOGGER))
+        log_writer.flush_logger(self.context.get(ContextNames.EVALUATION_LOGGER))
+
+        added = get_trajectory_cache().add_from_logs(self.log_path)
+
+        if added:
+            utils.print_with_color(
+                "{added} successful subtask trajectories are added to the trajectory cache.".format(
+                    added=added
+                ),
+                "magenta",
+            )
+
+    def close_loggers(self) -> None:
+        """
+        Write the remaining log records of the session and close the log files.
+        """
+        for name in [
+            ContextNames.LOGGER,
+            ContextNames.REQUEST_LOGGER,
+            ContextNames.EVALUATION_LOGGER,
+        ]:
+            log_writer.close_logger(self.context.get(name))
+
+    def on_step_end(self, round: BaseRound) -> None:
+        """
+        Save a checkpoint every CHECKPOINT_INTERVAL steps of the session.
+        :param round: The running round.
+        """
+        interval = configs.get("CHECKPOINT_INTERVAL", 0)
+
+        if interval > 0 and self.step % interval == 0:
+            self.save_checkpoint()
+
+    def save_checkpoint(self, completed: bool = False) -> None:
+        """
+        Save the state of the session to the checkpoint file in the log folder. A failed checkpoint does not stop the session.
+        :param completed: Whether the rounds of the session are completed.
+        """
+        host_agent = self._host_agent
+        active_appagent = host_agent.get_active_appagent()
+
+        data = {
+            "version": checkpoint.CHECKPOINT_VERSION,
+            "session_type": self.session_type,
+            "task": self._task,
+            "id": self.id,
+            "should_evaluate": self._should_evaluate,
+            "finish": self._finish,
+            "completed": completed,
+            "current_round_id": self.context.get(ContextNames.CURRENT_ROUND_ID),
+            "context": checkpoint.context_to_dict(self.context),
+            "window": checkpoint.window_to_dict(self.application_window, self.context),
+            "host_agent": {
+                **checkpoint.agent_to_dict(host_agent),
+                "blackboard": checkpoint.blackboard_to_dict(host_agent.blackboard),
+                "active_appagent": (
+                    active_appagent.name if active_appagent is not None else None
+                ),
+            },
+            "app_agents": [
+                {
+                    **checkpoint.agent_to_dict(app_agent),
+                    "process_name": app_agent.process_name,
+                    "app_root_name": app_agent.app_root_name,
+                }
+                for app_agent in host_agent.appagent_dict.values()
+            ],
+            "rounds": [
+                {
+                    "id": round.id,
+                    "request": round.request,
+                    "agent": round.agent.name,
+                    "state": checkpoint.state_to_reference(round.state),
+                }
+                for round in self.rounds.values()
+            ],
+            "session": self.checkpoint_data(),
+        }
+
+        try:
+            checkpoint.save_checkpoint(self.log_path, data)
+        except Exception as e:
+            utils.print_with_color(
+                "Warning: Failed to save the checkpoint of the session: {error}".format(
+                    error=e
+                ),
+                "yellow",
+            )
+
+    def restore_checkpoint(self, data: Dict[str, Any]) -> None:
+        """
+        Restore the state of the session from a checkpoint. An unfinished round continues when the session runs.
+        :param data: The checkpoint.
+        """
+        host_agent = self._host_agent
+        saved_context = data["context"]
+
+        # The app agents are created again for their applications, with their retrievers.
+        for app_data in data["app_agents"]:
+            self.context.set(
+                ContextNames.APPLICATION_PROCESS_NAME, app_data["process_name"]
+            )
+            self.context.set(
+                ContextNames.APPLICATION_ROOT_NAME, app_data["app_root_name"]
+            )
+            self.context.set(
+                ContextNames.REQUEST, saved_context[ContextNames.REQUEST.name]
+            )
+            app_agent = ContinueHostAgentState().create_app_agent(
+                host_agent, self.context
+            )
+            checkpoint.restore_agent(app_agent, app_data)
+
+        checkpoint.restore_agent(host_agent, data["host_agent"])
+        checkpoint.restore_blackboard(
+            host_agent.blackboard, data["host_agent"]["blackboard"]
+        )
+        if data["host_agent"]["active_appagent"] is not None:
+            host_agent.set_active_appagent(data["host_agent"]["active_appagent"])
+
+        agents = {host_agent.name: host_agent, **host_agent.appagent_dict}
+        for round_data in data["rounds"]:
+            round = BaseRound(
+                request=round_data["request"],
+                agent=agents[round_data["agent"]],
+                context=self.context,
+                should_evaluate=configs.get("EVA_ROUND", False),
+                id=round_data["id"],
+            )
+            round.state = checkpoint.state_from_reference(round_data["state"])
+            self.add_round(round.id, round)
+
+        # The context is restored after the rounds, which initialize their values when they are created.
+        checkpoint.restore_context(
+            self.context, saved_context, data["current_round_id"]
+        )
+        self._finish = data["finish"]
+        self.restore_checkpoint_data(data["session"])
+
+        window = checkpoint.resolve_window(data["window"])
+        self.context.set(ContextNames.APPLICATION_WINDOW, window)
+        if data["window"] is not None and window is None:
+            utils.print_with_color(
+                "Warning: The application window {title} is not found.".format(
+                    title=data["window"]["title"]
+                ),
+                "yellow",
+            )
+
+        last_round = self.current_round
+        if last_round is not None and not last_round.is_finished():
+            last_round.agent.set_state(last_round.state)
+            self._resumed_round = last_round
+
+        utils.print_with_color(
+            "Resumed the session in {path} at step {step} of round {round}.".format(
+                path=self.log_path,
+                step=self.step,
+                round=data["current_round_id"],
+            ),
+            "cyan",
+        )
+
+    def checkpoint_data(self) -> Dict[str, Any]:
+        """
+        Get the state of the session type to save in the checkpoint.
+        :return: The state of the session type.
+        """
+        return {}
+
+    def restore_checkpoint_data(self, data: Dict[str, Any]) -> None:
+        """
+        Restore the state of the session type from the checkpoint.
+        :param data: The state of the session type.
+        """
+        pass
+
     @property
     def session_type(self) -> str:
         """
@@ -658,10 +948,30 @@ class BaseSession(ABC):
             logger.handlers = []
 
         log_file_path = os.path.join(log_path, log_filename)
-        file_handler = logging.FileHandler(log_file_path, encoding="utf-8")
-        formatter = logging.Formatter("%(message)s")
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        file_handler = log_writer.create_file_handler(
+            log_file_path, configs.get("LOG_COMPRESSION", {}).get(log_filename, "")
+        )
+
+        # The screenshots in the prompts are saved once and referenced in the request log.
+        image_folder = None
+        if log_filename == "request.log" and configs.get(
+            "REQUEST_LOG_IMAGE_REFERENCE", False
+        ):
+            image_folder = os.path.join(log_path, "request_images")
+
+        file_handler.setFormatter(log_writer.JSONLineFormatter(image_folder))
+
+        if configs.get("LOG_ASYNC", True):
+            logger.addHandler(log_writer.AsyncLogHandler(file_handler))
+        else:
+            logger.addHandler(file_handler)
+
+        # Write the steps through to a Parquet file for the offline analysis.
+        if log_filename == "response.log" and configs.get("LOG_EXPORT_PARQUET", False):
+            from ufo.module.log_export import StepExportHandler
+
+            logger.addHandler(StepExportHandler(log_path))
+
         logger.setLevel(configs["LOG_LEVEL"])
 
         return logger
@@ -0,0 +1,309 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+This module saves the state of a session to a checkpoint file in its log folder, and restores it to resume the session.
+
+The checkpoint keeps the context, the memories of the agents, the blackboard, the rounds and the states of the agents.
+The live objects are not saved: the loggers are opened again, the application window is found again by its title
+and its application root name, and the app agents are created again with their retrievers.
+"""
+
+import importlib
+import json
+import os
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from pywinauto.controls.uiawrapper import UIAWrapper
+
+from ufo.agents.agent.basic import BasicAgent
+from ufo.agents.memory.blackboard import Blackboard, ImageMemoryItem
+from ufo.agents.memory.memory import Memory, MemoryItem
+from ufo.agents.states.basic import AgentState
+from ufo.automator.ui_control.inspector import ControlInspectorFacade
+from ufo.config.config import Config
+from ufo.module.context import Context, ContextNames
+
+configs = Config.get_instance().config_data
+
+CHECKPOINT_FILE = "checkpoint.json"
+CHECKPOINT_VERSION = 1
+
+# The context names which are not saved: the loggers and the window are live objects,
+# the values of the current round are synced from the values of all rounds, and the trace is exported at the end.
+# The plan step of a resumed round is followed with the LLM.
+_UNSAVED_NAMES = frozenset(
+    [
+        ContextNames.LOGGER,
+        ContextNames.REQUEST_LOGGER,
+        ContextNames.EVALUATION_LOGGER,
+        ContextNames.APPLICATION_WINDOW,
+        ContextNames.CURRENT_ROUND_ID,
+        ContextNames.CURRENT_ROUND_STEP,
+        ContextNames.CURRENT_ROUND_COST,
+        ContextNames.CURRENT_ROUND_SUBTASK_AMOUNT,
+        ContextNames.TIME_TRACE,
+        ContextNames.PLAN_STEP,
+    ]
+)
+
+# The context names keyed by the round id, whose keys become strings in JSON.
+_ROUND_KEYED_NAMES = frozenset(
+    [
+        ContextNames.ROUND_STEP,
+        ContextNames.ROUND_COST,
+        ContextNames.ROUND_SUBTASK_AMOUNT,
+        ContextNames.ROUND_TIME_COST,
+    ]
+)
+
+
+def get_checkpoint_path(log_path: str) -> str:
+    """
+    Get the path of the checkpoint file of a session.
+    :param log_path: The log folder of the session.
+    :return: The path of the checkpoint file.
+    """
+    return os.path.join(log_path, CHECKPOINT_FILE)
+
+
+def save_checkpoint(log_path: str, checkpoint: Dict[str, Any]) -> str:
+    """
+    Write a checkpoint to the log folder. The file is replaced at once, so a crash never leaves a partial checkpoint.
+    :param log_path: The log folder of the session.
+    :param checkpoint: The checkpoint.
+    :return: The path of the checkpoint file.
+    """
+    checkpoint_path = get_checkpoint_path(log_path)
+    temp_path = checkpoint_path + ".tmp"
+
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, separators=(",", ":"))
+    os.replace(temp_path, checkpoint_path)
+
+    return checkpoint_path
+
+
+def load_checkpoint(log_path: str) -> Dict[str, Any]:
+    """
+    Read the checkpoint of a session.
+    :param log_path: The log folder of the session.
+    :return: The checkpoint.
+    """
+    checkpoint_path = get_checkpoint_path(log_path)
+
+    if not os.path.exists(checkpoint_path):
+        raise FileNotFoundError(
+            "No checkpoint found in {path}, the session cannot be resumed.".format(
+                path=log_path
+            )
+        )
+
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(
+            "Unsupported checkpoint version {version} in {path}.".format(
+                version=checkpoint.get("version"), path=checkpoint_path
+            )
+        )
+
+    return checkpoint
+
+
+def context_to_dict(context: Context) -> Dict[str, Any]:
+    """
+    Get the values of the context to save.
+    :param context: The context.
+    :return: The values, keyed by the context name.
+    """
+    return {
+        name.name: context.get(name)
+        for name in ContextNames
+        if name not in _UNSAVED_NAMES
+    }
+
+
+def restore_context(context: Context, values: Dict[str, Any], round_id: int) -> None:
+    """
+    Restore the saved values of the context.
+    :param context: The context.
+    :param values: The saved values, keyed by the context name.
+    :param round_id: The id of the current round.
+    """
+    for name in ContextNames:
+        if name.name not in values:
+            continue
+
+        value = values[name.name]
+
+        if name in _ROUND_KEYED_NAMES:
+            value = {int(key): item for key, item in value.items()}
+        elif name == ContextNames.STRUCTURAL_LOGS:
+            structural_logs = defaultdict(lambda: defaultdict(list))
+            for round_key, subtasks in value.items():
+                for subtask_key, logs in subtasks.items():
+                    structural_logs[int(round_key)][int(subtask_key)] = logs
+            value = structural_logs
+
+        context.set(name, value)
+
+    # Setting the current round id syncs the values of the current round.
+    context.set(ContextNames.CURRENT_ROUND_ID, round_id)
+
+
+def memory_to_list(memory: Memory) -> List[Dict[str, Any]]:
+    """
+    Get the items of a memory to save.
+    :param memory: The memory.
+    :return: The values of the memory items.
+    """
+    return [item.to_dict() for item in memory.content]
+
+
+def restore_memory(
+    memory: Memory, items: List[Dict[str, Any]], item_class: type = MemoryItem
+) -> None:
+    """
+    Restore the saved items of a memory.
+    :param memory: The memory.
+    :param items: The saved values of the memory items.
+    :param item_class: The class of the memory items.
+    """
+    content = []
+    for values in items:
+        item = item_class()
+        item.set_values_from_dict(values)
+        content.append(item)
+
+    memory.load(content)
+
+
+def blackboard_to_dict(blackboard: Blackboard) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Get the memories of the blackboard to save.
+    :param blackboard: The blackboard.
+    :return: The saved memories.
+    """
+    return {
+        "questions": memory_to_list(blackboard.questions),
+        "requests": memory_to_list(blackboard.requests),
+        "trajectories": memory_to_list(blackboard.trajectories),
+        "screenshots": memory_to_list(blackboard.screenshots),
+    }
+
+
+def restore_blackboard(
+    blackboard: Blackboard, memories: Dict[str, List[Dict[str, Any]]]
+) -> None:
+    """
+    Restore the saved memories of the blackboard.
+    :param blackboard: The blackboard.
+    :param memories: The saved memories.
+    """
+    blackboard.clear()
+    restore_memory(blackboard.questions, memories["questions"])
+    restore_memory(blackboard.requests, memories["requests"])
+    restore_memory(blackboard.trajectories, memories["trajectories"])
+    restore_memory(blackboard.screenshots, memories["screenshots"], ImageMemoryItem)
+
+
+def state_to_reference(state: Optional[AgentState]) -> Optional[str]:
+    """
+    Get the reference of an agent state to save. The states keep no data, so they are saved by their class.
+    :param state: The state.
+    :return: The reference, "module:class".
+    """
+    if state is None:
+        return None
+    return "{module}:{name}".format(
+        module=type(state).__module__, name=type(state).__qualname__
+    )
+
+
+def state_from_reference(reference: Optional[str]) -> Optional[AgentState]:
+    """
+    Create an agent state from its saved reference.
+    :param reference: The reference, "module:class".
+    :return: The state.
+    """
+    if reference is None:
+        return None
+    module_name, class_name = reference.split(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def agent_to_dict(agent: BasicAgent) -> Dict[str, Any]:
+    """
+    Get the state of an agent to save.
+    :param agent: The agent.
+    :return: The saved state.
+    """
+    return {
+        "name": agent.name,
+        "step": agent.step,
+        "status": agent.status,
+        "state": state_to_reference(agent.state),
+        "memory": memory_to_list(agent.memory),
+    }
+
+
+def restore_agent(agent: BasicAgent, data: Dict[str, Any]) -> None:
+    """
+    Restore the saved state of an agent.
+    :param agent: The agent.
+    :param data: The saved state.
+    """
+    agent.step = data["step"]
+    agent.status = data["status"]
+    restore_memory(agent.memory, data["memory"])
+
+    state = state_from_reference(data["state"])
+    if state is not None:
+        agent.set_state(state)
+
+
+def window_to_dict(window: Optional[UIAWrapper], context: Context) -> Optional[Dict]:
+    """
+    Get the description of the application window to find it again.
+    :param window: The application window.
+    :param context: The context.
+    :return: The title and the application root name of the window, or None if there is no window.
+    """
+    if window is None:
+        return None
+
+    try:
+        title = window.window_text()
+    except Exception:
+        title = context.get(ContextNames.APPLICATION_PROCESS_NAME)
+
+    return {
+        "title": title,
+        "root_name": context.get(ContextNames.APPLICATION_ROOT_NAME),
+    }
+
+
+def resolve_window(description: Optional[Dict[str, str]]) -> Optional[UIAWrapper]:
+    """
+    Find the application window on the desktop, by its title or else by its application root name.
+    :param description: The saved description of the window.
+    :return: The window, or None if it is not found.
+    """
+    if description is None:
+        return None
+
+    inspector = ControlInspectorFacade(configs["CONTROL_BACKEND"])
+    windows = inspector.get_desktop_windows(remove_empty=True)
+
+    for window in windows:
+        if window.window_text() == description["title"]:
+            return window
+
+    for window in windows:
+        if inspector.get_application_root_name(window) == description["root_name"]:
+            return window
+
+    return None
@@ -2,30 +2,174 @@
 # Licensed under the MIT License.
 
 
-from typing import List
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Set
 
+from ufo import utils
+from ufo.config.config import Config
 from ufo.module.basic import BaseSession
 
+configs = Config.get_instance().config_data
+
 
 class UFOClientManager:
     """
     The manager for the UFO clients.
+    The sessions interact with the desktop one after another, while the sessions that are done with the desktop
+    are finalized, i.e. evaluated and their logs written, on a background worker pool.
     """
 
-    def __init__(self, session_list: List[BaseSession]) -> None:
+    def __init__(
+        self,
+        session_list: List[BaseSession],
+        finalize_workers: Optional[int] = None,
+        queue_depth: Optional[int] = None,
+    ) -> None:
         """
         Initialize a batch UFO client.
+        :param session_list: The sessions to run.
+        :param finalize_workers: The number of background workers finalizing the sessions, 0 to finalize each session before the next one starts.
+        Default is BATCH_FINALIZE_WORKERS.
+        :param queue_depth: The maximum number of sessions waiting to be finalized before the next session starts. Default is BATCH_QUEUE_DEPTH.
         """
 
         self._session_list = session_list
+        self.finalize_workers = (
+            configs.get("BATCH_FINALIZE_WORKERS", 2)
+            if finalize_workers is None
+            else finalize_workers
+        )
+        self.queue_depth = max(
+            1,
+            configs.get("BATCH_QUEUE_DEPTH", 4) if queue_depth is None else queue_depth,
+        )
+        self._summary: List[Dict[str, Any]] = []
 
     def run_all(self) -> None:
         """
         Run the batch UFO client.
         """
 
-        for session in self.session_list:
-            session.run()
+        start = time.time()
+        self._summary = []
+
+        if self.finalize_workers <= 0 or len(self.session_list) <= 1:
+            for session in self.session_list:
+                record = self._run_ui(session)
+                self._finalize(session, record)
+        else:
+            self._run_pipelined()
+
+        if len(self._summary) > 1:
+            self.print_summary(time.time() - start)
+
+    def _run_pipelined(self) -> None:
+        """
+        Run the sessions on the desktop one after another, and finalize them on the background workers.
+        """
+
+        pending: Set[Future] = set()
+
+        with ThreadPoolExecutor(
+            max_workers=self.finalize_workers, thread_name_prefix="session-finalize"
+        ) as executor:
+            for session in self.session_list:
+                # Wait for the finalization of the earlier sessions if too many are queued.
+                while len(pending) >= self.queue_depth:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                record = self._run_ui(session)
+                pending.add(executor.submit(self._finalize, session, record))
+
+    def _run_ui(self, session: BaseSession) -> Dict[str, Any]:
+        """
+        Run the desktop phase of a session.
+        :param session: The session.
+        :return: The summary record of the session.
+        """
+
+        record = {
+            "session": os.path.basename(os.path.normpath(session.log_path)),
+            "status": "",
+            "steps": 0,
+            "cost": 0.0,
+            "ui_time": 0.0,
+            "finalize_time": 0.0,
+        }
+        self._summary.append(record)
+
+        start = time.time()
+        session.run_ui()
+        record["ui_time"] = time.time() - start
+
+        record["status"] = "error" if session.is_error() else "finished"
+        record["steps"] = session.step
+
+        return record
+
+    def _finalize(self, session: BaseSession, record: Dict[str, Any]) -> None:
+        """
+        Run the finalization phase of a session. The errors are recorded in the summary instead of stopping the batch.
+        :param session: The session.
+        :param record: The summary record of the session.
+        """
+
+        start = time.time()
+        try:
+            session.finalize()
+        except Exception:
+            record["status"] = "finalize error"
+            utils.print_with_color(
+                "Error in finalizing the session {name}: {error}".format(
+                    name=record["session"], error=traceback.format_exc()
+                ),
+                "red",
+            )
+        record["finalize_time"] = time.time() - start
+
+        cost = session.cost
+        record["cost"] = cost if isinstance(cost, (int, float)) else 0.0
+
+    @property
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Get the summary of the sessions of the last batch.
+        :return: The summary records, one per session.
+        """
+        return self._summary
+
+    def print_summary(self, total_time: float) -> None:
+        """
+        Print the summary of the batch.
+        :param total_time: The wall time of the batch in seconds.
+        """
+
+        for record in self._summary:
+            utils.print_with_color(
+                "{session}: {status}, {steps} steps, ${cost:.2f}, desktop {ui_time:.1f}s, finalize {finalize_time:.1f}s".format(
+                    **record
+                ),
+                "green" if record["status"] == "finished" else "red",
+            )
+
+        serial_time = sum(
+            record["ui_time"] + record["finalize_time"] for record in self._summary
+        )
+        utils.print_with_color(
+            "Batch of {num} sessions: {finished} finished, total cost ${cost:.2f}, wall time {total:.1f}s, serial time {serial:.1f}s.".format(
+                num=len(self._summary),
+                finished=sum(
+                    record["status"] == "finished" for record in self._summary
+                ),
+                cost=sum(record["cost"] for record in self._summary),
+                total=total_time,
+                serial=serial_time,
+            ),
+            "yellow",
+        )
 
     @property
     def session_list(self) -> List[BaseSession]:
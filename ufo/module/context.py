@@ -1,6 +1,8 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import argparse
+import time
 from collections import defaultdict
 from dataclasses import dataclass, field
 from enum import Enum
@@ -47,6 +49,14 @@ class ContextNames(Enum):
         "CURRENT_ROUND_SUBTASK_AMOUNT"  # The amount of subtasks in the current round
     )
     STRUCTURAL_LOGS = "STRUCTURAL_LOGS"  # The structural logs of the session
+    ROUND_TIME_COST = (
+        "ROUND_TIME_COST"  # The time cost of each phase of the steps in all rounds
+    )
+    SESSION_TIME_COST = (
+        "SESSION_TIME_COST"  # The time cost of each phase of the steps in the session
+    )
+    TIME_TRACE = "TIME_TRACE"  # The trace events of the phases of the steps
+    PLAN_STEP = "PLAN_STEP"  # The compiled plan step followed in the current round of the follower mode
 
     @property
     def default_value(self) -> Any:
@@ -79,12 +89,15 @@ class ContextNames(Enum):
             self == ContextNames.ROUND_STEP
             or self == ContextNames.ROUND_COST
             or self == ContextNames.ROUND_SUBTASK_AMOUNT
+            or self == ContextNames.ROUND_TIME_COST
+            or self == ContextNames.SESSION_TIME_COST
         ):
             return {}
         elif (
             self == ContextNames.CONTROL_REANNOTATION
             or self == ContextNames.HOST_MESSAGE
             or self == ContextNames.PREVIOUS_SUBTASKS
+            or self == ContextNames.TIME_TRACE
         ):
             return []
         elif (
@@ -132,12 +145,15 @@ class ContextNames(Enum):
             or self == ContextNames.ROUND_COST
             or self == ContextNames.CURRENT_ROUND_SUBTASK_AMOUNT
             or self == ContextNames.STRUCTURAL_LOGS
+            or self == ContextNames.ROUND_TIME_COST
+            or self == ContextNames.SESSION_TIME_COST
         ):
             return dict
         elif (
             self == ContextNames.CONTROL_REANNOTATION
             or self == ContextNames.HOST_MESSAGE
             or self == ContextNames.PREVIOUS_SUBTASKS
+            or self == ContextNames.TIME_TRACE
         ):
             return list
         elif (
@@ -162,14 +178,25 @@ class Context:
         default_factory=lambda: {name.name: name.default_value for name in ContextNames}
     )
 
+    # The values of the current round, with the context names of the dictionaries keeping them for all rounds.
+    _ROUND_VALUES = {
+        ContextNames.CURRENT_ROUND_STEP.name: ContextNames.ROUND_STEP.name,
+        ContextNames.CURRENT_ROUND_COST.name: ContextNames.ROUND_COST.name,
+        ContextNames.CURRENT_ROUND_SUBTASK_AMOUNT.name: ContextNames.ROUND_SUBTASK_AMOUNT.name,
+    }
+
+    # The context names which change the values of the current round when they are set.
+    _ROUND_SOURCES = frozenset(
+        [ContextNames.CURRENT_ROUND_ID.name, *_ROUND_VALUES.values()]
+    )
+
     def get(self, key: ContextNames) -> Any:
         """
         Get the value from the context.
         :param key: The context name.
         :return: The value from the context.
         """
-        # Sync the current round step and cost
-        self._sync_round_values()
+        # The values of the current round are kept in sync when they are written, so a read is a single lookup.
         return self._context.get(key.name)
 
     def set(self, key: ContextNames, value: Any) -> None:
@@ -178,27 +205,28 @@ class Context:
         :param key: The context name.
         :param value: The value to set in the context.
         """
-        if key.name in self._context:
-            self._context[key.name] = value
-            # Sync the current round step and cost
-            if key == ContextNames.CURRENT_ROUND_STEP:
-                self.current_round_step = value
-            if key == ContextNames.CURRENT_ROUND_COST:
-                self.current_round_cost = value
-            if key == ContextNames.CURRENT_ROUND_SUBTASK_AMOUNT:
-                self.current_round_subtask_amount = value
-        else:
+        name = key.name
+
+        if name not in self._context:
             raise KeyError(f"Key '{key}' is not a valid context name.")
 
-    def _sync_round_values(self):
+        self._context[name] = value
+
+        # Sync the current round step and cost
+        if name in self._ROUND_VALUES:
+            current_round_id = self._context[ContextNames.CURRENT_ROUND_ID.name]
+            self._context[self._ROUND_VALUES[name]][current_round_id] = value
+        elif name in self._ROUND_SOURCES:
+            self._sync_round_values()
+
+    def _sync_round_values(self) -> None:
         """
-        Sync the current round step and cost.
+        Sync the current round step and cost from the values of all rounds.
         """
-        self.set(ContextNames.CURRENT_ROUND_STEP, self.current_round_step)
-        self.set(ContextNames.CURRENT_ROUND_COST, self.current_round_cost)
-        self.set(
-            ContextNames.CURRENT_ROUND_SUBTASK_AMOUNT, self.current_round_subtask_amount
-        )
+        current_round_id = self._context[ContextNames.CURRENT_ROUND_ID.name]
+
+        for name, round_name in self._ROUND_VALUES.items():
+            self._context[name] = self._context[round_name].get(current_round_id, 0)
 
     def update_dict(self, key: ContextNames, value: Dict[str, Any]) -> None:
         """
@@ -210,6 +238,8 @@ class Context:
             context_value = self._context[key.name]
             if isinstance(value, dict) and isinstance(context_value, dict):
                 self._context[key.name].update(value)
+                if key.name in self._ROUND_SOURCES:
+                    self._sync_round_values()
             else:
                 raise TypeError(
                     f"Value for key '{key.name}' is {key.value}, requires a dictionary."
@@ -234,6 +264,7 @@ class Context:
         """
         current_round_id = self._context.get(ContextNames.CURRENT_ROUND_ID.name)
         self._context[ContextNames.ROUND_COST.name][current_round_id] = value
+        self._context[ContextNames.CURRENT_ROUND_COST.name] = value
 
     @property
     def current_round_step(self) -> int:
@@ -252,6 +283,7 @@ class Context:
         """
         current_round_id = self._context.get(ContextNames.CURRENT_ROUND_ID.name)
         self._context[ContextNames.ROUND_STEP.name][current_round_id] = value
+        self._context[ContextNames.CURRENT_ROUND_STEP.name] = value
 
     @property
     def current_round_subtask_amount(self) -> int:
@@ -270,6 +302,22 @@ class Context:
         """
         current_round_id = self._context.get(ContextNames.CURRENT_ROUND_ID.name)
         self._context[ContextNames.ROUND_SUBTASK_AMOUNT.name][current_round_id] = value
+        self._context[ContextNames.CURRENT_ROUND_SUBTASK_AMOUNT.name] = value
+
+    def add_time_cost(self, time_cost: Dict[str, float]) -> None:
+        """
+        Add the time cost of the phases of a step to the current round and the session.
+        :param time_cost: The time cost in seconds of each phase.
+        """
+        current_round_id = self._context[ContextNames.CURRENT_ROUND_ID.name]
+        round_time_cost = self._context[ContextNames.ROUND_TIME_COST.name].setdefault(
+            current_round_id, {}
+        )
+        session_time_cost = self._context[ContextNames.SESSION_TIME_COST.name]
+
+        for phase, seconds in time_cost.items():
+            round_time_cost[phase] = round_time_cost.get(phase, 0) + seconds
+            session_time_cost[phase] = session_time_cost.get(phase, 0) + seconds
 
     def add_to_structural_logs(self, data: Dict[str, Any]) -> None:
         """
@@ -316,3 +364,55 @@ class Context:
         :return: The dictionary of the context.
         """
         return self._context
+
+
+def benchmark(num_operations: int = 100000) -> Dict[str, float]:
+    """
+    Benchmark the throughput of reading and writing the context, with the context names read by the processors in every step.
+    :param num_operations: The number of reads and writes to time.
+    :return: The number of reads and writes per second.
+    """
+    context = Context()
+    context.set(ContextNames.CURRENT_ROUND_ID, 0)
+
+    hot_keys = [
+        ContextNames.REQUEST,
+        ContextNames.SUBTASK,
+        ContextNames.LOG_PATH,
+        ContextNames.SESSION_STEP,
+        ContextNames.CURRENT_ROUND_STEP,
+        ContextNames.CURRENT_ROUND_COST,
+        ContextNames.APPLICATION_WINDOW,
+    ]
+    keys = [hot_keys[i % len(hot_keys)] for i in range(num_operations)]
+
+    start = time.perf_counter()
+    for key in keys:
+        context.get(key)
+    get_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for step in range(num_operations):
+        context.set(ContextNames.CURRENT_ROUND_STEP, step)
+    set_time = time.perf_counter() - start
+
+    return {
+        "get_per_second": num_operations / get_time,
+        "set_per_second": num_operations / set_time,
+    }
+
+
+if __name__ == "__main__":
+
+    from ufo.utils import print_with_color
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_operations", type=int, default=100000)
+    args = parser.parse_args()
+
+    print_with_color(
+        "Context get {get_per_second:,.0f}/s, set {set_per_second:,.0f}/s".format(
+            **benchmark(args.num_operations)
+        ),
+        "cyan",
+    )
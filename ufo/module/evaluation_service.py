@@ -0,0 +1,311 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+This module runs the EvaluationAgent as a service: the finished session folders are put on a queue, and a pool of
+worker threads evaluates them concurrently. The queue is bounded, so that a batch of sessions does not hold the
+prompts of all its evaluations in memory at once.
+
+The service is shared by the sessions, which wait for their own evaluation, and is used by the batch command
+'python -m ufo.evaluate <logs_dir>' to evaluate the folders of historical logs.
+"""
+
+import json
+import os
+import queue
+import threading
+import traceback
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from ufo import utils
+from ufo.agents.agent.evaluation_agent import EvaluationAgent
+from ufo.config.config import Config
+
+configs = Config.get_instance().config_data
+
+STEP_LOG_FILE = "response.log"
+EVALUATION_LOG_FILE = "evaluation.log"
+
+
+@dataclass
+class EvaluationTask:
+    """
+    The evaluation of a finished session folder.
+    """
+
+    log_path: str
+    request: str
+    app_root_name: Optional[str] = None
+    level: str = "session"
+    id: int = 0
+
+
+def evaluate_task(task: EvaluationTask) -> Tuple[Dict[str, Any], float]:
+    """
+    Evaluate a session folder with a new EvaluationAgent.
+    :param task: The evaluation task.
+    :return: The evaluation result and the cost of the LLM.
+    """
+
+    evaluator = EvaluationAgent(
+        name="eva_agent",
+        app_root_name=task.app_root_name,
+        is_visual=configs["APP_AGENT"]["VISUAL_MODE"],
+        main_prompt=configs["EVALUATION_PROMPT"],
+        example_prompt="",
+        api_prompt=configs["API_PROMPT"],
+    )
+
+    result, cost = evaluator.evaluate(request=task.request, log_path=task.log_path)
+
+    # Add additional information to the evaluation result.
+    result.update({"level": task.level, "request": task.request, "id": task.id})
+
+    return result, cost
+
+
+class EvaluationService:
+    """
+    The queue-fed evaluation service, with a pool of worker threads evaluating the tasks concurrently.
+    """
+
+    def __init__(
+        self, workers: Optional[int] = None, queue_size: Optional[int] = None
+    ) -> None:
+        """
+        Initialize the evaluation service.
+        :param workers: The number of concurrent evaluations. Default is EVA_WORKERS.
+        :param queue_size: The maximum number of tasks waiting for a worker, the submission blocks when it is reached.
+        Default is EVA_QUEUE_SIZE.
+        """
+
+        self.workers = max(
+            1, configs.get("EVA_WORKERS", 2) if workers is None else workers
+        )
+        self.queue_size = max(
+            1, configs.get("EVA_QUEUE_SIZE", 8) if queue_size is None else queue_size
+        )
+        self._queue: "queue.Queue[Optional[Tuple[EvaluationTask, Future]]]" = (
+            queue.Queue(maxsize=self.queue_size)
+        )
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """
+        Start the worker threads if they are not running.
+        """
+        with self._lock:
+            if self._threads:
+                return
+
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._work_loop,
+                    name="evaluation-{index}".format(index=index),
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, task: EvaluationTask) -> Future:
+        """
+        Queue a task for evaluation.
+        :param task: The evaluation task.
+        :return: The future of the evaluation result and cost.
+        """
+        self.start()
+
+        future = Future()
+        self._queue.put((task, future))
+
+        return future
+
+    def evaluate(self, task: EvaluationTask) -> Tuple[Dict[str, Any], float]:
+        """
+        Evaluate a task on the service and wait for the result.
+        :param task: The evaluation task.
+        :return: The evaluation result and the cost of the LLM.
+        """
+        return self.submit(task).result()
+
+    def close(self) -> None:
+        """
+        Evaluate the queued tasks and stop the worker threads.
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+
+        for _ in threads:
+            self._queue.put(None)
+
+        for thread in threads:
+            thread.join()
+
+    def _work_loop(self) -> None:
+        """
+        Evaluate the queued tasks until the service is closed.
+        """
+        while True:
+            item = self._queue.get()
+
+            if item is None:
+                return
+
+            task, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                future.set_result(evaluate_task(task))
+            except Exception as e:
+                future.set_exception(e)
+
+    def __enter__(self) -> "EvaluationService":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+_service: Optional[EvaluationService] = None
+_service_lock = threading.Lock()
+
+
+def get_evaluation_service() -> EvaluationService:
+    """
+    Get the evaluation service shared by the sessions of the process.
+    :return: The evaluation service.
+    """
+    global _service
+
+    with _service_lock:
+        if _service is None:
+            _service = EvaluationService()
+        return _service
+
+
+def find_session_folders(logs_dir: str) -> List[str]:
+    """
+    Find the session folders with a step log, the folder itself or its sub-folders.
+    :param logs_dir: The folder of the logs.
+    :return: The session folders.
+    """
+    if os.path.exists(os.path.join(logs_dir, STEP_LOG_FILE)):
+        return [logs_dir]
+
+    return sorted(
+        os.path.join(logs_dir, name)
+        for name in os.listdir(logs_dir)
+        if os.path.exists(os.path.join(logs_dir, name, STEP_LOG_FILE))
+    )
+
+
+def load_evaluation(log_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Load the last evaluation result of a session folder.
+    :param log_path: The session folder.
+    :return: The evaluation result, or None if the session is not evaluated.
+    """
+    evaluation_log = os.path.join(log_path, EVALUATION_LOG_FILE)
+
+    if not os.path.exists(evaluation_log):
+        return None
+
+    results = list(utils.iter_json_lines(evaluation_log, last_k=1))
+
+    return results[-1] if results else None
+
+
+def task_from_logs(log_path: str) -> EvaluationTask:
+    """
+    Create the evaluation task of a historical session folder from its logs.
+    The request is the request of the last evaluation, or else the requests of the steps in order.
+    :param log_path: The session folder.
+    :return: The evaluation task.
+    """
+
+    requests = []
+    app_root_name = None
+
+    for log in utils.iter_json_lines(
+        os.path.join(log_path, STEP_LOG_FILE), on_error=lambda line, error: None
+    ):
+        request = log.get("Request")
+        if request and request not in requests:
+            requests.append(request)
+        if log.get("Application"):
+            app_root_name = log.get("Application")
+
+    evaluation = load_evaluation(log_path)
+
+    if evaluation is not None and evaluation.get("request"):
+        request = evaluation["request"]
+    elif len(requests) == 1:
+        request = requests[0]
+    else:
+        request = json.dumps(
+            [{"request_{i}".format(i=i): request} for i, request in enumerate(requests)]
+        )
+
+    return EvaluationTask(
+        log_path=log_path, request=request, app_root_name=app_root_name
+    )
+
+
+def evaluate_folders(
+    logs_dir: str, workers: Optional[int] = None, force: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Evaluate the session folders of historical logs concurrently, and append the results to their evaluation logs.
+    :param logs_dir: The folder of the logs.
+    :param workers: The number of concurrent evaluations. Default is EVA_WORKERS.
+    :param force: Whether to evaluate again the sessions that are already evaluated.
+    :return: The summary records, one per session.
+    """
+
+    summary = []
+    pending = []
+
+    with EvaluationService(workers=workers) as service:
+        for log_path in find_session_folders(logs_dir):
+            record = {"session": os.path.basename(os.path.normpath(log_path))}
+            summary.append(record)
+
+            evaluation = load_evaluation(log_path)
+            if evaluation is not None and not force:
+                record.update(
+                    {
+                        "complete": evaluation.get("complete"),
+                        "cost": 0.0,
+                        "skipped": True,
+                    }
+                )
+                continue
+
+            pending.append((log_path, record, service.submit(task_from_logs(log_path))))
+
+    for log_path, record, future in pending:
+        try:
+            result, cost = future.result()
+        except Exception:
+            record.update({"complete": "error", "cost": 0.0})
+            utils.print_with_color(
+                "Error in evaluating the session {name}: {error}".format(
+                    name=record["session"], error=traceback.format_exc()
+                ),
+                "red",
+            )
+            continue
+
+        with open(
+            os.path.join(log_path, EVALUATION_LOG_FILE), "a", encoding="utf-8"
+        ) as f:
+            f.write(json.dumps(result) + "\n")
+
+        record.update({"complete": result.get("complete"), "cost": cost})
+
+    return summary
@@ -0,0 +1,256 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+This module exports the step logs of the sessions (response.log) to Parquet files with typed columns,
+so that the logs of many sessions can be scanned without parsing the JSON lines again.
+
+Writing Parquet files requires pyarrow, e.g. 'pip install pyarrow'.
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from ufo.utils import iter_json_lines, print_with_color
+
+STEP_LOG_FILE = "response.log"
+EXPORT_FILE = "steps.parquet"
+
+# The columns of the export, with the keys of the step log they are read from and their types.
+# The error entries of the step log use lower-case keys.
+STEP_COLUMNS = {
+    "step": (["Step", "step"], "Int64"),
+    "round": (["Round"], "Int64"),
+    "round_step": (["RoundStep"], "Int64"),
+    "subtask_index": (["SubtaskIndex"], "Int64"),
+    "agent": (["Agent"], "string"),
+    "agent_name": (["AgentName"], "string"),
+    "application": (["Application"], "string"),
+    "request": (["Request"], "string"),
+    "subtask": (["Subtask"], "string"),
+    "control_text": (["ControlText"], "string"),
+    "action": (["Action"], "string"),
+    "action_type": (["ActionType"], "string"),
+    "status": (["Status", "status"], "string"),
+    "results": (["Results"], "string"),
+    "cost": (["Cost"], "float64"),
+    "latency": (["Latency"], "float64"),
+}
+
+
+def _column_value(record: Dict[str, Any], keys: List[str], dtype: str) -> Any:
+    """
+    Get the value of a column from a step log entry.
+    :param record: The step log entry.
+    :param keys: The keys of the column in the step log.
+    :param dtype: The type of the column.
+    :return: The value, or None if it is missing or invalid.
+    """
+    for key in keys:
+        value = record.get(key)
+        if value is None or value == "":
+            continue
+        if dtype == "string":
+            return value if isinstance(value, str) else json.dumps(value)
+        try:
+            return int(value) if dtype == "Int64" else float(value)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def records_to_frame(records: Iterable[Dict[str, Any]], session: str) -> pd.DataFrame:
+    """
+    Convert the entries of a step log to a data frame with typed columns.
+    The full entry is kept as JSON in the "record" column.
+    :param records: The step log entries.
+    :param session: The name of the session, e.g. the name of its log folder.
+    :return: The data frame with one row per entry.
+    """
+    rows = [
+        {
+            "session": session,
+            **{
+                column: _column_value(record, keys, dtype)
+                for column, (keys, dtype) in STEP_COLUMNS.items()
+            },
+            "record": json.dumps(record),
+        }
+        for record in records
+        if isinstance(record, dict)
+    ]
+
+    frame = pd.DataFrame(rows, columns=["session", *STEP_COLUMNS.keys(), "record"])
+
+    return frame.astype(
+        {
+            "session": "string",
+            **{column: dtype for column, (_, dtype) in STEP_COLUMNS.items()},
+            "record": "string",
+        }
+    )
+
+
+def get_session_name(log_path: str) -> str:
+    """
+    Get the name of a session from its log folder.
+    :param log_path: The log folder of the session.
+    :return: The name of the session.
+    """
+    return os.path.basename(os.path.normpath(log_path))
+
+
+def export_session(log_path: str, output_path: Optional[str] = None) -> str:
+    """
+    Export the step log of a session to a Parquet file.
+    :param log_path: The log folder of the session.
+    :param output_path: The path of the Parquet file, default is steps.parquet in the log folder.
+    :return: The path of the Parquet file.
+    """
+    output_path = output_path or os.path.join(log_path, EXPORT_FILE)
+
+    records = iter_json_lines(
+        os.path.join(log_path, STEP_LOG_FILE),
+        on_error=lambda line, _: print_with_color(
+            f"Warning: Unable to parse line as JSON: {line}", "yellow"
+        ),
+    )
+    records_to_frame(records, get_session_name(log_path)).to_parquet(
+        output_path, index=False
+    )
+
+    return output_path
+
+
+def query_sessions(
+    logs_dir: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[tuple]] = None,
+    export_missing: bool = True,
+) -> pd.DataFrame:
+    """
+    Load the steps of all the sessions in a logs folder from their Parquet files.
+    :param logs_dir: The folder of the session log folders, e.g. "logs/".
+    :param columns: The columns to load, default is all.
+    :param filters: The row filters in the pandas.read_parquet format, e.g. [("agent", "==", "ActAgent")].
+    :param export_missing: Whether to export the sessions with a step log but no Parquet file first.
+    :return: The steps of all the sessions.
+    """
+    if export_missing:
+        for step_log in glob.glob(os.path.join(logs_dir, "*", STEP_LOG_FILE)):
+            log_path = os.path.dirname(step_log)
+            export_path = os.path.join(log_path, EXPORT_FILE)
+            if not os.path.exists(export_path) or os.path.getmtime(
+                export_path
+            ) < os.path.getmtime(step_log):
+                export_session(log_path)
+
+    files = sorted(glob.glob(os.path.join(logs_dir, "*", EXPORT_FILE)))
+
+    if not files:
+        steps = records_to_frame([], "")
+        return steps[columns] if columns else steps
+
+    # The files are scanned together as one dataset, reading only the selected columns and row groups.
+    dataset = ds.dataset(files, format="parquet")
+    table = dataset.to_table(
+        columns=columns,
+        filter=pq.filters_to_expression(filters) if filters else None,
+    )
+
+    return table.to_pandas()
+
+
+class StepExportHandler(logging.Handler):
+    """
+    A handler of the step logger collecting the step log entries of a session,
+    and writing them to its Parquet file when it is flushed or closed.
+    """
+
+    def __init__(self, log_path: str) -> None:
+        """
+        Create a new StepExportHandler.
+        :param log_path: The log folder of the session.
+        """
+        super().__init__()
+        self.log_path = log_path
+        self._records: List[Dict[str, Any]] = []
+        self._exported = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Collect a step log entry. Entries logged as strings are parsed.
+        :param record: The log record.
+        """
+        entry = record.msg
+
+        if isinstance(entry, str):
+            try:
+                entry = json.loads(entry)
+            except json.JSONDecodeError:
+                return
+
+        if isinstance(entry, dict):
+            self._records.append(entry)
+
+    def flush(self) -> None:
+        """
+        Write the collected entries to the Parquet file if there are new ones.
+        """
+        self.acquire()
+        try:
+            if len(self._records) == self._exported:
+                return
+            records_to_frame(self._records, get_session_name(self.log_path)).to_parquet(
+                os.path.join(self.log_path, EXPORT_FILE), index=False
+            )
+            self._exported = len(self._records)
+        except Exception as e:
+            print_with_color(
+                "Warning: Failed to export the step log to Parquet: {error}".format(
+                    error=e
+                ),
+                "yellow",
+            )
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        """
+        Write the collected entries and close the handler.
+        """
+        self.flush()
+        super().close()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Export the step logs of the sessions to Parquet and summarize them."
+    )
+    parser.add_argument("logs_dir", help="The folder of the session log folders.")
+    args = parser.parse_args()
+
+    steps = query_sessions(args.logs_dir)
+
+    print_with_color(
+        "{sessions} sessions, {steps} steps, total cost ${cost:.2f}.".format(
+            sessions=steps["session"].nunique(),
+            steps=len(steps),
+            cost=steps["cost"].sum(),
+        ),
+        "green",
+    )
+    print(
+        steps.groupby("agent")[["cost", "latency"]]
+        .agg(["count", "mean", "sum"])
+        .to_string()
+    )
@@ -0,0 +1,327 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+This module contains the log writers of the session logs, e.g. response.log and request.log.
+
+The processors pass the log entries as dictionaries, which are serialized to JSON lines by the JSONLineFormatter.
+With the AsyncLogHandler, the serialization and the disk I/O run in a background thread and the records are written in batches,
+so that they are not on the critical path of a step.
+"""
+
+import base64
+import binascii
+import copy
+import gzip
+import hashlib
+import importlib
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Any, Dict, List, Optional, TextIO
+
+# The suffixes of the compressed log files.
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+# The log files read back as plain JSON lines by the evaluation, the experience learning and the trajectory cache.
+UNCOMPRESSED_LOGS = frozenset(["response.log", "evaluation.log"])
+
+_IMAGE_URL_PREFIX = "data:image/"
+
+
+def open_log_stream(file_path: str, compression: str = "") -> TextIO:
+    """
+    Open a log file for appending text.
+    :param file_path: The path of the log file, with the suffix of the compression.
+    :param compression: The compression, "gzip", "zstd" or "" for none.
+    :return: The text stream.
+    """
+    if not compression:
+        return open(file_path, "a", encoding="utf-8")
+    elif compression == "gzip":
+        return gzip.open(file_path, "at", encoding="utf-8")
+    elif compression == "zstd":
+        try:
+            zstandard = importlib.import_module("zstandard")
+        except ImportError:
+            raise ImportError(
+                "The zstd log compression requires the zstandard package, install it with 'pip install zstandard'."
+            )
+        return zstandard.open(file_path, "at", encoding="utf-8")
+    else:
+        raise ValueError(
+            "Unsupported log compression: {compression}, expected one of {supported}.".format(
+                compression=compression, supported=list(COMPRESSION_SUFFIXES)
+            )
+        )
+
+
+class CompressedFileHandler(logging.FileHandler):
+    """
+    A file handler writing to a gzip or zstd compressed log file.
+    """
+
+    def __init__(self, filename: str, compression: str) -> None:
+        """
+        Create a new CompressedFileHandler.
+        :param filename: The path of the log file, with the suffix of the compression.
+        :param compression: The compression, "gzip" or "zstd".
+        """
+        self.compression = compression
+        super().__init__(filename, encoding="utf-8")
+
+    def _open(self) -> TextIO:
+        """
+        Open the compressed log file.
+        :return: The text stream.
+        """
+        return open_log_stream(self.baseFilename, self.compression)
+
+
+def create_file_handler(file_path: str, compression: str = "") -> logging.FileHandler:
+    """
+    Create the file handler of a log file.
+    :param file_path: The path of the log file.
+    :param compression: The compression, "gzip", "zstd" or "" for none. The compressed file gets the suffix of the compression.
+    :return: The file handler.
+    """
+    if not compression:
+        return logging.FileHandler(file_path, encoding="utf-8")
+
+    if os.path.basename(file_path) in UNCOMPRESSED_LOGS:
+        raise ValueError(
+            "The log file {name} is read back as plain text and cannot be compressed.".format(
+                name=os.path.basename(file_path)
+            )
+        )
+
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(
+            "Unsupported log compression: {compression}, expected one of {supported}.".format(
+                compression=compression, supported=list(COMPRESSION_SUFFIXES)
+            )
+        )
+
+    return CompressedFileHandler(
+        file_path + COMPRESSION_SUFFIXES[compression], compression
+    )
+
+
+class JSONLineFormatter(logging.Formatter):
+    """
+    A formatter writing the log entries as JSON lines. Dictionaries and lists are serialized to JSON,
+    and strings, e.g. entries serialized by the caller, are written as they are.
+    """
+
+    def __init__(self, image_folder: Optional[str] = None) -> None:
+        """
+        Create a new JSONLineFormatter.
+        :param image_folder: The folder to save the base64 images of the entries to, so that the entries only reference them.
+        If None, the images are kept inline.
+        """
+        super().__init__("%(message)s")
+        self.image_folder = image_folder
+        # The references of the saved images, keyed by the hash of their data URL.
+        self._image_references: Dict[str, str] = {}
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Format a log record.
+        :param record: The log record.
+        :return: The formatted log line.
+        """
+        if not isinstance(record.msg, (dict, list)):
+            return super().format(record)
+
+        entry = record.msg
+        if self.image_folder is not None:
+            entry = self.replace_images(entry)
+
+        return json.dumps(entry)
+
+    def replace_images(self, value: Any) -> Any:
+        """
+        Replace the base64 images in a log entry with references to the saved images. The entry itself is not changed.
+        :param value: The log entry or a value in it.
+        :return: The value with the image references.
+        """
+        if isinstance(value, str):
+            if value.startswith(_IMAGE_URL_PREFIX):
+                return self.save_image(value)
+            return value
+        elif isinstance(value, dict):
+            return {key: self.replace_images(item) for key, item in value.items()}
+        elif isinstance(value, (list, tuple)):
+            return [self.replace_images(item) for item in value]
+        return value
+
+    def save_image(self, image_url: str) -> str:
+        """
+        Save a base64 image once and get its reference.
+        :param image_url: The data URL of the image, e.g. "data:image/png;base64,...".
+        :return: The path of the saved image relative to the log folder, or the data URL if it cannot be decoded.
+        """
+        key = hashlib.sha1(image_url.encode("utf-8")).hexdigest()
+
+        if key in self._image_references:
+            return self._image_references[key]
+
+        header, _, data = image_url.partition(",")
+        extension = header[len(_IMAGE_URL_PREFIX) :].split(";")[0] or "png"
+
+        try:
+            image = base64.b64decode(data)
+        except (binascii.Error, ValueError):
+            return image_url
+
+        os.makedirs(self.image_folder, exist_ok=True)
+        file_name = "{key}.{extension}".format(key=key, extension=extension)
+
+        with open(os.path.join(self.image_folder, file_name), "wb") as f:
+            f.write(image)
+
+        reference = "/".join(
+            [os.path.basename(os.path.normpath(self.image_folder)), file_name]
+        )
+        self._image_references[key] = reference
+
+        return reference
+
+
+class AsyncLogHandler(logging.Handler):
+    """
+    A handler putting the log records on a queue. A background thread formats the queued records
+    with the target handler and writes them in batches.
+    """
+
+    _FLUSH = object()
+
+    def __init__(self, target: logging.StreamHandler, batch_size: int = 64) -> None:
+        """
+        Create a new AsyncLogHandler.
+        :param target: The handler writing the records, e.g. a file handler.
+        :param batch_size: The maximum number of records written before the stream is flushed.
+        """
+        super().__init__()
+        self.target = target
+        self.batch_size = batch_size
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._write_loop, name="log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Queue a log record. It is formatted in the background thread, so a dictionary or a list entry is copied first,
+        as the caller may change its nested values before it is written.
+        :param record: The log record.
+        """
+        if isinstance(record.msg, (dict, list)):
+            record.msg = copy.deepcopy(record.msg)
+
+        self._queue.put(record)
+
+    def flush(self) -> None:
+        """
+        Wait until the queued records are written.
+        """
+        if self._closed or not self._thread.is_alive():
+            return
+
+        written = threading.Event()
+        self._queue.put((self._FLUSH, written))
+        written.wait()
+
+    def close(self) -> None:
+        """
+        Write the queued records, stop the background thread and close the target handler.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+            self.target.close()
+        super().close()
+
+    def _write_loop(self) -> None:
+        """
+        Write the queued records until the handler is closed.
+        """
+        while True:
+            batch: List[Any] = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = self._write_batch(batch)
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[Any]) -> bool:
+        """
+        Write a batch of queued items and flush the stream once.
+        :param batch: The queued records, flush requests and stop marker.
+        :return: Whether the stop marker is in the batch.
+        """
+        stop = False
+        waiters = []
+
+        self.target.acquire()
+        try:
+            for item in batch:
+                if item is None:
+                    stop = True
+                elif isinstance(item, tuple) and item[0] is self._FLUSH:
+                    waiters.append(item[1])
+                else:
+                    self._write_record(item)
+            self.target.flush()
+        finally:
+            self.target.release()
+            for waiter in waiters:
+                waiter.set()
+
+        return stop
+
+    def _write_record(self, record: logging.LogRecord) -> None:
+        """
+        Format and write a log record with the target handler.
+        :param record: The log record.
+        """
+        try:
+            self.target.stream.write(
+                self.target.format(record) + self.target.terminator
+            )
+        except Exception:
+            self.target.handleError(record)
+
+
+def flush_logger(logger: Optional[logging.Logger]) -> None:
+    """
+    Wait until the records of a logger are written, e.g. before the log file is read.
+    :param logger: The logger.
+    """
+    if logger is None:
+        return
+
+    for handler in logger.handlers:
+        handler.flush()
+
+
+def close_logger(logger: Optional[logging.Logger]) -> None:
+    """
+    Write the remaining records of a logger and close its handlers.
+    :param logger: The logger.
+    """
+    if logger is None:
+        return
+
+    for handler in list(logger.handlers):
+        handler.close()
+        logger.removeHandler(handler)
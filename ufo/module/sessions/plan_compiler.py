@@ -0,0 +1,302 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+This module validates and compiles the plan files of the follower mode. A step of a plan is either a string in natural
+language, followed by the FollowerAgent with the LLM, or a dictionary of the request and the action recorded for it,
+with the keys of the response.log of a session:
+
+    {
+        "request": "Click 'Home' tab to show the 'Styles' ribbon tab",
+        "ControlText": "Home",
+        "ControlType": "TabItem",
+        "Function": "click_input",
+        "Args": {"button": "left", "double": false}
+    }
+
+A step with a recorded action is replayed directly on the control of the same text and type, without calling the LLM.
+It falls back to the LLM if the control is not found or is ambiguous. A step without a ControlText is an API call,
+replayed without selecting a control. The plan files of a folder can be validated in bulk before a batch run with:
+
+    python -m ufo.module.sessions.plan_compiler {plan_folder}
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+# The keys of a recorded action in a step, as in the response.log of a session.
+ACTION_KEYS = ("ControlText", "ControlType", "Function", "Args")
+
+
+@dataclass
+class PlanStep:
+    """
+    A compiled step of a plan, with the action recorded for it if any.
+    """
+
+    request: str
+    control_text: Optional[str] = None
+    control_type: Optional[str] = None
+    function: Optional[str] = None
+    args: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def is_direct(self) -> bool:
+        """
+        Check if the step has a recorded action to replay without the LLM.
+        :return: True if the step has a recorded action, False otherwise.
+        """
+        return bool(self.function)
+
+    def match_control(self, control_info: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Find the control of the recorded action among the controls of the window.
+        :param control_info: The label, the control text and the control type (or class) of each control.
+        :return: The label of the only matching control, "" for an API call without a control, or None if the
+        control is not found or several controls match.
+        """
+        if not self.control_text:
+            return ""
+
+        labels = [
+            info.get("label")
+            for info in control_info
+            if info.get("control_text") == self.control_text
+            and (
+                not self.control_type
+                or self.control_type
+                in (info.get("control_type"), info.get("control_class"))
+            )
+        ]
+
+        return labels[0] if len(labels) == 1 else None
+
+    def to_raw(self) -> Union[str, Dict[str, Any]]:
+        """
+        Convert the step back to its form in the plan file, e.g. to save it in a checkpoint.
+        :return: The request string, or the dictionary of the request and the recorded action.
+        """
+        if not self.is_direct:
+            return self.request
+
+        raw = {"request": self.request, "Function": self.function, "Args": self.args}
+        if self.control_text:
+            raw["ControlText"] = self.control_text
+        if self.control_type:
+            raw["ControlType"] = self.control_type
+
+        return raw
+
+
+def validate_step(step: Any, index: int) -> List[str]:
+    """
+    Validate a step of a plan.
+    :param step: The step, a string or a dictionary with a recorded action.
+    :param index: The index of the step in the plan.
+    :return: The problems found.
+    """
+    name = "Step {index}".format(index=index + 1)
+
+    if isinstance(step, str):
+        return [] if step.strip() else ["{name} is empty.".format(name=name)]
+
+    if not isinstance(step, dict):
+        return [
+            "{name} must be a string or an object, not {type}.".format(
+                name=name, type=type(step).__name__
+            )
+        ]
+
+    problems = []
+
+    if not isinstance(step.get("request"), str) or not step["request"].strip():
+        problems.append("{name} has no request.".format(name=name))
+
+    for key in ("ControlText", "ControlType", "Function"):
+        if key in step and not isinstance(step[key], str):
+            problems.append(
+                "{name}: {key} must be a string.".format(name=name, key=key)
+            )
+
+    if "Args" in step and not isinstance(step["Args"], dict):
+        problems.append("{name}: Args must be an object.".format(name=name))
+
+    if not step.get("Function") and any(
+        step.get(key) for key in ACTION_KEYS if key != "Function"
+    ):
+        problems.append(
+            "{name} has a recorded control or arguments but no Function.".format(
+                name=name
+            )
+        )
+
+    unknown_keys = sorted(set(step) - set(ACTION_KEYS) - {"request"})
+    if unknown_keys:
+        problems.append(
+            "{name} has unknown keys: {keys}.".format(
+                name=name, keys=", ".join(unknown_keys)
+            )
+        )
+
+    return problems
+
+
+def validate_plan(plan: Any) -> List[str]:
+    """
+    Validate a plan.
+    :param plan: The plan loaded from a plan file.
+    :return: The problems found.
+    """
+    if not isinstance(plan, dict):
+        return ["The plan must be an object."]
+
+    problems = []
+
+    for key in ("task", "object"):
+        if not isinstance(plan.get(key), str) or not plan[key].strip():
+            problems.append("The plan has no {key}.".format(key=key))
+
+    steps = plan.get("steps")
+    if not isinstance(steps, list) or not steps:
+        problems.append("The plan has no steps.")
+    else:
+        for index, step in enumerate(steps):
+            problems.extend(validate_step(step, index))
+
+    return problems
+
+
+def compile_step(step: Union[str, Dict[str, Any]]) -> PlanStep:
+    """
+    Compile a valid step of a plan.
+    :param step: The step, a string or a dictionary with a recorded action.
+    :return: The compiled step.
+    """
+    if isinstance(step, str):
+        return PlanStep(request=step)
+
+    return PlanStep(
+        request=step["request"],
+        control_text=step.get("ControlText") or None,
+        control_type=step.get("ControlType") or None,
+        function=step.get("Function") or None,
+        args=step.get("Args", {}),
+    )
+
+
+def compile_steps(steps: List[Union[str, Dict[str, Any]]]) -> List[PlanStep]:
+    """
+    Validate and compile the steps of a plan.
+    :param steps: The steps.
+    :return: The compiled steps.
+    """
+    problems = [
+        problem
+        for index, step in enumerate(steps)
+        for problem in validate_step(step, index)
+    ]
+    if problems:
+        raise ValueError("Invalid plan steps: " + " ".join(problems))
+
+    return [compile_step(step) for step in steps]
+
+
+def load_plan(plan_file: str) -> Dict[str, Any]:
+    """
+    Load and validate a plan file.
+    :param plan_file: The path of the plan file.
+    :return: The plan.
+    """
+    with open(plan_file, "r", encoding="utf-8") as f:
+        plan = json.load(f)
+
+    problems = validate_plan(plan)
+    if problems:
+        raise ValueError(
+            "Invalid plan file {path}: {problems}".format(
+                path=plan_file, problems=" ".join(problems)
+            )
+        )
+
+    return plan
+
+
+def validate_plan_files(plan_files: List[str]) -> Dict[str, List[str]]:
+    """
+    Validate the plan files in bulk, e.g. before a batch run.
+    :param plan_files: The paths of the plan files.
+    :return: The problems found in each plan file, empty for a valid plan file.
+    """
+    results = {}
+
+    for plan_file in plan_files:
+        try:
+            with open(plan_file, "r", encoding="utf-8") as f:
+                results[plan_file] = validate_plan(json.load(f))
+        except (OSError, ValueError) as e:
+            results[plan_file] = [
+                "The plan file cannot be loaded: {error}".format(error=e)
+            ]
+
+    return results
+
+
+def get_plan_files(path: str) -> List[str]:
+    """
+    Get the plan files of a folder, or the plan file itself.
+    :param path: The path of the plan file or the folder.
+    :return: The paths of the plan files.
+    """
+    if not os.path.isdir(path):
+        return [path]
+
+    return sorted(
+        os.path.join(path, f) for f in os.listdir(path) if f.endswith(".json")
+    )
+
+
+if __name__ == "__main__":
+
+    import argparse
+    import sys
+
+    from ufo.utils import print_with_color
+
+    parser = argparse.ArgumentParser(
+        description="Validate the plan files of the follower mode."
+    )
+    parser.add_argument("plan", help="The plan file, or the folder of the plan files.")
+    args = parser.parse_args()
+
+    results = validate_plan_files(get_plan_files(args.plan))
+
+    direct_steps = total_steps = 0
+    for plan_file, problems in results.items():
+        if problems:
+            print_with_color(
+                "{path}: {problems}".format(
+                    path=plan_file, problems=" ".join(problems)
+                ),
+                "red",
+            )
+            continue
+
+        steps = compile_steps(load_plan(plan_file)["steps"])
+        direct_steps += sum(step.is_direct for step in steps)
+        total_steps += len(steps)
+
+    invalid = sum(bool(problems) for problems in results.values())
+    print_with_color(
+        "{valid} of {num} plan files are valid, {direct} of their {total} steps have a recorded action.".format(
+            valid=len(results) - invalid,
+            num=len(results),
+            direct=direct_steps,
+            total=total_steps,
+        ),
+        "yellow" if invalid else "green",
+    )
+
+    if invalid:
+        sys.exit(1)
@@ -1,10 +1,11 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-import json
-from typing import List, Optional
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Union
 
 from ufo.config.config import Config
+from ufo.module.sessions.plan_compiler import PlanStep, compile_steps, load_plan
 
 configs = Config.get_instance().config_data
 
@@ -16,13 +17,13 @@ class PlanReader:
 
     def __init__(self, plan_file: str):
         """
-        Initialize a plan reader.
+        Initialize a plan reader. The plan file is validated and its steps are compiled.
         :param plan_file: The path of the plan file.
         """
 
-        with open(plan_file, "r") as f:
-            self.plan = json.load(f)
-        self.remaining_steps = self.get_steps()
+        self.plan = load_plan(plan_file)
+        self.remaining_steps: Deque[PlanStep] = deque(compile_steps(self.get_steps()))
+        self.current_step: Optional[PlanStep] = None
 
     def get_task(self) -> str:
         """
@@ -32,7 +33,7 @@ class PlanReader:
 
         return self.plan.get("task", "")
 
-    def get_steps(self) -> List[str]:
+    def get_steps(self) -> List[Union[str, Dict[str, Any]]]:
         """
         Get the steps in the plan.
         :return: The steps in the plan.
@@ -78,16 +79,33 @@ class PlanReader:
 
     def next_step(self) -> Optional[str]:
         """
-        Get the next step in the plan.
-        :return: The next step.
+        Get the request of the next step in the plan. The compiled step is kept as the current step.
+        :return: The request of the next step.
         """
 
         if self.remaining_steps:
-            step = self.remaining_steps.pop(0)
-            return step
+            self.current_step = self.remaining_steps.popleft()
+            return self.current_step.request
 
+        self.current_step = None
         return None
 
+    def get_remaining_steps(self) -> List[Union[str, Dict[str, Any]]]:
+        """
+        Get the remaining steps in their form in the plan file, e.g. to save them in a checkpoint.
+        :return: The remaining steps.
+        """
+
+        return [step.to_raw() for step in self.remaining_steps]
+
+    def set_remaining_steps(self, steps: List[Union[str, Dict[str, Any]]]) -> None:
+        """
+        Set the remaining steps, e.g. restored from a checkpoint.
+        :param steps: The remaining steps in their form in the plan file.
+        """
+
+        self.remaining_steps = deque(compile_steps(steps))
+
     def task_finished(self) -> bool:
         """
         Check if the task is finished.
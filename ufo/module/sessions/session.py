@@ -1,15 +1,17 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import glob
 import os
-from typing import List
+from typing import Any, Dict, List
 
 from ufo import utils
 from ufo.agents.states.app_agent_state import ContinueAppAgentState
 from ufo.agents.states.host_agent_state import ContinueHostAgentState
 from ufo.config.config import Config
-from ufo.module import interactor
+from ufo.module import checkpoint, interactor
 from ufo.module.basic import BaseRound, BaseSession
+from ufo.module.sessions.plan_compiler import validate_plan_files
 from ufo.module.sessions.plan_reader import PlanReader
 from ufo.module.context import ContextNames
 
@@ -41,6 +43,61 @@ class SessionFactory:
         else:
             raise ValueError(f"The {mode} mode is not supported.")
 
+    def resume_session(self, log_path: str) -> List[BaseSession]:
+        """
+        Resume the sessions from their checkpoints.
+        :param log_path: The log folder of a session, or of a batch of sessions, e.g. logs/{task}/.
+        :return: The resumed sessions, without the sessions whose rounds are completed.
+        """
+        if os.path.exists(checkpoint.get_checkpoint_path(log_path)):
+            log_paths = [log_path]
+        else:
+            log_paths = sorted(
+                os.path.dirname(path)
+                for path in glob.glob(
+                    os.path.join(log_path, "*", checkpoint.CHECKPOINT_FILE)
+                )
+            )
+
+        if not log_paths:
+            raise FileNotFoundError(
+                "No checkpoint found in {path}, the session cannot be resumed.".format(
+                    path=log_path
+                )
+            )
+
+        sessions = []
+        for session_log_path in log_paths:
+            data = checkpoint.load_checkpoint(session_log_path)
+
+            if data["completed"]:
+                utils.print_with_color(
+                    "The session in {path} is completed, skipped.".format(
+                        path=session_log_path
+                    ),
+                    "yellow",
+                )
+                continue
+
+            if data["session_type"] == "Session":
+                session = Session(data["task"], data["should_evaluate"], id=data["id"])
+            elif data["session_type"] == "FollowerSession":
+                session = FollowerSession(
+                    data["task"],
+                    data["session"]["plan_file"],
+                    data["should_evaluate"],
+                    id=data["id"],
+                )
+            else:
+                raise ValueError(
+                    f"The {data['session_type']} session cannot be resumed."
+                )
+
+            session.restore_checkpoint(data)
+            sessions.append(session)
+
+        return sessions
+
     def create_follower_session_in_batch(
         self, task: str, plan: str
     ) -> List[BaseSession]:
@@ -50,7 +107,7 @@ class SessionFactory:
         :param plan: The path folder of all plan files.
         :return: The list of created follower sessions.
         """
-        plan_files = self.get_plan_files(plan)
+        plan_files = self.get_valid_plan_files(self.get_plan_files(plan))
         file_names = [self.get_file_name_without_extension(f) for f in plan_files]
         sessions = [
             FollowerSession(
@@ -64,6 +121,28 @@ class SessionFactory:
 
         return sessions
 
+    @staticmethod
+    def get_valid_plan_files(plan_files: List[str]) -> List[str]:
+        """
+        Validate the plan files in bulk before the sessions start, and skip the invalid ones.
+        :param plan_files: The plan files.
+        :return: The valid plan files.
+        """
+        valid_plan_files = []
+
+        for plan_file, problems in validate_plan_files(plan_files).items():
+            if problems:
+                utils.print_with_color(
+                    "The plan file {path} is invalid, skipped: {problems}".format(
+                        path=plan_file, problems=" ".join(problems)
+                    ),
+                    "red",
+                )
+            else:
+                valid_plan_files.append(plan_file)
+
+        return valid_plan_files
+
     @staticmethod
     def is_folder(path: str) -> bool:
         """
@@ -96,13 +175,33 @@ class Session(BaseSession):
     A session for UFO.
     """
 
-    def run(self) -> None:
+    def __init__(self, task: str, should_evaluate: bool, id: int) -> None:
         """
-        Run the session.
+        Initialize a session.
+        :param task: The name of current task.
+        :param should_evaluate: Whether to evaluate the session.
+        :param id: The id of the session.
+        """
+        super().__init__(task, should_evaluate, id)
+
+        # Whether the user asks to save the experience, asked at the end of run_ui.
+        self._save_experience = False
+
+    def run_ui(self) -> None:
+        """
+        Run the rounds of the session and ask the user whether to save the experience.
+        The user is asked here, on the main thread, since the finalization may run on a background worker.
+        """
+        super().run_ui()
+        self._save_experience = interactor.experience_asker()
+
+    def finalize(self) -> None:
+        """
+        Evaluate the session, write its logs and save the experience if the user asked so.
         """
-        super().run()
-        # Save the experience if the user asks so.
-        if interactor.experience_asker():
+        super().finalize()
+        # Save the experience if the user asked so.
+        if self._save_experience:
             self.experience_saver()
 
     def _init_context(self) -> None:
@@ -183,6 +282,7 @@ class FollowerSession(BaseSession):
 
         super().__init__(task, should_evaluate, id)
 
+        self.plan_file = plan_file
         self.plan_reader = PlanReader(plan_file)
 
     def _init_context(self) -> None:
@@ -218,6 +318,9 @@ class FollowerSession(BaseSession):
 
             agent.set_state(ContinueAppAgentState())
 
+        # The compiled plan step of the round, with the recorded action to replay if any.
+        self.context.set(ContextNames.PLAN_STEP, self.plan_reader.current_step)
+
         round = BaseRound(
             request=request,
             agent=agent,
@@ -253,3 +356,22 @@ class FollowerSession(BaseSession):
         """
 
         return self.plan_reader.get_task()
+
+    def checkpoint_data(self) -> Dict[str, Any]:
+        """
+        Get the plan file and the remaining steps of the plan to save in the checkpoint.
+        :return: The state of the plan.
+        """
+
+        return {
+            "plan_file": self.plan_file,
+            "remaining_steps": self.plan_reader.get_remaining_steps(),
+        }
+
+    def restore_checkpoint_data(self, data: Dict[str, Any]) -> None:
+        """
+        Restore the remaining steps of the plan from the checkpoint.
+        :param data: The state of the plan.
+        """
+
+        self.plan_reader.set_remaining_steps(data["remaining_steps"])
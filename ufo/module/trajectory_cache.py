@@ -0,0 +1,446 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+This module caches the successful action sequences of the AppAgent, keyed by the application and the normalized
+subtask, e.g. ("WINWORD.EXE", "insert a table"). The trajectories are extracted from the response.log of the finished
+sessions. When a subtask repeats, its cached actions are replayed without calling the LLM: each action is verified by
+finding its control, with the same control text and type, in the annotated controls of the current step, and the
+AppAgent falls back to the LLM for the rest of the subtask on the first action whose control is not found.
+
+The cache can be built from the folders of historical logs, and the replay can be evaluated on them, with:
+
+    python -m ufo.module.trajectory_cache build logs/{task_name}
+    python -m ufo.module.trajectory_cache benchmark logs/{task_name}
+"""
+
+import json
+import os
+import re
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from ufo import utils
+from ufo.config.config import Config
+from ufo.module.sessions.plan_compiler import PlanStep
+
+configs = Config.get_instance().config_data
+
+# The log of the prompts of the steps, with the annotated controls of each step in debug mode.
+CONTROL_LOG_FILE = "request.log"
+
+# The statuses of the steps which make a trajectory not replayable, e.g. the steps confirmed by the user.
+UNCACHEABLE_STATUSES = frozenset(["ERROR", "FAIL", "PENDING", "CONFIRM", "SCREENSHOT"])
+
+
+def normalize_request(request: str) -> str:
+    """
+    Normalize a request for the cache key: the step numbering, the punctuation, the case and the spaces are ignored.
+    :param request: The request.
+    :return: The normalized request.
+    """
+    request = re.sub(r"^\s*\d+\s*[.)]\s*", "", request)
+    return " ".join(re.sub(r"[^\w\s]", " ", request.lower()).split())
+
+
+def trajectory_key(app_root: str, request: str) -> str:
+    """
+    Get the cache key of a trajectory.
+    :param app_root: The root name of the application, e.g. WINWORD.EXE.
+    :param request: The request completed by the trajectory.
+    :return: The key.
+    """
+    return "{app}|{request}".format(
+        app=(app_root or "").lower(), request=normalize_request(request)
+    )
+
+
+def extract_trajectories(log_path: str) -> List[Dict[str, Any]]:
+    """
+    Extract the trajectories of the AppAgent subtasks from the logs of a session.
+    :param log_path: The session folder.
+    :return: The trajectories, with their key, the actions, whether they succeeded, and the session step, cost and latency
+    of their steps.
+    """
+    # The evaluation service imports the agents, which use the cache, so it is imported on use.
+    from ufo.module.evaluation_service import STEP_LOG_FILE, load_evaluation
+
+    evaluation = load_evaluation(log_path)
+    session_failed = evaluation is not None and evaluation.get("complete") == "no"
+
+    groups: List[List[Dict[str, Any]]] = []
+    for log in utils.iter_json_lines(
+        os.path.join(log_path, STEP_LOG_FILE), on_error=lambda line, error: None
+    ):
+        if log.get("Agent") != "ActAgent" or not log.get("Subtask"):
+            continue
+
+        subtask_id = (log.get("Round"), log.get("SubtaskIndex"), log.get("Subtask"))
+        if groups and groups[-1][0]["_id"] == subtask_id:
+            groups[-1].append(dict(log, _id=subtask_id))
+        else:
+            groups.append([dict(log, _id=subtask_id)])
+
+    trajectories = []
+    for steps in groups:
+        actions = [
+            PlanStep(
+                request=step["Subtask"],
+                control_text=step.get("ControlText") or None,
+                control_type=step.get("ControlType") or None,
+                function=step.get("Function"),
+                args=step.get("Args") if isinstance(step.get("Args"), dict) else {},
+            )
+            for step in steps
+            if step.get("Function")
+        ]
+        statuses = [str(step.get("Status", "")).upper() for step in steps]
+
+        trajectories.append(
+            {
+                "key": trajectory_key(steps[0].get("Application"), steps[0]["Subtask"]),
+                "app_root": steps[0].get("Application", ""),
+                "request": steps[0]["Subtask"],
+                "actions": [action.to_raw() for action in actions],
+                "success": bool(actions)
+                and statuses[-1] == "FINISH"
+                and not UNCACHEABLE_STATUSES.intersection(statuses)
+                and not session_failed,
+                "steps": [step.get("Step") for step in steps if step.get("Function")],
+                "costs": [
+                    step.get("Cost") or 0.0 for step in steps if step.get("Function")
+                ],
+                "latencies": [
+                    step.get("Latency") or 0.0 for step in steps if step.get("Function")
+                ],
+                "source": log_path,
+            }
+        )
+
+    return trajectories
+
+
+def load_control_items(log_path: str) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Load the annotated controls of the steps of a session from its request log. The controls are only logged in debug
+    mode, and a compressed request log is not read.
+    :param log_path: The session folder.
+    :return: The controls of each session step which logged them.
+    """
+    control_log = os.path.join(log_path, CONTROL_LOG_FILE)
+
+    if not os.path.exists(control_log):
+        return {}
+
+    control_items = {}
+    for log in utils.iter_json_lines(control_log, on_error=lambda line, error: None):
+        if isinstance(log, dict) and log.get("control_items"):
+            control_items[log.get("step")] = log["control_items"]
+
+    return control_items
+
+
+class TrajectoryReplay:
+    """
+    The replay of the cached actions of a subtask, verified step by step.
+    """
+
+    def __init__(self, key: str, actions: List[PlanStep]) -> None:
+        """
+        Initialize the replay.
+        :param key: The cache key of the trajectory.
+        :param actions: The cached actions.
+        """
+        self.key = key
+        self.actions: Deque[PlanStep] = deque(actions)
+        self.active = True
+        self.replayed = 0
+
+    def next_action(
+        self, control_info: List[Dict[str, Any]]
+    ) -> Optional[Tuple[str, PlanStep, bool]]:
+        """
+        Get the next cached action, verified against the controls of the current step.
+        The replay stops on the first action whose control is not found or is ambiguous.
+        :param control_info: The label, the control text and the control type (or class) of each control.
+        :return: The label of the control, the action and whether it is the last action, or None if the replay stopped.
+        """
+        if not self.active or not self.actions:
+            self.active = False
+            return None
+
+        action = self.actions[0]
+        control_label = action.match_control(control_info)
+
+        if control_label is None:
+            self.active = False
+            return None
+
+        self.actions.popleft()
+        self.replayed += 1
+
+        return control_label, action, not self.actions
+
+
+class TrajectoryCache:
+    """
+    The cache of the successful trajectories, saved in a JSON file. A newer trajectory of a key replaces the older one.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        """
+        Initialize the trajectory cache.
+        :param path: The path of the cache file. Default is TRAJECTORY_CACHE_PATH.
+        """
+        self.path = (
+            configs.get(
+                "TRAJECTORY_CACHE_PATH", "vectordb/trajectory_cache/trajectories.json"
+            )
+            if path is None
+            else path
+        )
+        self._trajectories: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def trajectories(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the cached trajectories, loaded from the cache file on the first access.
+        :return: The trajectories, keyed by the cache key.
+        """
+        with self._lock:
+            if self._trajectories is None:
+                self._trajectories = {}
+                if os.path.exists(self.path):
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        self._trajectories = json.load(f)
+            return self._trajectories
+
+    def save(self) -> None:
+        """
+        Save the cache file, replacing it at once so that a concurrent reader never sees a partial file.
+        """
+        trajectories = self.trajectories
+
+        with self._lock:
+            folder = os.path.dirname(self.path)
+            if folder:
+                utils.create_folder(folder)
+
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(trajectories, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+
+    def add(self, trajectory: Dict[str, Any]) -> None:
+        """
+        Add a successful trajectory to the cache.
+        :param trajectory: The trajectory extracted from the logs.
+        """
+        trajectories = self.trajectories
+
+        with self._lock:
+            trajectories[trajectory["key"]] = {
+                "app_root": trajectory["app_root"],
+                "request": trajectory["request"],
+                "actions": trajectory["actions"],
+                "source": trajectory["source"],
+            }
+
+    def add_from_logs(self, log_path: str) -> int:
+        """
+        Add the successful trajectories of a session folder to the cache and save it.
+        :param log_path: The session folder.
+        :return: The number of trajectories added.
+        """
+        trajectories = [
+            trajectory
+            for trajectory in extract_trajectories(log_path)
+            if trajectory["success"]
+        ]
+
+        for trajectory in trajectories:
+            self.add(trajectory)
+
+        if trajectories:
+            self.save()
+
+        return len(trajectories)
+
+    def lookup(self, app_root: str, request: str) -> Optional[List[PlanStep]]:
+        """
+        Get the cached actions of a request on an application.
+        :param app_root: The root name of the application.
+        :param request: The request.
+        :return: The cached actions, or None if the request is not cached.
+        """
+        trajectory = self.trajectories.get(trajectory_key(app_root, request))
+
+        if trajectory is None:
+            return None
+
+        return [
+            PlanStep(
+                request=action["request"],
+                control_text=action.get("ControlText"),
+                control_type=action.get("ControlType"),
+                function=action["Function"],
+                args=action.get("Args", {}),
+            )
+            for action in trajectory["actions"]
+        ]
+
+    def start_replay(self, app_root: str, request: str) -> Optional[TrajectoryReplay]:
+        """
+        Start the replay of the cached actions of a request on an application.
+        :param app_root: The root name of the application.
+        :param request: The request.
+        :return: The replay, or None if the request is not cached.
+        """
+        actions = self.lookup(app_root, request)
+
+        if not actions:
+            return None
+
+        return TrajectoryReplay(trajectory_key(app_root, request), actions)
+
+
+_cache: Optional[TrajectoryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_trajectory_cache() -> TrajectoryCache:
+    """
+    Get the trajectory cache shared by the sessions of the process.
+    :return: The trajectory cache.
+    """
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = TrajectoryCache()
+        return _cache
+
+
+def benchmark(logs_dir: str) -> Dict[str, float]:
+    """
+    Benchmark the replay on the recorded logs. Each subtask of a session is replayed with the cache built from the
+    other sessions, and a cached action is replayed if its function call matches the recorded step and its control is
+    found, unambiguously, in the annotated controls logged for the step in the request log. A step without logged
+    controls is verified against its recorded control only, which always matches, so the replay rate is an upper bound
+    when some steps are unverified.
+    :param logs_dir: The folder of the session folders.
+    :return: The hit rate, the share of the steps replayed, the number of unverified steps, and the LLM calls, cost and
+    latency saved.
+    """
+    from ufo.module.evaluation_service import find_session_folders
+
+    sessions = {
+        log_path: extract_trajectories(log_path)
+        for log_path in find_session_folders(logs_dir)
+    }
+
+    results = {
+        "subtasks": 0,
+        "hits": 0,
+        "full_replays": 0,
+        "steps": 0,
+        "replayed_steps": 0,
+        "unverified_steps": 0,
+        "cost_saved": 0.0,
+        "latency_saved": 0.0,
+    }
+
+    for log_path, trajectories in sessions.items():
+        # The cache of the other sessions, the later sessions replacing the earlier ones as in the online cache.
+        cache = TrajectoryCache(path="")
+        for other_path, other_trajectories in sessions.items():
+            if other_path != log_path:
+                for trajectory in other_trajectories:
+                    if trajectory["success"]:
+                        cache.add(trajectory)
+
+        control_items = load_control_items(log_path)
+
+        for trajectory in trajectories:
+            results["subtasks"] += 1
+            results["steps"] += len(trajectory["actions"])
+
+            replay = cache.start_replay(trajectory["app_root"], trajectory["request"])
+            if replay is None:
+                continue
+            results["hits"] += 1
+
+            for index, recorded in enumerate(trajectory["actions"]):
+                action = replay.actions[0] if replay.active and replay.actions else None
+                if action is None or (action.function, action.args) != (
+                    recorded["Function"],
+                    recorded.get("Args", {}),
+                ):
+                    break
+
+                control_info = control_items.get(trajectory["steps"][index])
+                if control_info is None:
+                    results["unverified_steps"] += 1
+                    control_info = [
+                        {
+                            "label": str(index),
+                            "control_text": recorded.get("ControlText"),
+                            "control_type": recorded.get("ControlType"),
+                        }
+                    ]
+                if replay.next_action(control_info) is None:
+                    break
+
+                results["replayed_steps"] += 1
+                results["cost_saved"] += trajectory["costs"][index]
+                results["latency_saved"] += trajectory["latencies"][index]
+
+            if replay.replayed == len(trajectory["actions"]):
+                results["full_replays"] += 1
+
+    results["hit_rate"] = results["hits"] / max(1, results["subtasks"])
+    results["replay_rate"] = results["replayed_steps"] / max(1, results["steps"])
+
+    return results
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    from ufo.module.evaluation_service import find_session_folders
+
+    parser = argparse.ArgumentParser(
+        description="Build the trajectory cache from historical logs, or benchmark the replay on them."
+    )
+    parser.add_argument("command", choices=["build", "benchmark"])
+    parser.add_argument(
+        "logs_dir", help="The session folder, or the folder of the session folders."
+    )
+    args = parser.parse_args()
+
+    if args.command == "build":
+        cache = get_trajectory_cache()
+        added = sum(
+            cache.add_from_logs(log_path)
+            for log_path in find_session_folders(args.logs_dir)
+        )
+        utils.print_with_color(
+            "{added} trajectories added, {num} cached in {path}.".format(
+                added=added, num=len(cache.trajectories), path=cache.path
+            ),
+            "green",
+        )
+    else:
+        results = benchmark(args.logs_dir)
+        utils.print_with_color(
+            "Subtasks: {subtasks}, cache hits: {hits} ({hit_rate:.1%}), full replays: {full_replays}.\n"
+            "Steps replayed without the LLM: {replayed_steps} of {steps} ({replay_rate:.1%}), "
+            "saving ${cost_saved:.2f} and {latency_saved:.1f}s of LLM latency.\n"
+            "Steps without logged controls: {unverified_steps}; when not 0, the replay rate is an upper bound.".format(
+                **results
+            ),
+            "yellow",
+        )
@@ -0,0 +1,224 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+This module warms up the models and the indexes configured for the session on background threads, e.g. the
+control filter models and the experience and demonstration indexes, while the user types the request and the
+HostAgent makes its first call. A preloaded resource is joined on its first use, which waits for the rest of its
+loading if it is not loaded yet, and the time saved is reported.
+
+The offline help document indexes are not preloaded, since they depend on the application selected by the HostAgent.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from ufo import utils
+from ufo.config.config import Config
+
+configs = Config.get_instance().config_data
+
+
+def control_filter_key(filter_type: str, model_name: str) -> str:
+    """
+    Get the key of a control filter model.
+    :param filter_type: The type of the control filter, "semantic" or "icon".
+    :param model_name: The name of the model.
+    :return: The key.
+    """
+    return "control_filter:{type}:{model}".format(type=filter_type, model=model_name)
+
+
+def retriever_key(retriever_type: str, db_path: str) -> str:
+    """
+    Get the key of a retriever of an index.
+    :param retriever_type: The type of the retriever, "experience" or "demonstration".
+    :param db_path: The path of the index.
+    :return: The key.
+    """
+    return "retriever:{type}:{path}".format(type=retriever_type, path=db_path)
+
+
+class ResourceWarmup:
+    """
+    The resources loaded on background threads, keyed by their names. A resource is handed over to its first user.
+    """
+
+    def __init__(self, workers: int = 2) -> None:
+        """
+        Initialize the warm-up.
+        :param workers: The number of background threads.
+        """
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._timings: List[Dict[str, Any]] = []
+
+    def _timed(self, loader: Callable[[], Any]) -> Dict[str, Any]:
+        """
+        Load a resource and measure its time.
+        :param loader: The function to load the resource.
+        :return: The resource, the start time and the end time.
+        """
+        start = time.time()
+        resource = loader()
+        return {"resource": resource, "start": start, "end": time.time()}
+
+    def preload(self, key: str, loader: Callable[[], Any]) -> None:
+        """
+        Start loading a resource on a background thread, if it is not loading or loaded yet.
+        :param key: The key of the resource.
+        :param loader: The function to load the resource.
+        """
+        with self._lock:
+            if key in self._futures:
+                return
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="warmup"
+                )
+
+            self._futures[key] = self._executor.submit(self._timed, loader)
+
+    def take(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Get a resource. A preloaded resource is handed over once, waiting for its loading to finish,
+        otherwise the resource is loaded on the calling thread.
+        :param key: The key of the resource.
+        :param loader: The function to load the resource.
+        :return: The resource.
+        """
+        with self._lock:
+            future = self._futures.pop(key, None)
+
+        if future is None:
+            return loader()
+
+        start = time.time()
+        try:
+            result = future.result()
+        except Exception as e:
+            utils.print_with_color(
+                "Warning: Failed to warm up {key}, load it again: {error}".format(
+                    key=key, error=e
+                ),
+                "yellow",
+            )
+            return loader()
+
+        timing = {
+            "key": key,
+            "load": result["end"] - result["start"],
+            "wait": time.time() - start,
+        }
+        self._timings.append(timing)
+
+        utils.print_with_color(
+            "Warm-up of {key}: loaded in {load:.1f}s, waited {wait:.1f}s on its first use.".format(
+                **timing
+            ),
+            "magenta",
+        )
+
+        return result["resource"]
+
+    @property
+    def timings(self) -> List[Dict[str, Any]]:
+        """
+        Get the timings of the resources handed over.
+        :return: The key, the load time and the wait time in seconds of each resource.
+        """
+        return list(self._timings)
+
+
+_warmup: Optional[ResourceWarmup] = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup() -> ResourceWarmup:
+    """
+    Get the warm-up shared by the sessions of the process.
+    :return: The warm-up.
+    """
+    global _warmup
+
+    with _warmup_lock:
+        if _warmup is None:
+            _warmup = ResourceWarmup(configs.get("WARMUP_WORKERS", 2))
+        return _warmup
+
+
+def _load_control_filter(filter_type: str, model_name: str) -> Any:
+    """
+    Load a control filter model.
+    :param filter_type: The type of the control filter, "semantic" or "icon".
+    :param model_name: The name of the model.
+    :return: The control filter.
+    """
+    from ufo.automator.ui_control.control_filter import ControlFilterFactory
+
+    return ControlFilterFactory.create_control_filter(filter_type, model_name)
+
+
+def _load_retriever(retriever_type: str, db_path: str) -> Any:
+    """
+    Load a retriever of an index.
+    :param retriever_type: The type of the retriever, "experience" or "demonstration".
+    :param db_path: The path of the index.
+    :return: The retriever.
+    """
+    from ufo.rag.retriever import RetrieverFactory
+
+    return RetrieverFactory.create_retriever(retriever_type, db_path)
+
+
+def warm_up_session() -> None:
+    """
+    Start loading the models and the indexes configured for a session on the background threads.
+    """
+    if not configs.get("WARMUP", True):
+        return
+
+    warmup = get_warmup()
+    control_filter_types = [
+        filter_type.lower() for filter_type in configs.get("CONTROL_FILTER_TYPE", [])
+    ]
+
+    for filter_type, model_name in [
+        ("semantic", configs.get("CONTROL_FILTER_MODEL_SEMANTIC_NAME")),
+        ("icon", configs.get("CONTROL_FILTER_MODEL_ICON_NAME")),
+    ]:
+        if filter_type in control_filter_types:
+            warmup.preload(
+                control_filter_key(filter_type, model_name),
+                lambda filter_type=filter_type, model_name=model_name: _load_control_filter(
+                    filter_type, model_name
+                ),
+            )
+
+    for retriever_type, enabled, db_path in [
+        (
+            "experience",
+            configs.get("RAG_EXPERIENCE", False),
+            os.path.join(configs.get("EXPERIENCE_SAVED_PATH", ""), "experience_db"),
+        ),
+        (
+            "demonstration",
+            configs.get("RAG_DEMONSTRATION", False),
+            os.path.join(
+                configs.get("DEMONSTRATION_SAVED_PATH", ""), "demonstration_db"
+            ),
+        ),
+    ]:
+        if enabled:
+            warmup.preload(
+                retriever_key(retriever_type, db_path),
+                lambda retriever_type=retriever_type, db_path=db_path: _load_retriever(
+                    retriever_type, db_path
+                ),
+            )
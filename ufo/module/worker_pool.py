@@ -0,0 +1,832 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+This module runs a folder of follower plans on a pool of workers, e.g. one worker per desktop or VM.
+
+The coordinator queues one task per plan file. Each worker pulls the next task when it is free, runs the plan
+in a follower session and sends the result back, so that the plans are sharded by the speed of the workers.
+The failed plans, and the plans of the workers that are lost or time out, are retried. Every task and result carries
+the attempt number of the plan, and the late results of a superseded attempt are dropped. A timed-out attempt is
+stopped if the transport can stop it, and each retry logs to its own session folder.
+
+The coordinator and the workers communicate through a transport: multiprocessing queues for local worker processes,
+or JSON lines over TCP sockets for remote workers.
+
+Coordinator: python -m ufo.module.worker_pool coordinator -t task_name -p plan_folder --port 8600
+Worker (on each desktop): python -m ufo.module.worker_pool worker --host coordinator_host --port 8600
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import threading
+import time
+import traceback
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+from ufo.config.config import Config
+from ufo.module.sessions.plan_compiler import get_plan_files, validate_plan_files
+from ufo.utils import create_folder, print_with_color, tail_lines
+
+configs = Config.get_instance().config_data
+
+RESULT_FILE = "batch_results.json"
+
+# The statuses of the results sent by the workers.
+STARTED = "started"
+FINISHED = "finished"
+ERROR = "error"
+LOST = "lost"
+
+
+class CoordinatorTransport(ABC):
+    """
+    The coordinator side of a transport between the coordinator and the workers.
+    """
+
+    @abstractmethod
+    def send_task(self, task: Dict[str, Any]) -> None:
+        """
+        Queue a task for the next free worker.
+        :param task: The task.
+        """
+        pass
+
+    @abstractmethod
+    def receive_result(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Receive the next message of the workers.
+        :param timeout: The maximum wait time in seconds.
+        :return: The message, or None if there is none before the timeout.
+        """
+        pass
+
+    @abstractmethod
+    def stop_workers(self) -> None:
+        """
+        Stop the workers once the queued tasks are taken.
+        """
+        pass
+
+    def cancel_task(self, task_id: int, attempt: int) -> None:
+        """
+        Stop an attempt of a task, e.g. after a timeout, if the transport can stop it.
+        :param task_id: The id of the task.
+        :param attempt: The attempt number of the task.
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Release the resources of the transport.
+        """
+        pass
+
+
+class WorkerTransport(ABC):
+    """
+    The worker side of a transport between the coordinator and the workers.
+    """
+
+    @abstractmethod
+    def get_task(self) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the next task.
+        :return: The task, or None if the worker should stop.
+        """
+        pass
+
+    @abstractmethod
+    def put_result(self, result: Dict[str, Any]) -> None:
+        """
+        Send a message to the coordinator.
+        :param result: The message.
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Release the resources of the transport.
+        """
+        pass
+
+
+class QueueWorkerTransport(WorkerTransport):
+    """
+    The worker side of the multiprocessing queue transport.
+    """
+
+    def __init__(
+        self,
+        tasks: multiprocessing.Queue,
+        results: multiprocessing.Queue,
+        current: Optional[Any] = None,
+    ):
+        """
+        Create a new QueueWorkerTransport.
+        :param tasks: The queue of the tasks.
+        :param results: The queue of the results.
+        :param current: The shared array of the task id and the attempt number of the last task taken by the worker.
+        """
+        self._tasks = tasks
+        self._results = results
+        self._current = current
+
+    def get_task(self) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the next task. The stop marker is put back for the other workers.
+        :return: The task, or None if the worker should stop.
+        """
+        task = self._tasks.get()
+        if task is None:
+            self._tasks.put(None)
+
+        # The shared array is written at once, unlike the results queue, which is flushed by a background thread.
+        if self._current is not None:
+            self._current[:] = (
+                [-1, -1] if task is None else [task["task_id"], task["attempt"]]
+            )
+
+        return task
+
+    def put_result(self, result: Dict[str, Any]) -> None:
+        """
+        Send a message to the coordinator.
+        :param result: The message.
+        """
+        self._results.put(result)
+
+
+class QueueCoordinatorTransport(CoordinatorTransport):
+    """
+    The coordinator side of the multiprocessing queue transport, for worker processes on the same machine.
+    """
+
+    def __init__(self) -> None:
+        """
+        Create a new QueueCoordinatorTransport.
+        """
+        self._tasks = multiprocessing.Queue()
+        self._results = multiprocessing.Queue()
+
+    def worker_transport(self, current: Optional[Any] = None) -> QueueWorkerTransport:
+        """
+        Get the worker side of the transport, to pass to a worker process.
+        :param current: The shared array of the task id and the attempt number of the last task taken by the worker.
+        :return: The worker side of the transport.
+        """
+        return QueueWorkerTransport(self._tasks, self._results, current)
+
+    def send_task(self, task: Dict[str, Any]) -> None:
+        """
+        Queue a task for the next free worker.
+        :param task: The task.
+        """
+        self._tasks.put(task)
+
+    def receive_result(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Receive the next message of the workers.
+        :param timeout: The maximum wait time in seconds.
+        :return: The message, or None if there is none before the timeout.
+        """
+        try:
+            return self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def stop_workers(self) -> None:
+        """
+        Stop the workers once the queued tasks are taken.
+        """
+        self._tasks.put(None)
+
+
+class LocalCoordinatorTransport(QueueCoordinatorTransport):
+    """
+    The multiprocessing queue transport with its own worker processes. A worker process running a cancelled attempt
+    is terminated, and the last task of a dead worker process is reported as lost. Both are replaced by a new worker
+    process. If the result of the last task was sent before the worker died, the lost result is dropped as a late one.
+    """
+
+    def __init__(
+        self,
+        num_workers: int,
+        runner: Callable[[Dict[str, Any]], Dict[str, Any]],
+    ) -> None:
+        """
+        Create a new LocalCoordinatorTransport and start its worker processes.
+        :param num_workers: The number of worker processes.
+        :param runner: The function running a task in a worker, it must be importable by the worker processes.
+        """
+        super().__init__()
+        self._runner = runner
+        self._workers: Dict[str, multiprocessing.Process] = {}
+        # The task id and the attempt number of the last task taken by each worker, -1 before the first task.
+        self._current: Dict[str, Any] = {}
+
+        for i in range(num_workers):
+            self._start_worker("local-{i}".format(i=i))
+
+    def _start_worker(self, worker_id: str) -> None:
+        """
+        Start a worker process.
+        :param worker_id: The id of the worker.
+        """
+        self._current[worker_id] = multiprocessing.Array("i", [-1, -1], lock=False)
+        worker = multiprocessing.Process(
+            target=run_worker,
+            args=(
+                self.worker_transport(self._current[worker_id]),
+                worker_id,
+                self._runner,
+            ),
+            daemon=True,
+        )
+        worker.start()
+        self._workers[worker_id] = worker
+
+    def _restart_worker(self, worker_id: str) -> None:
+        """
+        Terminate a worker process and start a new one in its place.
+        :param worker_id: The id of the worker.
+        """
+        worker = self._workers[worker_id]
+        if worker.is_alive():
+            worker.terminate()
+        worker.join()
+        self._start_worker(worker_id)
+
+    def receive_result(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Receive the next message of the workers, or a lost result for a worker process that died during a task.
+        :param timeout: The maximum wait time in seconds.
+        :return: The message, or None if there is none before the timeout.
+        """
+        for worker_id, worker in list(self._workers.items()):
+            if worker.is_alive():
+                continue
+
+            task_id, attempt = self._current[worker_id]
+            self._restart_worker(worker_id)
+            if task_id >= 0:
+                return {
+                    "task_id": task_id,
+                    "attempt": attempt,
+                    "status": LOST,
+                    "worker": worker_id,
+                    "error": "exit code {code}".format(code=worker.exitcode),
+                }
+
+        return super().receive_result(timeout)
+
+    def cancel_task(self, task_id: int, attempt: int) -> None:
+        """
+        Terminate the worker process running an attempt of a task.
+        :param task_id: The id of the task.
+        :param attempt: The attempt number of the task.
+        """
+        for worker_id, current in list(self._current.items()):
+            if list(current) == [task_id, attempt]:
+                self._restart_worker(worker_id)
+
+    def close(self) -> None:
+        """
+        Stop the worker processes.
+        """
+        for worker in self._workers.values():
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+
+
+class SocketCoordinatorTransport(CoordinatorTransport):
+    """
+    The coordinator side of the socket transport, for workers on other machines.
+    Each worker connects to the coordinator, asks for the next task and sends its results as JSON lines.
+    """
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 0) -> None:
+        """
+        Create a new SocketCoordinatorTransport listening for the workers.
+        :param host: The host to listen on.
+        :param port: The port to listen on, 0 for a free port.
+        """
+        self._server = socket.create_server((host, port))
+        self.address = self._server.getsockname()
+        self._tasks: queue.Queue = queue.Queue()
+        self._results: queue.Queue = queue.Queue()
+
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self) -> None:
+        """
+        Accept the connections of the workers.
+        """
+        while True:
+            try:
+                connection, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(
+                target=self._serve_worker, args=(connection,), daemon=True
+            ).start()
+
+    def _serve_worker(self, connection: socket.socket) -> None:
+        """
+        Serve the requests of a worker. The task of a disconnected worker is reported as lost.
+        :param connection: The connection of the worker.
+        """
+        task = None
+
+        with connection, connection.makefile("rw", encoding="utf-8") as stream:
+            try:
+                for line in stream:
+                    message = json.loads(line)
+
+                    if message.get("type") == "next":
+                        task = self._tasks.get()
+                        if task is None:
+                            self._tasks.put(None)
+                        stream.write(json.dumps(task) + "\n")
+                        stream.flush()
+                        if task is None:
+                            return
+                    else:
+                        if message.get("status") != STARTED:
+                            task = None
+                        self._results.put(message)
+            except (OSError, ValueError):
+                pass
+
+        if task is not None:
+            self._results.put(
+                {
+                    "task_id": task["task_id"],
+                    "attempt": task.get("attempt"),
+                    "status": LOST,
+                    "error": "disconnected",
+                }
+            )
+
+    def send_task(self, task: Dict[str, Any]) -> None:
+        """
+        Queue a task for the next free worker.
+        :param task: The task.
+        """
+        self._tasks.put(task)
+
+    def receive_result(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Receive the next message of the workers.
+        :param timeout: The maximum wait time in seconds.
+        :return: The message, or None if there is none before the timeout.
+        """
+        try:
+            return self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def stop_workers(self) -> None:
+        """
+        Stop the workers once the queued tasks are taken.
+        """
+        self._tasks.put(None)
+
+    def close(self) -> None:
+        """
+        Stop listening for the workers.
+        """
+        self._server.close()
+
+
+class SocketWorkerTransport(WorkerTransport):
+    """
+    The worker side of the socket transport.
+    """
+
+    def __init__(self, host: str, port: int, retry_time: float = 30) -> None:
+        """
+        Connect to the coordinator.
+        :param host: The host of the coordinator.
+        :param port: The port of the coordinator.
+        :param retry_time: The time in seconds to retry the connection, e.g. while the coordinator starts.
+        """
+        deadline = time.time() + retry_time
+        while True:
+            try:
+                self._connection = socket.create_connection((host, port))
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(1)
+
+        self._stream = self._connection.makefile("rw", encoding="utf-8")
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        """
+        Send a message as a JSON line.
+        :param message: The message.
+        """
+        self._stream.write(json.dumps(message) + "\n")
+        self._stream.flush()
+
+    def get_task(self) -> Optional[Dict[str, Any]]:
+        """
+        Ask the coordinator for the next task.
+        :return: The task, or None if the worker should stop or the coordinator is gone.
+        """
+        try:
+            self._send({"type": "next"})
+            line = self._stream.readline()
+        except OSError:
+            return None
+
+        return json.loads(line) if line else None
+
+    def put_result(self, result: Dict[str, Any]) -> None:
+        """
+        Send a message to the coordinator.
+        :param result: The message.
+        """
+        self._send(result)
+
+    def close(self) -> None:
+        """
+        Close the connection.
+        """
+        self._stream.close()
+        self._connection.close()
+
+
+def get_session_name(task: Dict[str, Any]) -> str:
+    """
+    Get the name of the session of an attempt of a task. Each retry logs to its own folder, so that it does not mix
+    its logs with those of a timed-out attempt that may still be running.
+    :param task: The task.
+    :return: The name of the session.
+    """
+    if not task.get("attempt"):
+        return task["task"]
+
+    return "{task}_retry{attempt}".format(task=task["task"], attempt=task["attempt"])
+
+
+def run_follower_plan(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run a plan file in a follower session on the desktop of the worker.
+    :param task: The task, with the name of the session and the plan file.
+    :return: The result of the session.
+    """
+    # The session modules depend on the desktop automation, so they are imported on the worker only.
+    from ufo.module.sessions.session import FollowerSession
+
+    session = FollowerSession(
+        get_session_name(task),
+        task["plan_file"],
+        configs.get("EVA_SESSION", False),
+        id=task["task_id"],
+    )
+    session.run()
+
+    evaluation = None
+    evaluation_log = os.path.join(session.log_path, "evaluation.log")
+    if os.path.exists(evaluation_log):
+        last_lines = tail_lines(evaluation_log, 1)
+        if last_lines:
+            evaluation = json.loads(last_lines[0]).get("complete")
+
+    return {
+        "status": ERROR if session.is_error() else FINISHED,
+        "steps": session.step,
+        "cost": session.cost if isinstance(session.cost, (int, float)) else 0.0,
+        "evaluation": evaluation,
+        "log_path": session.log_path,
+    }
+
+
+def run_worker(
+    transport: WorkerTransport,
+    worker_id: str,
+    runner: Callable[[Dict[str, Any]], Dict[str, Any]] = run_follower_plan,
+) -> None:
+    """
+    Run the tasks of the coordinator until it stops the worker.
+    :param transport: The worker side of the transport.
+    :param worker_id: The id of the worker in the results.
+    :param runner: The function running a task and returning its result.
+    """
+    try:
+        while True:
+            task = transport.get_task()
+            if task is None:
+                break
+
+            transport.put_result(
+                {
+                    "task_id": task["task_id"],
+                    "attempt": task.get("attempt"),
+                    "status": STARTED,
+                    "worker": worker_id,
+                }
+            )
+
+            start = time.time()
+            try:
+                result = runner(task)
+            except Exception:
+                result = {"status": ERROR, "error": traceback.format_exc()}
+
+            result.update(
+                {
+                    "task_id": task["task_id"],
+                    "attempt": task.get("attempt"),
+                    "worker": worker_id,
+                    "time": time.time() - start,
+                }
+            )
+            transport.put_result(result)
+    finally:
+        transport.close()
+
+
+class BatchCoordinator:
+    """
+    The coordinator of a batch of follower plans run by a pool of workers.
+    """
+
+    def __init__(
+        self,
+        transport: CoordinatorTransport,
+        max_retries: Optional[int] = None,
+        task_timeout: Optional[float] = None,
+        poll_interval: float = 1.0,
+    ) -> None:
+        """
+        Create a new BatchCoordinator.
+        :param transport: The coordinator side of the transport.
+        :param max_retries: The number of retries of a failed plan. Default is BATCH_MAX_RETRIES.
+        :param task_timeout: The maximum time in seconds of a plan on a worker before it is retried. Default is BATCH_TASK_TIMEOUT.
+        :param poll_interval: The time in seconds between two checks of the timeouts.
+        """
+        self.transport = transport
+        self.max_retries = (
+            configs.get("BATCH_MAX_RETRIES", 1) if max_retries is None else max_retries
+        )
+        self.task_timeout = (
+            configs.get("BATCH_TASK_TIMEOUT", 3600)
+            if task_timeout is None
+            else task_timeout
+        )
+        self.poll_interval = poll_interval
+
+    def run(self, task: str, plan_files: List[str]) -> List[Dict[str, Any]]:
+        """
+        Run the plans on the workers and collect their results.
+        :param task: The name of the batch task. The session of each plan is named "<task>/<plan file name>".
+        :param plan_files: The plan files.
+        :return: The result of each plan, in the order of the plan files.
+        """
+        tasks = {
+            task_id: {
+                "task_id": task_id,
+                "task": "{task}/{name}".format(
+                    task=task, name=os.path.splitext(os.path.basename(plan_file))[0]
+                ),
+                "plan_file": plan_file,
+                "attempt": 0,
+            }
+            for task_id, plan_file in enumerate(plan_files)
+        }
+        results: Dict[int, Dict[str, Any]] = {}
+        # The start time of the tasks running on a worker.
+        running: Dict[int, float] = {}
+
+        # The tasks are copied when they are sent, as the transports may serialize them later.
+        for item in tasks.values():
+            self.transport.send_task(dict(item))
+
+        while len(results) < len(tasks):
+            message = self.transport.receive_result(self.poll_interval)
+
+            failed = []
+            if message is not None:
+                task_id = message["task_id"]
+                if (
+                    task_id in results
+                    or message.get("attempt") != tasks[task_id]["attempt"]
+                ):
+                    # A late message of a finished task or of a superseded attempt.
+                    continue
+                if message["status"] == STARTED:
+                    running[task_id] = time.time()
+                    continue
+                running.pop(task_id, None)
+                if message["status"] in (ERROR, LOST):
+                    failed.append((task_id, message))
+                else:
+                    results[task_id] = message
+
+            now = time.time()
+            for task_id, start in list(running.items()):
+                if now - start > self.task_timeout:
+                    running.pop(task_id)
+                    attempt = tasks[task_id]["attempt"]
+                    self.transport.cancel_task(task_id, attempt)
+                    failed.append(
+                        (
+                            task_id,
+                            {
+                                "task_id": task_id,
+                                "attempt": attempt,
+                                "status": LOST,
+                                "error": "timeout",
+                            },
+                        )
+                    )
+
+            for task_id, message in failed:
+                item = tasks[task_id]
+                if item["attempt"] < self.max_retries:
+                    item["attempt"] += 1
+                    print_with_color(
+                        "Retrying {name} ({status}), attempt {attempt}...".format(
+                            name=item["task"],
+                            status=message["status"],
+                            attempt=item["attempt"],
+                        ),
+                        "yellow",
+                    )
+                    self.transport.send_task(dict(item))
+                else:
+                    results[task_id] = message
+
+        self.transport.stop_workers()
+
+        ordered = []
+        for task_id, item in tasks.items():
+            result = dict(results[task_id])
+            result.update(
+                {
+                    "task": item["task"],
+                    "plan_file": item["plan_file"],
+                    "attempts": item["attempt"] + 1,
+                }
+            )
+            ordered.append(result)
+
+        return ordered
+
+    @staticmethod
+    def print_summary(results: List[Dict[str, Any]]) -> None:
+        """
+        Print the summary of the batch.
+        :param results: The results of the plans.
+        """
+        for result in results:
+            color = "green" if result["status"] == FINISHED else "red"
+            print_with_color(
+                "{task}: {status} on {worker}, {steps} steps, ${cost:.2f}, {attempts} attempt(s)".format(
+                    task=result["task"],
+                    status=result["status"],
+                    worker=result.get("worker", "-"),
+                    steps=result.get("steps", 0),
+                    cost=result.get("cost", 0.0),
+                    attempts=result["attempts"],
+                ),
+                color,
+            )
+
+        print_with_color(
+            "Batch of {num} plans: {finished} finished, total cost ${cost:.2f}.".format(
+                num=len(results),
+                finished=sum(result["status"] == FINISHED for result in results),
+                cost=sum(result.get("cost", 0.0) for result in results),
+            ),
+            "yellow",
+        )
+
+
+def run_local_batch(
+    task: str,
+    plan_files: List[str],
+    num_workers: int,
+    runner: Callable[[Dict[str, Any]], Dict[str, Any]] = run_follower_plan,
+    **kwargs
+) -> List[Dict[str, Any]]:
+    """
+    Run the plans on local worker processes connected by multiprocessing queues.
+    :param task: The name of the batch task.
+    :param plan_files: The plan files.
+    :param num_workers: The number of worker processes.
+    :param runner: The function running a task in a worker, it must be importable by the worker processes.
+    :return: The result of each plan.
+    """
+    transport = LocalCoordinatorTransport(num_workers, runner)
+
+    try:
+        return BatchCoordinator(transport, **kwargs).run(task, plan_files)
+    finally:
+        transport.close()
+
+
+def save_results(task: str, results: List[Dict[str, Any]]) -> str:
+    """
+    Save the results of a batch to the log folder of the task.
+    :param task: The name of the batch task.
+    :param results: The results of the plans.
+    :return: The path of the result file.
+    """
+    log_path = "logs/{task}/".format(task=task)
+    create_folder(log_path)
+    result_path = os.path.join(log_path, RESULT_FILE)
+
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+
+    return result_path
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Run a folder of follower plans on a pool of workers."
+    )
+    subparsers = parser.add_subparsers(dest="role", required=True)
+
+    coordinator_parser = subparsers.add_parser(
+        "coordinator", help="Queue the plans and collect the results."
+    )
+    coordinator_parser.add_argument("--task", "-t", required=True)
+    coordinator_parser.add_argument(
+        "--plan", "-p", required=True, help="The folder of the plan files."
+    )
+    coordinator_parser.add_argument(
+        "--port",
+        type=int,
+        default=None,
+        help="The port to listen on for remote workers. Without a port, the plans run on local worker processes.",
+    )
+    coordinator_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="The number of local worker processes, if no port is given.",
+    )
+
+    worker_parser = subparsers.add_parser(
+        "worker", help="Run the plans of a coordinator on this desktop."
+    )
+    worker_parser.add_argument("--host", required=True)
+    worker_parser.add_argument("--port", type=int, required=True)
+    worker_parser.add_argument("--name", default=socket.gethostname())
+
+    args = parser.parse_args()
+
+    if args.role == "worker":
+        run_worker(SocketWorkerTransport(args.host, args.port), args.name)
+    else:
+        # The plans are validated in bulk before they are queued, and the invalid plans are skipped.
+        plan_files = []
+        for plan_file, problems in validate_plan_files(
+            get_plan_files(args.plan)
+        ).items():
+            if problems:
+                print_with_color(
+                    "The plan file {path} is invalid, skipped: {problems}".format(
+                        path=plan_file, problems=" ".join(problems)
+                    ),
+                    "red",
+                )
+            else:
+                plan_files.append(plan_file)
+
+        if args.port is None:
+            batch_results = run_local_batch(args.task, plan_files, args.workers)
+        else:
+            socket_transport = SocketCoordinatorTransport(port=args.port)
+            print_with_color(
+                "Waiting for the workers on port {port}...".format(port=args.port),
+                "cyan",
+            )
+            try:
+                batch_results = BatchCoordinator(socket_transport).run(
+                    args.task, plan_files
+                )
+            finally:
+                socket_transport.close()
+
+        BatchCoordinator.print_summary(batch_results)
+        print_with_color(
+            "The results are saved in {path}.".format(
+                path=save_results(args.task, batch_results)
+            ),
+            "green",
+        )
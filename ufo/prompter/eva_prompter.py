@@ -4,10 +4,11 @@
 
 import json
 import os
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 
 from ufo.automator.ui_control.screenshot import PhotographerFacade
 from ufo.config.config import Config
+from ufo.utils import iter_json_lines
 from ufo.prompter.agent_prompter import APIPromptLoader
 from ufo.prompter.basic import BasicPrompter
 
@@ -156,16 +157,33 @@ class EvaluationAgentPrompter(BasicPrompter):
             }
         )
 
-        logs = self.load_logs(log_path)
+        logs = [log for log in self.load_logs(log_path) if log.get("Step") is not None]
+        final_screenshot_path = os.path.join(log_path, "action_step_final.png")
+
+        # Only the selected screenshots are encoded, one at a time as the content is built.
+        # The final screenshot is always included and counts towards the maximum number of images.
+        selected_steps = set()
+        if self.is_visual:
+            max_images = configs.get("EVA_MAX_IMAGES", 20)
+            if max_images >= 0 and os.path.exists(final_screenshot_path):
+                max_images = max(0, max_images - 1)
+
+            selected_steps = self.select_screenshot_steps(
+                [
+                    log.get("Step")
+                    for log in logs
+                    if os.path.exists(
+                        os.path.join(log_path, f"action_step{log.get('Step')}.png")
+                    )
+                ],
+                max_images,
+            )
 
         for log in logs:
 
             step = log.get("Step")
 
-            if step is None:
-                continue
-
-            if self.is_visual:
+            if self.is_visual and step in selected_steps:
                 screenshot_path = os.path.join(log_path, f"action_step{step}.png")
 
                 if os.path.exists(screenshot_path):
@@ -179,7 +197,6 @@ class EvaluationAgentPrompter(BasicPrompter):
             user_content.append({"type": "text", "text": json.dumps(step_trajectory)})
 
         if self.is_visual:
-            final_screenshot_path = os.path.join(log_path, "action_step_final.png")
 
             if os.path.exists(final_screenshot_path):
                 user_content.append({"type": "text", "text": "<Final Screenshot:>"})
@@ -201,6 +218,24 @@ class EvaluationAgentPrompter(BasicPrompter):
 
         return user_content
 
+    @staticmethod
+    def select_screenshot_steps(steps: List[int], max_images: int) -> Set[int]:
+        """
+        Select the steps whose screenshots are included in the evaluation, evenly spaced and with the first and last steps.
+        :param steps: The steps with a screenshot, in order.
+        :param max_images: The maximum number of screenshots, no limit if negative.
+        return: The selected steps.
+        """
+        if max_images < 0 or len(steps) <= max_images:
+            return set(steps)
+        if max_images == 0:
+            return set()
+        if max_images == 1:
+            return {steps[-1]}
+
+        interval = (len(steps) - 1) / (max_images - 1)
+        return {steps[round(i * interval)] for i in range(max_images)}
+
     def get_step_trajectory(self, log: Dict[str, str]) -> Dict[str, str]:
         """
         Get the step trajectory from the log path.
@@ -228,10 +263,7 @@ class EvaluationAgentPrompter(BasicPrompter):
         Load logs from the log path.
         """
         log_file_path = os.path.join(log_path, "response.log")
-        with open(log_file_path, "r") as f:
-            logs = f.readlines()
-            logs = [json.loads(log) for log in logs]
-        return logs
+        return list(iter_json_lines(log_file_path))
 
     def load_screenshots(self, log_path: str) -> List[str]:
         """
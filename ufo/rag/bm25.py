@@ -0,0 +1,213 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from langchain.docstore.document import Document
+
+BM25_FILE = "bm25.json"
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Words that carry no meaning for keyword matching, e.g. in "How to ... for ...".
+STOP_WORDS = frozenset(
+    [
+        "a",
+        "an",
+        "and",
+        "by",
+        "do",
+        "for",
+        "from",
+        "how",
+        "i",
+        "in",
+        "is",
+        "it",
+        "my",
+        "of",
+        "on",
+        "or",
+        "the",
+        "to",
+        "with",
+    ]
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into lower-cased keyword tokens, without the stop words.
+    :param text: The text to tokenize.
+    :return: The tokens.
+    """
+    return [
+        token
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if token not in STOP_WORDS
+    ]
+
+
+def document_text(document: Document) -> str:
+    """
+    Get the text of a document to index by keywords.
+    :param document: The document.
+    :return: The text to index.
+    """
+    return " ".join([document.page_content, document.metadata.get("text") or ""])
+
+
+class BM25Index:
+    """
+    A lightweight inverted index scoring documents with Okapi BM25.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        """
+        Create a new BM25Index.
+        :param k1: The term frequency saturation.
+        :param b: The document length normalization.
+        """
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._idf: Dict[str, float] = {}
+        self._avg_length = 0.0
+
+    @classmethod
+    def from_texts(
+        cls, doc_ids: Iterable[str], texts: Iterable[str], **kwargs
+    ) -> "BM25Index":
+        """
+        Build an index from texts.
+        :param doc_ids: The ids of the documents.
+        :param texts: The texts of the documents.
+        :return: The index.
+        """
+        index = cls(**kwargs)
+        postings = defaultdict(list)
+
+        for doc_index, (doc_id, text) in enumerate(zip(doc_ids, texts)):
+            tokens = tokenize(text)
+            index.doc_ids.append(doc_id)
+            index.doc_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                postings[term].append((doc_index, frequency))
+
+        index.postings = dict(postings)
+        index._update_statistics()
+
+        return index
+
+    @classmethod
+    def from_docstore(cls, docstore, doc_ids: List[str], **kwargs) -> "BM25Index":
+        """
+        Build an index from the docstore of a vector database.
+        :param docstore: The docstore.
+        :param doc_ids: The ids of the documents to index.
+        :return: The index.
+        """
+        return cls.from_texts(
+            doc_ids,
+            [document_text(docstore.search(doc_id)) for doc_id in doc_ids],
+            **kwargs
+        )
+
+    def _update_statistics(self) -> None:
+        """
+        Update the inverse document frequencies and the average document length.
+        """
+        num_docs = len(self.doc_ids)
+        self._avg_length = sum(self.doc_lengths) / num_docs if num_docs else 0.0
+        self._idf = {
+            term: math.log(1 + (num_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        """
+        Get the number of indexed documents.
+        :return: The number of documents.
+        """
+        return len(self.doc_ids)
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """
+        Search the documents matching the keywords of a query.
+        :param query: The query.
+        :param top_k: The number of documents to return.
+        :return: The ids and BM25 scores of the best matching documents, best first.
+        """
+        scores = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = self._idf[term]
+            for doc_index, frequency in posting:
+                length_norm = (
+                    1
+                    - self.b
+                    + self.b * (self.doc_lengths[doc_index] / (self._avg_length or 1))
+                )
+                scores[doc_index] += (
+                    idf
+                    * frequency
+                    * (self.k1 + 1)
+                    / (frequency + self.k1 * length_norm)
+                )
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+        return [(self.doc_ids[doc_index], score) for doc_index, score in best]
+
+    def save(self, db_path: str) -> None:
+        """
+        Save the index next to a vector database.
+        :param db_path: The path of the vector database.
+        """
+        with open(os.path.join(db_path, BM25_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "k1": self.k1,
+                    "b": self.b,
+                    "doc_ids": self.doc_ids,
+                    "doc_lengths": self.doc_lengths,
+                    "postings": self.postings,
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, db_path: str) -> "BM25Index":
+        """
+        Load the index saved next to a vector database.
+        :param db_path: The path of the vector database.
+        :return: The index, or None if the vector database has no index.
+        """
+        index_path = os.path.join(db_path, BM25_FILE)
+        if not os.path.exists(index_path):
+            return None
+
+        with open(index_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        index = cls(data["k1"], data["b"])
+        index.doc_ids = data["doc_ids"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = {
+            term: [tuple(entry) for entry in posting]
+            for term, posting in data["postings"].items()
+        }
+        index._update_statistics()
+
+        return index
@@ -0,0 +1,158 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+import mmap
+import os
+import zlib
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from langchain.docstore.document import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+SIDE_FILE = "docstore_fields.bin"
+
+
+class SideFileDocstore(InMemoryDocstore):
+    """
+    A docstore keeping the large metadata fields of the documents, e.g. the full text of a help document,
+    in a compressed side file next to the vector database. The side file is memory-mapped and a field is
+    only decompressed when its document is retrieved.
+    """
+
+    def __init__(
+        self, fields: List[str], _dict: Optional[Dict[str, Document]] = None
+    ) -> None:
+        """
+        Create a new SideFileDocstore.
+        :param fields: The metadata fields to keep in the side file.
+        :param _dict: The documents, keyed by their ids.
+        """
+        super().__init__(_dict)
+        self.fields = list(fields)
+        # The position and length of the compressed fields of each stored document in the side file.
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._mmap: Optional[mmap.mmap] = None
+
+    def search(self, search: str) -> Union[str, Document]:
+        """
+        Search a document by its id, with the fields in the side file loaded.
+        :param search: The id of the document.
+        :return: The document, or an error message if it is not found.
+        """
+        document = super().search(search)
+
+        if isinstance(document, str) or search not in self._offsets:
+            return document
+
+        return Document(
+            id=search,
+            page_content=document.page_content,
+            metadata={**document.metadata, **self._read_fields(search)},
+        )
+
+    def delete(self, ids: List) -> None:
+        """
+        Delete documents from the docstore. Their fields stay in the side file until it is saved.
+        :param ids: The ids of the documents to delete.
+        """
+        super().delete(ids)
+        for doc_id in ids:
+            self._offsets.pop(doc_id, None)
+
+    def attach(self, folder_path: str) -> None:
+        """
+        Memory-map the side file of a saved docstore.
+        :param folder_path: The folder of the vector database.
+        """
+        self.close()
+
+        side_file = os.path.join(folder_path, SIDE_FILE)
+
+        if os.path.getsize(side_file) > 0:
+            with open(side_file, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        """
+        Close the memory-mapped side file.
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = None
+
+    def save(self, folder_path: str) -> None:
+        """
+        Write the side file into the folder of the vector database and drop the fields from the documents in memory.
+        Must be called before the docstore is pickled.
+        :param folder_path: The folder of the vector database.
+        """
+        side_file = os.path.join(folder_path, SIDE_FILE)
+        temp_file = side_file + ".tmp"
+        offsets = {}
+
+        os.makedirs(folder_path, exist_ok=True)
+
+        with open(temp_file, "wb") as f:
+            for doc_id, document in list(self._dict.items()):
+                if doc_id in self._offsets:
+                    record = self._read_record(doc_id)
+                else:
+                    record = zlib.compress(
+                        json.dumps(
+                            {
+                                key: document.metadata[key]
+                                for key in self.fields
+                                if key in document.metadata
+                            }
+                        ).encode("utf-8")
+                    )
+                    self._dict[doc_id] = Document(
+                        page_content=document.page_content,
+                        metadata={
+                            key: value
+                            for key, value in document.metadata.items()
+                            if key not in self.fields
+                        },
+                    )
+
+                offsets[doc_id] = (f.tell(), len(record))
+                f.write(record)
+
+        # The old side file must be unmapped before it can be replaced.
+        self.close()
+        os.replace(temp_file, side_file)
+        self._offsets = offsets
+        self.attach(folder_path)
+
+    def _read_record(self, doc_id: str) -> bytes:
+        """
+        Read the compressed fields of a document from the side file.
+        :param doc_id: The id of the document.
+        :return: The compressed fields.
+        """
+        offset, length = self._offsets[doc_id]
+
+        if self._mmap is None:
+            raise ValueError(
+                "The side file of the docstore is not attached, load the vector database with IndexFactory.load_local."
+            )
+
+        return self._mmap[offset : offset + length]
+
+    def _read_fields(self, doc_id: str) -> Dict[str, Any]:
+        """
+        Read the fields of a document from the side file.
+        :param doc_id: The id of the document.
+        :return: The fields.
+        """
+        return json.loads(zlib.decompress(self._read_record(doc_id)))
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """
+        Get the state to pickle, without the memory-mapped side file.
+        :return: The state.
+        """
+        state = self.__dict__.copy()
+        state["_mmap"] = None
+        return state
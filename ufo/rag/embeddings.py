@@ -0,0 +1,47 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+from typing import List
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    Embeddings that load the embedding model on their first use.
+    """
+
+    def __init__(self, model_name: str) -> None:
+        """
+        Create a new LazyEmbeddings.
+        :param model_name: The name of the embedding model.
+        """
+        self.model_name = model_name
+        self._embeddings = None
+
+    @property
+    def embeddings(self) -> Embeddings:
+        """
+        Get the embedding model, load it if it is not loaded yet.
+        :return: The embedding model.
+        """
+        if self._embeddings is None:
+            self._embeddings = HuggingFaceEmbeddings(model_name=self.model_name)
+        return self._embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed the documents.
+        :param texts: The texts to embed.
+        :return: The embeddings of the texts.
+        """
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query.
+        :param text: The query to embed.
+        :return: The embedding of the query.
+        """
+        return self.embeddings.embed_query(text)
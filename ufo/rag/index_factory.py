@@ -0,0 +1,547 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import argparse
+import math
+import time
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from ufo.rag.docstore import SideFileDocstore
+from ufo.utils import print_with_color
+
+
+class IndexFactory:
+    """
+    Factory class to create the FAISS indexes of the vector databases.
+    The exact flat index is used for small corpora, and approximate nearest neighbour indexes for large ones.
+    """
+
+    FLAT = "flat"
+    HNSW = "hnsw"
+    IVF_FLAT = "ivf_flat"
+    IVF_PQ = "ivf_pq"
+    AUTO = "auto"
+
+    # The storage of the vectors, the float16 and int8 storages are scalar quantized.
+    FLOAT32 = "float32"
+    FLOAT16 = "float16"
+    INT8 = "int8"
+    SCALAR_QUANTIZER_TYPES = {
+        FLOAT16: faiss.ScalarQuantizer.QT_fp16,
+        INT8: faiss.ScalarQuantizer.QT_8bit,
+    }
+
+    # The upper bounds of the corpus size for the automatic index selection.
+    FLAT_MAX_VECTORS = 10000
+    HNSW_MAX_VECTORS = 100000
+    IVF_FLAT_MAX_VECTORS = 1000000
+
+    HNSW_M = 32
+    HNSW_EF_CONSTRUCTION = 80
+    HNSW_EF_SEARCH = 64
+    PQ_NBITS = 8
+
+    # Faiss needs at least this many training points per centroid for a stable clustering.
+    MIN_POINTS_PER_CENTROID = 39
+
+    @classmethod
+    def select_index_type(cls, num_vectors: int) -> str:
+        """
+        Select the index type by the size of the corpus.
+        :param num_vectors: The number of vectors in the corpus.
+        :return: The index type.
+        """
+        if num_vectors < cls.FLAT_MAX_VECTORS:
+            return cls.FLAT
+        elif num_vectors < cls.HNSW_MAX_VECTORS:
+            return cls.HNSW
+        elif num_vectors < cls.IVF_FLAT_MAX_VECTORS:
+            return cls.IVF_FLAT
+        else:
+            return cls.IVF_PQ
+
+    @classmethod
+    def resolve_index_type(cls, index_type: str, num_vectors: int) -> str:
+        """
+        Resolve the index type to build. The automatic type is selected by the corpus size,
+        and the trainable types fall back to simpler ones if there are too few vectors to train them.
+        :param index_type: The requested index type.
+        :param num_vectors: The number of vectors in the corpus.
+        :return: The resolved index type.
+        """
+        index_type = index_type.lower()
+
+        if index_type == cls.AUTO:
+            return cls.select_index_type(num_vectors)
+
+        if index_type not in [cls.FLAT, cls.HNSW, cls.IVF_FLAT, cls.IVF_PQ]:
+            raise ValueError("Invalid index type: {}".format(index_type))
+
+        if (
+            index_type == cls.IVF_PQ
+            and num_vectors < cls.MIN_POINTS_PER_CENTROID * 2**cls.PQ_NBITS
+        ):
+            index_type = cls.IVF_FLAT
+        if index_type == cls.IVF_FLAT and num_vectors < cls.MIN_POINTS_PER_CENTROID * 2:
+            index_type = cls.FLAT
+
+        return index_type
+
+    @staticmethod
+    def needs_training(index_type: str) -> bool:
+        """
+        Check if the index type needs to be trained before adding vectors.
+        :param index_type: The index type.
+        :return: True if the index needs training, False otherwise.
+        """
+        return index_type.lower() in [IndexFactory.IVF_FLAT, IndexFactory.IVF_PQ]
+
+    @classmethod
+    def get_nlist(cls, num_vectors: int) -> int:
+        """
+        Get the number of inverted lists of an IVF index, about 4 * sqrt(N) for a corpus of N vectors.
+        :param num_vectors: The number of vectors in the corpus.
+        :return: The number of inverted lists.
+        """
+        nlist = int(4 * math.sqrt(num_vectors))
+        return max(1, min(nlist, num_vectors // cls.MIN_POINTS_PER_CENTROID))
+
+    @staticmethod
+    def get_pq_m(dimension: int) -> int:
+        """
+        Get the number of sub-quantizers of a PQ index, which must divide the dimension.
+        :param dimension: The dimension of the vectors.
+        :return: The number of sub-quantizers.
+        """
+        for m in [64, 48, 32, 24, 16, 8, 4, 2]:
+            if dimension % m == 0 and dimension // m >= 4:
+                return m
+        return 1
+
+    @classmethod
+    def get_scalar_quantizer_type(cls, storage: str) -> Optional[int]:
+        """
+        Get the faiss scalar quantizer type of a vector storage.
+        :param storage: The vector storage, "float32", "float16" or "int8".
+        :return: The scalar quantizer type, or None for the float32 storage.
+        """
+        storage = storage.lower()
+
+        if storage == cls.FLOAT32:
+            return None
+        if storage not in cls.SCALAR_QUANTIZER_TYPES:
+            raise ValueError("Invalid vector storage: {}".format(storage))
+
+        return cls.SCALAR_QUANTIZER_TYPES[storage]
+
+    @classmethod
+    def create_index(
+        cls,
+        index_type: str,
+        dimension: int,
+        num_vectors: int,
+        storage: str = "float32",
+    ) -> faiss.Index:
+        """
+        Create an empty index.
+        :param index_type: The index type, "flat", "hnsw", "ivf_flat", "ivf_pq" or "auto".
+        :param dimension: The dimension of the vectors.
+        :param num_vectors: The expected number of vectors in the corpus.
+        :param storage: The vector storage, "float32", "float16" or "int8". The "ivf_pq" index is always compressed.
+        :return: The created index, which may need training before use.
+        """
+        index_type = cls.resolve_index_type(index_type, num_vectors)
+        quantizer_type = cls.get_scalar_quantizer_type(storage)
+
+        if index_type == cls.FLAT:
+            if quantizer_type is None:
+                return faiss.IndexFlatL2(dimension)
+            return faiss.IndexScalarQuantizer(
+                dimension, quantizer_type, faiss.METRIC_L2
+            )
+
+        if index_type == cls.HNSW:
+            if quantizer_type is None:
+                index = faiss.IndexHNSWFlat(dimension, cls.HNSW_M)
+            else:
+                index = faiss.IndexHNSWSQ(dimension, quantizer_type, cls.HNSW_M)
+            index.hnsw.efConstruction = cls.HNSW_EF_CONSTRUCTION
+            index.hnsw.efSearch = cls.HNSW_EF_SEARCH
+            return index
+
+        nlist = cls.get_nlist(num_vectors)
+        quantizer = faiss.IndexFlatL2(dimension)
+
+        if index_type == cls.IVF_FLAT and quantizer_type is None:
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        elif index_type == cls.IVF_FLAT:
+            index = faiss.IndexIVFScalarQuantizer(
+                quantizer, dimension, nlist, quantizer_type, faiss.METRIC_L2
+            )
+        else:
+            index = faiss.IndexIVFPQ(
+                quantizer, dimension, nlist, cls.get_pq_m(dimension), cls.PQ_NBITS
+            )
+
+        index.nprobe = min(nlist, max(8, nlist // 16))
+
+        return index
+
+    @staticmethod
+    def train_index(
+        index: faiss.Index, vectors: np.ndarray, train_sample_size: int
+    ) -> None:
+        """
+        Train the index on a random sample of the vectors if it needs training.
+        :param index: The index to train.
+        :param vectors: The vectors of the corpus.
+        :param train_sample_size: The maximum number of vectors used for training.
+        """
+        if index.is_trained:
+            return
+
+        if len(vectors) > train_sample_size:
+            sample = np.random.default_rng(0).choice(
+                len(vectors), train_sample_size, replace=False
+            )
+            vectors = vectors[sample]
+
+        index.train(vectors)
+
+    @classmethod
+    def from_documents(
+        cls,
+        documents: List[Document],
+        embeddings,
+        index_type: str = "auto",
+        train_sample_size: int = 50000,
+        num_vectors: Optional[int] = None,
+        ids: Optional[List[str]] = None,
+        storage: str = "float32",
+        side_fields: Optional[List[str]] = None,
+    ) -> FAISS:
+        """
+        Create a vector database from the documents.
+        :param documents: The documents to add.
+        :param embeddings: The embedding model.
+        :param index_type: The index type, "flat", "hnsw", "ivf_flat", "ivf_pq" or "auto".
+        :param train_sample_size: The maximum number of vectors used to train the index.
+        :param num_vectors: The expected size of the corpus used to select the index, default is the number of documents.
+        :param ids: The ids of the documents.
+        :param storage: The vector storage, "float32", "float16" or "int8".
+        :param side_fields: The metadata fields stored in a side file loaded on demand, see SideFileDocstore.
+        :return: The vector database.
+        """
+        texts = [document.page_content for document in documents]
+        metadatas = [document.metadata for document in documents]
+        vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+        # Select the index by the expected corpus size, but size the IVF lists by the vectors at hand for training.
+        index_type = cls.resolve_index_type(
+            index_type, max(num_vectors or 0, len(vectors))
+        )
+        index = cls.create_index(index_type, vectors.shape[1], len(vectors), storage)
+        cls.train_index(index, vectors, train_sample_size)
+
+        db = FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=(
+                SideFileDocstore(side_fields) if side_fields else InMemoryDocstore()
+            ),
+            index_to_docstore_id={},
+        )
+        db.add_embeddings(zip(texts, vectors.tolist()), metadatas=metadatas, ids=ids)
+
+        return db
+
+    @classmethod
+    def add_documents(
+        cls,
+        db: FAISS,
+        documents: List[Document],
+        index_type: str = "auto",
+        train_sample_size: int = 50000,
+        ids: Optional[List[str]] = None,
+    ) -> FAISS:
+        """
+        Add documents to a vector database. An exact index that outgrows the automatic selection is rebuilt into an approximate one.
+        :param db: The vector database.
+        :param documents: The documents to add.
+        :param index_type: The index type, "flat", "hnsw", "ivf_flat", "ivf_pq" or "auto".
+        :param train_sample_size: The maximum number of vectors used to train a rebuilt index.
+        :param ids: The ids of the documents.
+        :return: The vector database.
+        """
+        db.add_documents(documents, ids=ids)
+
+        if index_type.lower() == cls.AUTO and cls.get_index_type(db.index) == cls.FLAT:
+            target_type = cls.resolve_index_type(index_type, db.index.ntotal)
+            if target_type != cls.FLAT:
+                print_with_color(
+                    "Rebuilding the vector database with a {type} index for {num} vectors...".format(
+                        type=target_type, num=db.index.ntotal
+                    ),
+                    "yellow",
+                )
+                cls.rebuild(db, target_type, train_sample_size)
+
+        return db
+
+    @classmethod
+    def get_index_type(cls, index: faiss.Index) -> str:
+        """
+        Get the index type of an existing index.
+        :param index: The index.
+        :return: The index type.
+        """
+        index = faiss.downcast_index(index)
+
+        if isinstance(index, faiss.IndexHNSW):
+            return cls.HNSW
+        elif isinstance(index, faiss.IndexIVFPQ):
+            return cls.IVF_PQ
+        elif isinstance(index, faiss.IndexIVF):
+            return cls.IVF_FLAT
+        else:
+            return cls.FLAT
+
+    @classmethod
+    def get_storage(cls, index: faiss.Index) -> str:
+        """
+        Get the vector storage of an existing index.
+        :param index: The index.
+        :return: The vector storage, "float32", "float16" or "int8". The "ivf_pq" index is reported as "float32".
+        """
+        index = faiss.downcast_index(index)
+
+        if isinstance(index, faiss.IndexHNSW):
+            index = faiss.downcast_index(index.storage)
+
+        if isinstance(
+            index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)
+        ):
+            for storage, quantizer_type in cls.SCALAR_QUANTIZER_TYPES.items():
+                if index.sq.qtype == quantizer_type:
+                    return storage
+
+        return cls.FLOAT32
+
+    @classmethod
+    def delete_documents(
+        cls, db: FAISS, ids: List[str], train_sample_size: int = 50000
+    ) -> None:
+        """
+        Delete documents from a vector database. Only the flat index supports removal with contiguous positions,
+        the approximate indexes are rebuilt without the deleted documents.
+        :param db: The vector database.
+        :param ids: The ids of the documents to delete.
+        :param train_sample_size: The maximum number of vectors used to train a rebuilt index.
+        """
+        if not ids:
+            return
+
+        index_type = cls.get_index_type(db.index)
+
+        if index_type == cls.FLAT:
+            db.delete(ids)
+        else:
+            cls.rebuild(db, index_type, train_sample_size, exclude_ids=ids)
+
+    @classmethod
+    def rebuild(
+        cls,
+        db: FAISS,
+        index_type: str,
+        train_sample_size: int = 50000,
+        exclude_ids: Optional[List[str]] = None,
+        storage: Optional[str] = None,
+    ) -> None:
+        """
+        Rebuild the index of a vector database in place from its stored vectors, without re-embedding the documents.
+        :param db: The vector database.
+        :param index_type: The index type of the new index.
+        :param train_sample_size: The maximum number of vectors used to train the new index.
+        :param exclude_ids: The ids of the documents to drop from the database.
+        :param storage: The vector storage of the new index, default is the storage of the current index.
+        """
+        exclude_ids = set(exclude_ids or [])
+        storage = storage or cls.get_storage(db.index)
+
+        index = faiss.downcast_index(db.index)
+        if isinstance(index, faiss.IndexIVF):
+            index.make_direct_map()
+
+        vectors = index.reconstruct_n(0, index.ntotal)
+        kept = [
+            (position, doc_id)
+            for position, doc_id in sorted(db.index_to_docstore_id.items())
+            if doc_id not in exclude_ids
+        ]
+        vectors = vectors[[position for position, _ in kept]]
+
+        new_index = cls.create_index(index_type, index.d, len(vectors), storage)
+        cls.train_index(new_index, vectors, train_sample_size)
+        if len(vectors) > 0:
+            new_index.add(vectors)
+
+        if exclude_ids:
+            db.docstore.delete(
+                list(exclude_ids & set(db.index_to_docstore_id.values()))
+            )
+
+        db.index = new_index
+        db.index_to_docstore_id = {i: doc_id for i, (_, doc_id) in enumerate(kept)}
+
+    @staticmethod
+    def load_local(folder_path: str, embeddings) -> FAISS:
+        """
+        Load a vector database, and memory-map the side file of its docstore if it has one.
+        :param folder_path: The folder of the vector database.
+        :param embeddings: The embedding model.
+        :return: The vector database.
+        """
+        # The vector databases are built locally by UFO, so their pickled docstore is trusted.
+        db = FAISS.load_local(
+            folder_path, embeddings, allow_dangerous_deserialization=True
+        )
+
+        if isinstance(db.docstore, SideFileDocstore):
+            db.docstore.attach(folder_path)
+
+        return db
+
+    @staticmethod
+    def save_local(db: FAISS, folder_path: str) -> None:
+        """
+        Save a vector database, with the side file of its docstore if it has one.
+        :param db: The vector database.
+        :param folder_path: The folder to save the vector database to.
+        """
+        if isinstance(db.docstore, SideFileDocstore):
+            db.docstore.save(folder_path)
+
+        db.save_local(folder_path)
+
+
+def synthetic_vectors(
+    num_vectors: int, dimension: int, num_clusters: int = 100, seed: int = 0
+) -> np.ndarray:
+    """
+    Generate clustered synthetic vectors, which resemble sentence embeddings more than uniform noise.
+    :param num_vectors: The number of vectors.
+    :param dimension: The dimension of the vectors.
+    :param num_clusters: The number of clusters.
+    :param seed: The random seed.
+    :return: The vectors.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_clusters, dimension))
+    assignment = rng.integers(0, num_clusters, size=num_vectors)
+    vectors = centers[assignment] + 0.5 * rng.normal(size=(num_vectors, dimension))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def benchmark(
+    num_vectors: int = 100000,
+    dimension: int = 768,
+    num_queries: int = 200,
+    top_k: int = 5,
+    index_types: Optional[List[str]] = None,
+    train_sample_size: int = 50000,
+    storage: str = "float32",
+) -> List[Dict[str, float]]:
+    """
+    Benchmark the recall and latency of the index types over synthetic vectors, with the exact flat index as the ground truth.
+    :param num_vectors: The number of vectors in the corpus.
+    :param dimension: The dimension of the vectors.
+    :param num_queries: The number of queries.
+    :param top_k: The number of neighbours to retrieve.
+    :param index_types: The index types to benchmark.
+    :param train_sample_size: The maximum number of vectors used for training.
+    :param storage: The vector storage, "float32", "float16" or "int8".
+    :return: The benchmark results of each index type.
+    """
+    if index_types is None:
+        index_types = [
+            IndexFactory.FLAT,
+            IndexFactory.HNSW,
+            IndexFactory.IVF_FLAT,
+            IndexFactory.IVF_PQ,
+        ]
+
+    vectors = synthetic_vectors(num_vectors + num_queries, dimension)
+    corpus, queries = vectors[:num_vectors], vectors[num_vectors:]
+
+    ground_truth_index = faiss.IndexFlatL2(dimension)
+    ground_truth_index.add(corpus)
+    _, ground_truth = ground_truth_index.search(queries, top_k)
+
+    results = []
+    for index_type in index_types:
+        start = time.perf_counter()
+        index = IndexFactory.create_index(index_type, dimension, num_vectors, storage)
+        IndexFactory.train_index(index, corpus, train_sample_size)
+        index.add(corpus)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        retrieved = np.vstack(
+            [index.search(queries[i : i + 1], top_k)[1] for i in range(num_queries)]
+        )
+        latency = (time.perf_counter() - start) / num_queries
+
+        recall = np.mean(
+            [
+                len(set(retrieved[i]) & set(ground_truth[i])) / top_k
+                for i in range(num_queries)
+            ]
+        )
+
+        results.append(
+            {
+                "index_type": IndexFactory.resolve_index_type(index_type, num_vectors),
+                "build_time": build_time,
+                "latency_ms": latency * 1000,
+                "recall": float(recall),
+                "size_mb": faiss.serialize_index(index).nbytes / 2**20,
+            }
+        )
+
+    return results
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--num_queries", type=int, default=200)
+    parser.add_argument("--top_k", type=int, default=5)
+    parser.add_argument("--train_sample_size", type=int, default=50000)
+    parser.add_argument(
+        "--storage", choices=["float32", "float16", "int8"], default="float32"
+    )
+    args = parser.parse_args()
+
+    for result in benchmark(
+        args.num_vectors,
+        args.dimension,
+        args.num_queries,
+        args.top_k,
+        train_sample_size=args.train_sample_size,
+        storage=args.storage,
+    ):
+        print_with_color(
+            "{index_type}: build {build_time:.2f}s, latency {latency_ms:.3f}ms/query, recall@{k} {recall:.3f}, size {size_mb:.1f}MB".format(
+                k=args.top_k, **result
+            ),
+            "cyan",
+        )
@@ -0,0 +1,165 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import argparse
+import os
+import shutil
+import time
+
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+from ufo.rag.docstore import SIDE_FILE, SideFileDocstore
+from ufo.rag.embeddings import LazyEmbeddings
+from ufo.rag.index_factory import IndexFactory
+from ufo.utils import print_with_color
+
+# The files written by FAISS.save_local.
+INDEX_FILES = ["index.faiss", "index.pkl", SIDE_FILE]
+
+
+def get_folder_size(folder_path: str) -> int:
+    """
+    Get the size of the vector database files in a folder.
+    :param folder_path: The folder of the vector database.
+    :return: The size in bytes.
+    """
+    return sum(
+        os.path.getsize(os.path.join(folder_path, file))
+        for file in INDEX_FILES
+        if os.path.exists(os.path.join(folder_path, file))
+    )
+
+
+def get_load_time(folder_path: str, embeddings) -> float:
+    """
+    Measure the time to load a vector database.
+    :param folder_path: The folder of the vector database.
+    :param embeddings: The embedding model.
+    :return: The load time in seconds.
+    """
+    start = time.perf_counter()
+    db = IndexFactory.load_local(folder_path, embeddings)
+    load_time = time.perf_counter() - start
+
+    if isinstance(db.docstore, SideFileDocstore):
+        db.docstore.close()
+
+    return load_time
+
+
+def migrate(
+    db_path: str,
+    output_path: str = None,
+    storage: str = "float16",
+    side_fields: list = None,
+    train_sample_size: int = 50000,
+) -> str:
+    """
+    Migrate an existing vector database to a compressed vector storage and a side file docstore.
+    The documents are not re-embedded: the vectors are reconstructed from the existing index.
+    :param db_path: The folder of the vector database.
+    :param output_path: The folder to save the migrated vector database to, default is in place.
+    :param storage: The vector storage, "float32", "float16" or "int8".
+    :param side_fields: The metadata fields to move to the side file, empty to keep the docstore in memory.
+    :param train_sample_size: The maximum number of vectors used to train the index.
+    :return: The folder of the migrated vector database.
+    """
+    output_path = output_path or db_path
+    side_fields = side_fields or []
+
+    # The documents are not re-embedded, so the embedding model is never loaded.
+    embeddings = LazyEmbeddings("sentence-transformers/all-mpnet-base-v2")
+
+    size_before = get_folder_size(db_path)
+    load_time_before = get_load_time(db_path, embeddings)
+
+    db = IndexFactory.load_local(db_path, embeddings)
+
+    IndexFactory.rebuild(
+        db,
+        IndexFactory.get_index_type(db.index),
+        train_sample_size,
+        storage=storage,
+    )
+
+    # Load the fields of the documents before the docstore is replaced.
+    documents = {
+        doc_id: db.docstore.search(doc_id)
+        for doc_id in db.index_to_docstore_id.values()
+    }
+    if isinstance(db.docstore, SideFileDocstore):
+        db.docstore.close()
+    db.docstore = (
+        SideFileDocstore(side_fields, documents)
+        if side_fields
+        else InMemoryDocstore(documents)
+    )
+
+    # Copy the other files of the database, e.g. the manifest and the keyword index of the learner.
+    if os.path.abspath(output_path) != os.path.abspath(db_path):
+        shutil.copytree(
+            db_path,
+            output_path,
+            ignore=shutil.ignore_patterns(*INDEX_FILES),
+            dirs_exist_ok=True,
+        )
+
+    IndexFactory.save_local(db, output_path)
+
+    if not side_fields:
+        side_file = os.path.join(output_path, SIDE_FILE)
+        if os.path.exists(side_file):
+            os.remove(side_file)
+    else:
+        db.docstore.close()
+
+    size_after = get_folder_size(output_path)
+    load_time_after = get_load_time(output_path, embeddings)
+
+    print_with_color(
+        "Migrated {path}: {size_before:.1f}MB -> {size_after:.1f}MB, load time {load_before:.3f}s -> {load_after:.3f}s.".format(
+            path=output_path,
+            size_before=size_before / 2**20,
+            size_after=size_after / 2**20,
+            load_before=load_time_before,
+            load_after=load_time_after,
+        ),
+        "green",
+    )
+
+    return output_path
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Migrate a vector database to a compressed vector storage and a side file docstore."
+    )
+    parser.add_argument("db_path", help="The folder of the vector database.")
+    parser.add_argument(
+        "--output_path",
+        help="The folder to save the migrated vector database to, default is in place.",
+        default=None,
+    )
+    parser.add_argument(
+        "--storage",
+        help="The vector storage.",
+        choices=["float32", "float16", "int8"],
+        default="float16",
+    )
+    parser.add_argument(
+        "--side_fields",
+        help="The metadata fields to move to the side file, e.g. text for the help documents and example for the experience and demonstration.",
+        nargs="*",
+        default=["text"],
+    )
+    parser.add_argument("--train_sample_size", type=int, default=50000)
+    args = parser.parse_args()
+
+    migrate(
+        args.db_path,
+        args.output_path,
+        args.storage,
+        args.side_fields,
+        args.train_sample_size,
+    )
@@ -4,12 +4,16 @@
 from abc import ABC, abstractmethod
 
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 
-from ufo.config.config import get_offline_learner_indexer_config
+from ufo.config.config import Config, get_offline_learner_indexer_config
 from ufo.rag import web_search
+from ufo.rag.bm25 import BM25Index, tokenize
+from ufo.rag.embeddings import LazyEmbeddings
+from ufo.rag.index_factory import IndexFactory
 from ufo.utils import print_with_color
 
+configs = Config.get_instance().config_data
+
 
 class RetrieverFactory:
     """
@@ -73,7 +77,8 @@ class Retriever(ABC):
 
 class OfflineDocRetriever(Retriever):
     """
-    Class to create offline retrievers.
+    Class to create offline retrievers. The documents are ranked by fusing the BM25 keyword scores
+    with the dense similarity scores when the indexer has a BM25 index.
     """
 
     def __init__(self, app_name: str) -> None:
@@ -82,6 +87,11 @@ class OfflineDocRetriever(Retriever):
         :appname: The name of the application.
         """
         self.app_name = app_name
+        # The weight of the dense scores in the fusion, 1 for dense only and 0 for keywords only.
+        self.alpha = configs.get("RAG_OFFLINE_DOCS_HYBRID_ALPHA", 0.5)
+        # Queries with at most this number of keywords skip the embedding model if they match any keywords.
+        self.keyword_max_tokens = configs.get("RAG_OFFLINE_DOCS_KEYWORD_MAX_TOKENS", 3)
+        self.keyword_indexer = None
         indexer_path = self.get_offline_indexer_path()
         self.indexer = self.get_indexer(indexer_path)
 
@@ -112,11 +122,9 @@ class OfflineDocRetriever(Retriever):
             return None
 
         try:
-            embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-mpnet-base-v2"
-            )
-            db = FAISS.load_local(path, embeddings)
-            return db
+            # The embedding model is only loaded when a query needs the dense retrieval.
+            embeddings = LazyEmbeddings("sentence-transformers/all-mpnet-base-v2")
+            db = IndexFactory.load_local(path, embeddings)
         except:
             print_with_color(
                 "Warning: Failed to load offline indexer from {path}.".format(
@@ -126,6 +134,122 @@ class OfflineDocRetriever(Retriever):
             )
             return None
 
+        try:
+            self.keyword_indexer = BM25Index.load(path)
+        except (OSError, ValueError, KeyError):
+            print_with_color(
+                "Warning: Failed to load the keyword index from {path}, use the dense retrieval only.".format(
+                    path=path
+                ),
+                "yellow",
+            )
+
+        return db
+
+    def retrieve(self, query: str, top_k: int, filter=None):
+        """
+        Retrieve the document from the given query.
+        :param query: The query to retrieve the document from.
+        :param top_k: The number of documents to retrieve.
+        :filter: The filter to apply to the retrieved documents.
+        :return: The document from the given query.
+        """
+        if not self.indexer:
+            return None
+
+        if self.keyword_indexer is None or self.alpha >= 1:
+            return super().retrieve(query, top_k, filter=filter)
+
+        num_candidates = max(top_k * 4, 20)
+
+        keyword_hits = [
+            (document, score)
+            for document, score in self.keyword_search(query, num_candidates)
+            if self.match_filter(document.metadata, filter)
+        ]
+
+        # Fast path: short keyword queries are answered without the embedding model.
+        if self.alpha <= 0 or (
+            keyword_hits and len(tokenize(query)) <= self.keyword_max_tokens
+        ):
+            return [document for document, _ in keyword_hits[:top_k]]
+
+        dense_hits = self.indexer.similarity_search_with_score(
+            query, num_candidates, filter=filter
+        )
+
+        return self.fuse(dense_hits, keyword_hits, top_k)
+
+    def keyword_search(self, query: str, top_k: int):
+        """
+        Search the documents by the BM25 keyword index.
+        :param query: The query.
+        :param top_k: The number of documents to retrieve.
+        :return: The documents and their BM25 scores, best first.
+        """
+        hits = []
+
+        for doc_id, score in self.keyword_indexer.search(query, top_k):
+            document = self.indexer.docstore.search(doc_id)
+            if isinstance(document, str):
+                # The docstore returns an error message if the document is missing.
+                continue
+            hits.append((document, score))
+
+        return hits
+
+    def fuse(self, dense_hits: list, keyword_hits: list, top_k: int):
+        """
+        Fuse the dense and keyword rankings by a weighted sum of their min-max normalized scores.
+        :param dense_hits: The documents and their distances from the dense retrieval.
+        :param keyword_hits: The documents and their BM25 scores from the keyword retrieval.
+        :param top_k: The number of documents to return.
+        :return: The fused documents, best first.
+        """
+        # A document is identified by its id if the docstore sets it, otherwise the docstore
+        # returns the same document object to both retrievals.
+        fused = {}
+
+        if dense_hits:
+            distances = [distance for _, distance in dense_hits]
+            low, high = min(distances), max(distances)
+            for document, distance in dense_hits:
+                similarity = (high - distance) / (high - low) if high > low else 1.0
+                fused[document.id or id(document)] = [document, self.alpha * similarity]
+
+        if keyword_hits:
+            scores = [score for _, score in keyword_hits]
+            low, high = min(scores), max(scores)
+            for document, score in keyword_hits:
+                relevance = (score - low) / (high - low) if high > low else 1.0
+                entry = fused.setdefault(document.id or id(document), [document, 0.0])
+                entry[1] += (1 - self.alpha) * relevance
+
+        ranked = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)
+
+        return [document for document, _ in ranked[:top_k]]
+
+    @staticmethod
+    def match_filter(metadata: dict, filter) -> bool:
+        """
+        Check whether the metadata of a document matches the filter.
+        :param metadata: The metadata of the document.
+        :param filter: A callable on the metadata, or a dict of the required metadata values.
+        :return: True if the document matches the filter.
+        """
+        if filter is None:
+            return True
+        if callable(filter):
+            return filter(metadata)
+        return all(
+            (
+                metadata.get(key) in value
+                if isinstance(value, list)
+                else metadata.get(key) == value
+            )
+            for key, value in filter.items()
+        )
+
 
 class ExperienceRetriever(Retriever):
     """
@@ -149,7 +273,7 @@ class ExperienceRetriever(Retriever):
             embeddings = HuggingFaceEmbeddings(
                 model_name="sentence-transformers/all-mpnet-base-v2"
             )
-            db = FAISS.load_local(db_path, embeddings)
+            db = IndexFactory.load_local(db_path, embeddings)
             return db
         except:
             print_with_color(
@@ -219,7 +343,7 @@ class DemonstrationRetriever(Retriever):
             embeddings = HuggingFaceEmbeddings(
                 model_name="sentence-transformers/all-mpnet-base-v2"
             )
-            db = FAISS.load_local(db_path, embeddings)
+            db = IndexFactory.load_local(db_path, embeddings)
             return db
         except:
             print_with_color(
@@ -0,0 +1,238 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from langchain.storage import LocalFileStore
+
+
+def prune_cache_folder(
+    folder_path: str,
+    ttl: float = 0,
+    max_bytes: int = 0,
+    suffix: str = "",
+    by_access: bool = False,
+) -> int:
+    """
+    Remove the expired files of a cache folder and its subfolders, then the oldest files until the folder is within its size limit.
+    :param folder_path: The cache folder.
+    :param ttl: The time-to-live of a file in seconds. Non-positive values keep the files regardless of their age.
+    :param max_bytes: The maximum total size in bytes of the files. Non-positive values disable the limit.
+    :param suffix: The suffix of the cache files, other files are ignored.
+    :param by_access: Whether to age the files by their last access instead of their last modification.
+    :return: The number of removed files.
+    """
+    if not os.path.isdir(folder_path):
+        return 0
+
+    files = []
+    for root, _, file_names in os.walk(folder_path):
+        for file_name in file_names:
+            if not file_name.endswith(suffix) or file_name.endswith(".tmp"):
+                continue
+            file_path = os.path.join(root, file_name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            used_at = max(stat.st_atime, stat.st_mtime) if by_access else stat.st_mtime
+            files.append((used_at, stat.st_size, file_path))
+
+    removed = 0
+    now = time.time()
+    kept = []
+
+    for used_at, size, file_path in sorted(files):
+        if ttl > 0 and now - used_at > ttl:
+            try:
+                os.remove(file_path)
+                removed += 1
+            except OSError:
+                # The file is removed or replaced by another process.
+                pass
+        else:
+            kept.append((size, file_path))
+
+    if max_bytes <= 0:
+        return removed
+
+    total_bytes = sum(size for size, _ in kept)
+
+    for size, file_path in kept:
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(file_path)
+        except OSError:
+            continue
+        total_bytes -= size
+        removed += 1
+
+    return removed
+
+
+class WebPageCache:
+    """
+    On-disk cache of fetched web pages, keyed by URL with a time-to-live and a size limit.
+    The expired entries are removed when the cache is opened and every PRUNE_INTERVAL writes,
+    together with the oldest entries over the size limit.
+    """
+
+    # The number of writes between two prunings of the cache.
+    PRUNE_INTERVAL = 100
+
+    def __init__(self, cache_path: str, ttl: float = 86400, max_bytes: int = 0) -> None:
+        """
+        Create a new WebPageCache.
+        :param cache_path: The directory to store the cached pages in.
+        :param ttl: The time-to-live of a cached page in seconds. Non-positive values disable the cache.
+        :param max_bytes: The maximum total size in bytes of the cached pages. Non-positive values disable the limit.
+        """
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            self.prune()
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether the cache is enabled.
+        :return: True if the cache is enabled.
+        """
+        return bool(self.cache_path) and self.ttl > 0
+
+    def get_entry_path(self, url: str) -> str:
+        """
+        Get the path of the cache entry of a URL.
+        :param url: The URL.
+        :return: The path of the cache entry.
+        """
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_path, key + ".json")
+
+    def get(self, url: str) -> Optional[str]:
+        """
+        Get the cached text of a URL.
+        :param url: The URL.
+        :return: The cached text, or None if it is missing or expired.
+        """
+        if not self.enabled:
+            return None
+
+        entry_path = self.get_entry_path(url)
+
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry: Dict[str, Any] = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if (
+            entry.get("url") != url
+            or time.time() - entry.get("fetched_at", 0) > self.ttl
+        ):
+            return None
+
+        return entry.get("text")
+
+    def set(self, url: str, text: str) -> None:
+        """
+        Cache the text of a URL.
+        :param url: The URL.
+        :param text: The text to cache.
+        """
+        if not self.enabled:
+            return
+
+        os.makedirs(self.cache_path, exist_ok=True)
+        entry_path = self.get_entry_path(url)
+        temp_path = "{path}.{pid}.{tid}.tmp".format(
+            path=entry_path, pid=os.getpid(), tid=threading.get_ident()
+        )
+
+        # Write to a temporary file first so that concurrent readers never see a partial entry.
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "fetched_at": time.time(), "text": text}, f)
+        os.replace(temp_path, entry_path)
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_INTERVAL == 0
+
+        if prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Remove the expired entries, then the oldest entries until the cache is within its size limit.
+        :return: The number of removed entries.
+        """
+        return prune_cache_folder(self.cache_path, self.ttl, self.max_bytes, ".json")
+
+    def clear_expired(self) -> int:
+        """
+        Remove the expired entries from the cache.
+        :return: The number of removed entries.
+        """
+        return prune_cache_folder(self.cache_path, self.ttl, suffix=".json")
+
+
+class EmbeddingFileStore(LocalFileStore):
+    """
+    The on-disk store of the cached embeddings of the web pages, bounded in size. The least recently used embeddings
+    are removed when the store is opened and every PRUNE_INTERVAL writes. The embeddings have no time-to-live, as the
+    embedding of a text does not change.
+    """
+
+    # The number of written embeddings between two prunings of the store.
+    PRUNE_INTERVAL = 100
+
+    def __init__(self, root_path: str, max_bytes: int = 0) -> None:
+        """
+        Create a new EmbeddingFileStore.
+        :param root_path: The directory to store the embeddings in.
+        :param max_bytes: The maximum total size in bytes of the embeddings. Non-positive values disable the limit.
+        """
+        # The access time of an embedding is updated when it is read, to remove the least recently used first.
+        super().__init__(root_path, update_atime=True)
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        self.prune()
+
+    def mset(self, key_value_pairs: Sequence[Tuple[str, bytes]]) -> None:
+        """
+        Store the embeddings, and prune the store every PRUNE_INTERVAL writes.
+        :param key_value_pairs: The keys and the serialized embeddings.
+        """
+        key_value_pairs = list(key_value_pairs)
+        super().mset(key_value_pairs)
+
+        with self._lock:
+            previous = self._writes
+            self._writes += len(key_value_pairs)
+            prune = (
+                self._writes // self.PRUNE_INTERVAL > previous // self.PRUNE_INTERVAL
+            )
+
+        if prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Remove the least recently used embeddings until the store is within its size limit.
+        :return: The number of removed embeddings.
+        """
+        return prune_cache_folder(
+            str(self.root_path), max_bytes=self.max_bytes, by_access=True
+        )
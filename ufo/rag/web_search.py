@@ -1,28 +1,66 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 import requests
 from langchain.docstore.document import Document
+from langchain.embeddings import CacheBackedEmbeddings
 from langchain.text_splitter import HTMLHeaderTextSplitter
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+from requests.adapters import HTTPAdapter
 
 from ufo.config.config import Config
+from ufo.rag.index_factory import IndexFactory
+from ufo.rag.web_cache import EmbeddingFileStore, WebPageCache
 from ufo.utils import print_with_color
 
 configs = Config.get_instance().config_data
 
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+
 
 class BingSearchWeb:
     """
     Class to retrieve web documents.
     """
 
-    def __init__(self):
+    # The page embeddings are shared by all the retrievers in the process.
+    _embeddings = None
+    _embeddings_lock = threading.Lock()
+
+    def __init__(self, endpoint: Optional[str] = None):
         """
         Create a new WebRetriever.
+        :param endpoint: The Bing search endpoint, default to the BING_SEARCH_ENDPOINT in the config.
         """
         self.api_key = configs["BING_API_KEY"]
+        self.endpoint = endpoint or configs.get(
+            "BING_SEARCH_ENDPOINT", "https://api.bing.microsoft.com/v7.0/search"
+        )
+        self.max_workers = max(1, configs.get("RAG_ONLINE_FETCH_WORKERS", 8))
+        self.timeout = configs.get("RAG_ONLINE_FETCH_TIMEOUT", 10)
+        self.max_bytes = configs.get("RAG_ONLINE_FETCH_MAX_BYTES", 2 * 1024 * 1024)
+
+        cache_path = configs.get("RAG_ONLINE_CACHE_PATH", "vectordb/online_cache/")
+        self.page_cache = WebPageCache(
+            os.path.join(cache_path, "pages") if cache_path else "",
+            configs.get("RAG_ONLINE_CACHE_TTL", 86400),
+            configs.get("RAG_ONLINE_CACHE_MAX_BYTES", 256 * 1024 * 1024),
+        )
+        self.embedding_cache_path = (
+            os.path.join(cache_path, "embeddings") if cache_path else ""
+        )
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.max_workers, pool_maxsize=self.max_workers
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def search(self, query: str, top_k: int = 1):
         """
@@ -30,12 +68,14 @@ class BingSearchWeb:
         :param url: The URL to retrieve the web document from.
         :return: The web document from the given URL.
         """
-        url = f"https://api.bing.microsoft.com/v7.0/search?q={query}"
+        url = f"{self.endpoint}?q={query}"
         if top_k > 0:
             url += f"&count={top_k}"
         try:
-            response = requests.get(
-                url, headers={"Ocp-Apim-Subscription-Key": self.api_key}
+            response = self.session.get(
+                url,
+                headers={"Ocp-Apim-Subscription-Key": self.api_key},
+                timeout=self.timeout,
             )
         except requests.RequestException as e:
             print_with_color(
@@ -51,6 +91,40 @@ class BingSearchWeb:
 
         return result_list
 
+    def fetch_url(self, url: str) -> str:
+        """
+        Fetch the HTML of the given URL, from the page cache if it is fresh.
+        The download stops after max_bytes and the request times out after timeout seconds.
+        :param url: The URL to fetch.
+        :return: The HTML of the given URL.
+        """
+        text = self.page_cache.get(url)
+        if text is not None:
+            return text
+
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        }
+
+        with self.session.get(
+            url, headers=headers, timeout=self.timeout, stream=True
+        ) as response:
+            response.raise_for_status()
+
+            content = bytearray()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                content.extend(chunk)
+                if len(content) >= self.max_bytes:
+                    del content[self.max_bytes :]
+                    break
+
+            encoding = response.encoding or "utf-8"
+
+        text = content.decode(encoding, errors="replace")
+        self.page_cache.set(url, text)
+
+        return text
+
     def get_url_text(self, url: str):
         """
         Retrieve the web document from the given URL.
@@ -59,22 +133,18 @@ class BingSearchWeb:
         """
         print(f"Getting search result for {url}")
         try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                html_splitter = HTMLHeaderTextSplitter(headers_to_split_on=[])
-                document = html_splitter.split_text(response.text)
-                return document
-            else:
-                print_with_color(
-                    "Warning: Error in  getting search result for {url}, error code: {status_code}.".format(
-                        url=url, status_code=response.status_code
-                    ),
-                    "yellow",
-                )
-                return [Document(page_content="", metadata={"url": url})]
+            text = self.fetch_url(url)
+            html_splitter = HTMLHeaderTextSplitter(headers_to_split_on=[])
+            document = html_splitter.split_text(text)
+            return document
+        except requests.exceptions.HTTPError as e:
+            print_with_color(
+                "Warning: Error in  getting search result for {url}, error code: {status_code}.".format(
+                    url=url, status_code=e.response.status_code
+                ),
+                "yellow",
+            )
+            return [Document(page_content="", metadata={"url": url})]
         except requests.exceptions.RequestException as e:
             print_with_color(
                 "Warning: Error in getting search result for {url}: {e}.".format(
@@ -92,8 +162,20 @@ class BingSearchWeb:
         """
         document_list = []
 
-        for result in result_list:
-            documents = self.get_url_text(result["url"])
+        if not result_list:
+            return document_list
+
+        # Fetch the pages concurrently, map keeps the order of the results.
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(result_list))
+        ) as executor:
+            fetched = list(
+                executor.map(
+                    self.get_url_text, [result["url"] for result in result_list]
+                )
+            )
+
+        for result, documents in zip(result_list, fetched):
             for document in documents:
                 page_content = document.page_content
                 metadata = document.metadata
@@ -112,10 +194,39 @@ class BingSearchWeb:
         :param query: The query to create an indexer for.
         :return: The created indexer.
         """
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-mpnet-base-v2"
+        embeddings = self.get_embeddings()
+
+        db = IndexFactory.from_documents(
+            documents,
+            embeddings,
+            configs.get("RAG_INDEX_TYPE", "auto"),
+            configs.get("RAG_INDEX_TRAIN_SAMPLE_SIZE", 50000),
+            storage=configs.get("RAG_INDEX_STORAGE", "float16"),
         )
 
-        db = FAISS.from_documents(documents, embeddings)
-
         return db
+
+    def get_embeddings(self):
+        """
+        Get the embeddings of the web pages. The embedding model is loaded once per process,
+        and the page embeddings are cached on disk to be reused across sessions.
+        :return: The embeddings.
+        """
+        with BingSearchWeb._embeddings_lock:
+            if BingSearchWeb._embeddings is None:
+                embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+                if self.embedding_cache_path:
+                    embeddings = CacheBackedEmbeddings.from_bytes_store(
+                        embeddings,
+                        EmbeddingFileStore(
+                            self.embedding_cache_path,
+                            configs.get(
+                                "RAG_ONLINE_EMBEDDING_CACHE_MAX_BYTES",
+                                256 * 1024 * 1024,
+                            ),
+                        ),
+                        namespace=EMBEDDING_MODEL_NAME,
+                    )
+                BingSearchWeb._embeddings = embeddings
+
+        return BingSearchWeb._embeddings
@@ -33,6 +33,13 @@ args.add_argument(
     type=str,
     default="",
 )
+args.add_argument(
+    "--resume",
+    "-r",
+    help="The log folder of a session to resume from its checkpoint, or the log folder of a batch of sessions.",
+    type=str,
+    default="",
+)
 
 
 parsed_args = args.parse_args()
@@ -47,10 +54,16 @@ def main():
 
     To use follower mode that follows a plan file or folder, run the following command:
     python -m ufo -t task_name -m follower -p path_to_plan_file_or_folder
+
+    To resume a session or a batch of sessions from their checkpoints, run the following command:
+    python -m ufo --resume logs/task_name
     """
-    sessions = SessionFactory().create_session(
-        task=parsed_args.task, mode=parsed_args.mode, plan=parsed_args.plan
-    )
+    if parsed_args.resume:
+        sessions = SessionFactory().resume_session(parsed_args.resume)
+    else:
+        sessions = SessionFactory().create_session(
+            task=parsed_args.task, mode=parsed_args.mode, plan=parsed_args.plan
+        )
 
     clients = UFOClientManager(sessions)
     clients.run_all()
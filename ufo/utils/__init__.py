@@ -2,9 +2,12 @@
 # Licensed under the MIT License.
 
 import importlib
+import importlib.util
 import json
 import os
-from typing import Optional, Any, Dict
+import threading
+import types
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
 from colorama import Fore, Style, init
 
@@ -105,15 +108,52 @@ def revise_line_breaks(args: Dict[str, Any]) -> Dict[str, Any]:
     return args
 
 
-def LazyImport(module_name: str) -> Any:
+class LazyModule(types.ModuleType):
     """
-    Import a module as a global variable.
-    :param module_name: The name of the module to import.
-    :return: The imported module.
+    A module which is imported at the first access to one of its attributes, e.g. an optional heavy dependency.
     """
-    global_name = module_name.split(".")[-1]
-    globals()[global_name] = importlib.import_module(module_name, __package__)
-    return globals()[global_name]
+
+    def __init__(self, module_name: str) -> None:
+        """
+        Initialize the lazy module.
+        :param module_name: The absolute name of the module.
+        """
+        super().__init__(module_name)
+        self.__dict__["_lazy_lock"] = threading.Lock()
+        self.__dict__["_lazy_module"] = None
+
+    def load(self) -> types.ModuleType:
+        """
+        Import the module if it is not imported yet.
+        :return: The imported module.
+        """
+        with self._lazy_lock:
+            if self._lazy_module is None:
+                self.__dict__["_lazy_module"] = importlib.import_module(self.__name__)
+        return self._lazy_module
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        Whether the module is imported.
+        :return: True if the module is imported.
+        """
+        return self._lazy_module is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.load(), name)
+
+    def __dir__(self) -> List[str]:
+        return dir(self.load())
+
+
+def LazyImport(module_name: str) -> LazyModule:
+    """
+    Import a module lazily, at the first access to one of its attributes.
+    :param module_name: The name of the module to import, relative names are resolved from the ufo.utils package.
+    :return: The lazy module.
+    """
+    return LazyModule(importlib.util.resolve_name(module_name, __package__))
 
 
 def find_desktop_path() -> Optional[str]:
@@ -147,3 +187,85 @@ def append_string_to_file(file_path: str, string: str) -> None:
     # Append the string to the file.
     with open(file_path, "a", encoding="utf-8") as file:
         file.write(string + "\n")
+
+
+def tail_lines(file_path: str, last_k: int, block_size: int = 65536) -> List[str]:
+    """
+    Read the last lines of a file. The file is read backwards block by block, so only its tail is loaded.
+    :param file_path: The path of the file.
+    :param last_k: The number of lines to read from the end of the file. If 0 or negative, read all lines.
+    :param block_size: The number of bytes read per block.
+    :return: The last lines, without the line breaks.
+    """
+    if last_k <= 0:
+        # The whole file is read, as with lines[-0:].
+        with open(file_path, "r", encoding="utf-8") as file:
+            return [line.rstrip("\r\n") for line in file]
+
+    with open(file_path, "rb") as file:
+        position = file.seek(0, os.SEEK_END)
+        blocks = []
+        # The line break at the end of the file does not start a new line.
+        line_breaks = -1
+
+        while position > 0 and line_breaks < last_k:
+            read_size = min(block_size, position)
+            position -= read_size
+            file.seek(position)
+            block = file.read(read_size)
+            if not blocks:
+                line_breaks += 0 if block.endswith(b"\n") else 1
+            line_breaks += block.count(b"\n")
+            blocks.append(block)
+
+    if not blocks:
+        return []
+
+    data = b"".join(reversed(blocks))
+    if data.endswith(b"\n"):
+        data = data[:-1]
+
+    # The first line is incomplete unless the start of the file is reached.
+    lines = data.split(b"\n")[-last_k:]
+
+    return [line.decode("utf-8").rstrip("\r") for line in lines]
+
+
+def iter_json_lines(
+    file_path: str,
+    last_k: int = -1,
+    on_error: Optional[Callable[[str, Exception], None]] = None,
+) -> Iterator[Any]:
+    """
+    Parse the lines of a JSON lines file lazily, e.g. a response log. Blank lines are skipped.
+    :param file_path: The path of the file.
+    :param last_k: The number of lines to read from the end of the file. If 0 or negative, read all lines.
+    :param on_error: The callback for a line that is not valid JSON, with the line and the error. If None, the error is raised.
+    :return: The iterator of the parsed lines.
+    """
+    if last_k <= 0:
+        with open(file_path, "r", encoding="utf-8") as file:
+            yield from _parse_json_lines(file, on_error)
+    else:
+        yield from _parse_json_lines(tail_lines(file_path, last_k), on_error)
+
+
+def _parse_json_lines(
+    lines: Iterator[str], on_error: Optional[Callable[[str, Exception], None]]
+) -> Iterator[Any]:
+    """
+    Parse lines as JSON.
+    :param lines: The lines.
+    :param on_error: The callback for a line that is not valid JSON. If None, the error is raised.
+    :return: The iterator of the parsed lines.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            if on_error is None:
+                raise
+            on_error(line, e)
@@ -0,0 +1,145 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+Measure the import time of UFO with 'python -X importtime', and check that the optional heavy dependencies,
+e.g. the RAG and the control filter dependencies, are not imported at startup. Run it from the cloned UFO folder:
+
+    python -m ufo.utils.importtime --check --max_seconds 1.0
+
+With --check, the command exits with an error if a heavy module is imported or the import exceeds the budget,
+so it can guard against import time regressions.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+# The module imported at startup by 'python -m ufo'.
+STARTUP_MODULE = "ufo.module.sessions.session"
+
+# The optional heavy dependencies, imported only when the features using them are enabled.
+HEAVY_MODULES = (
+    "faiss",
+    "langchain",
+    "langchain_community",
+    "langchain_core",
+    "openai",
+    "pandas",
+    "pyarrow",
+    "sentence_transformers",
+    "torch",
+    "transformers",
+)
+
+# The folder of the cloned UFO repository, where the configuration files are found.
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_importtime(output: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Parse the output of 'python -X importtime'.
+    :param output: The output, written to stderr.
+    :return: The self and cumulative import times in microseconds, keyed by the module name.
+    """
+    times = {}
+
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+
+        times[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+
+    return times
+
+
+def measure_import(module: str = STARTUP_MODULE, repeats: int = 3) -> Dict[str, Any]:
+    """
+    Measure the import time of a module in fresh interpreters.
+    :param module: The module to import.
+    :param repeats: The number of measurements, the fastest is kept.
+    :return: The import time in seconds and the heavy modules imported.
+    """
+    best: Optional[Dict[str, Tuple[int, int]]] = None
+
+    for _ in range(max(1, repeats)):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import " + module],
+            cwd=ROOT_PATH,
+            capture_output=True,
+            text=True,
+        )
+
+        if process.returncode != 0:
+            raise RuntimeError(
+                "Failed to import {module}: {error}".format(
+                    module=module, error=process.stderr.strip().splitlines()[-1:]
+                )
+            )
+
+        times = parse_importtime(process.stderr)
+        if best is None or times[module][1] < best[module][1]:
+            best = times
+
+    return {
+        "module": module,
+        "seconds": best[module][1] / 1e6,
+        "heavy_modules": sorted(name for name in best if name in HEAVY_MODULES),
+        "slowest": sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:10],
+    }
+
+
+def check_import(result: Dict[str, Any], max_seconds: Optional[float]) -> List[str]:
+    """
+    Check a measurement for import time regressions.
+    :param result: The measurement.
+    :param max_seconds: The budget of the import time in seconds, not checked if None.
+    :return: The problems found.
+    """
+    problems = [
+        "{name} is imported at startup.".format(name=name)
+        for name in result["heavy_modules"]
+    ]
+
+    if max_seconds is not None and result["seconds"] > max_seconds:
+        problems.append(
+            "The import takes {seconds:.3f}s, over the budget of {budget:.3f}s.".format(
+                seconds=result["seconds"], budget=max_seconds
+            )
+        )
+
+    return problems
+
+
+if __name__ == "__main__":
+
+    from ufo.utils import print_with_color
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", type=str, default=STARTUP_MODULE)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max_seconds", type=float, default=None)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    result = measure_import(args.module, args.repeats)
+
+    print_with_color(
+        "Import of {module}: {seconds:.3f}s".format(**result),
+        "yellow",
+    )
+    for name, (self_time, _) in result["slowest"]:
+        print("{time:>10.1f} ms  {name}".format(time=self_time / 1e3, name=name))
+
+    problems = check_import(result, args.max_seconds)
+    for problem in problems:
+        print_with_color(problem, "red")
+
+    if args.check and problems:
+        sys.exit(1)
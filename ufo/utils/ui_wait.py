@@ -0,0 +1,318 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+This module waits for the UI to become idle after an action, instead of sleeping for a fixed time.
+The UI is idle when consecutive screenshots do not change, the window is ready and the cursor is not busy.
+The UI state is read through a UIStateProbe, so that the wait can be replayed with synthetic frames.
+The module does not import the desktop automation packages, so that it can be used and tested on any platform.
+"""
+
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+from PIL import Image, ImageChops, ImageGrab, ImageStat
+
+from ufo.config.config import Config
+
+if TYPE_CHECKING:
+    from pywinauto.controls.uiawrapper import UIAWrapper
+
+configs = Config.get_instance().config_data
+
+# The size the frames are reduced to before they are compared.
+FRAME_SIZE = (160, 160)
+
+# The pixel difference below which a pixel is considered unchanged, e.g. for compression noise.
+PIXEL_TOLERANCE = 16
+
+
+def normalize_frame(frame: Image.Image) -> Image.Image:
+    """
+    Reduce a frame to a small grayscale image for the comparison.
+    :param frame: The frame.
+    :return: The reduced frame.
+    """
+    reduced = frame.convert("L")
+    reduced.thumbnail(FRAME_SIZE)
+    return reduced
+
+
+def frame_difference(previous: Image.Image, current: Image.Image) -> float:
+    """
+    Get the share of the pixels that changed between two reduced frames.
+    :param previous: The previous reduced frame.
+    :param current: The current reduced frame.
+    :return: The share of the changed pixels, 1.0 if the frames have different sizes.
+    """
+    if previous.size != current.size:
+        return 1.0
+
+    changed = ImageChops.difference(previous, current).point(
+        lambda value: 255 if value > PIXEL_TOLERANCE else 0
+    )
+
+    return ImageStat.Stat(changed).mean[0] / 255
+
+
+class UIStateProbe(ABC):
+    """
+    The abstract class to read the state of the UI.
+    """
+
+    @abstractmethod
+    def capture_frame(self) -> Optional[Image.Image]:
+        """
+        Capture the current frame of the UI.
+        :return: The frame, or None if it cannot be captured.
+        """
+        pass
+
+    def is_ready(self) -> bool:
+        """
+        Check whether the window accepts input.
+        :return: Whether the window is ready.
+        """
+        return True
+
+    def is_busy(self) -> bool:
+        """
+        Check whether the cursor shows that the system is busy.
+        :return: Whether the cursor is busy.
+        """
+        return False
+
+
+class WindowStateProbe(UIStateProbe):
+    """
+    The probe of an application window, or of the desktop if there is no window, e.g. while an application starts.
+    """
+
+    _busy_cursors = None
+
+    def __init__(self, window: Optional["UIAWrapper"] = None) -> None:
+        """
+        Create a new WindowStateProbe.
+        :param window: The application window.
+        """
+        self.window = window
+
+    def capture_frame(self) -> Optional[Image.Image]:
+        """
+        Capture the window, or the desktop if the window is not available.
+        :return: The frame, or None if it cannot be captured.
+        """
+        if self.window is not None:
+            try:
+                return self.window.capture_as_image()
+            except Exception:
+                pass
+
+        try:
+            return ImageGrab.grab(all_screens=True)
+        except Exception:
+            return None
+
+    def is_ready(self) -> bool:
+        """
+        Check whether the window is visible and enabled. A closed window has nothing to wait for.
+        :return: Whether the window is ready.
+        """
+        if self.window is None:
+            return True
+
+        try:
+            return self.window.is_visible() and self.window.is_enabled()
+        except Exception:
+            return True
+
+    def is_busy(self) -> bool:
+        """
+        Check whether the cursor is the wait or the app starting cursor.
+        :return: Whether the cursor is busy.
+        """
+        try:
+            import win32con
+            import win32gui
+
+            if WindowStateProbe._busy_cursors is None:
+                WindowStateProbe._busy_cursors = {
+                    win32gui.LoadCursor(0, win32con.IDC_WAIT),
+                    win32gui.LoadCursor(0, win32con.IDC_APPSTARTING),
+                }
+
+            _, cursor, _ = win32gui.GetCursorInfo()
+        except Exception:
+            return False
+
+        return cursor in WindowStateProbe._busy_cursors
+
+
+class FrameSequenceProbe(UIStateProbe):
+    """
+    The probe replaying a sequence of frames, e.g. recorded screenshots or synthetic frames.
+    The last state is repeated when the sequence ends.
+    """
+
+    def __init__(
+        self,
+        frames: List[Optional[Image.Image]],
+        ready: Optional[List[bool]] = None,
+        busy: Optional[List[bool]] = None,
+    ) -> None:
+        """
+        Create a new FrameSequenceProbe.
+        :param frames: The frames returned by the successive captures.
+        :param ready: The ready states of the successive captures, default is always ready.
+        :param busy: The busy states of the successive captures, default is never busy.
+        """
+        self.frames = frames
+        self.ready = ready or [True]
+        self.busy = busy or [False]
+        self.captures = 0
+
+    def _state(self, states: list):
+        """
+        Get the state of the current capture.
+        :param states: The successive states.
+        :return: The state.
+        """
+        return states[min(max(self.captures - 1, 0), len(states) - 1)]
+
+    def capture_frame(self) -> Optional[Image.Image]:
+        """
+        Get the next frame.
+        :return: The frame.
+        """
+        self.captures += 1
+        return self._state(self.frames)
+
+    def is_ready(self) -> bool:
+        """
+        Get the ready state of the current capture.
+        :return: Whether the window is ready.
+        """
+        return self._state(self.ready)
+
+    def is_busy(self) -> bool:
+        """
+        Get the busy state of the current capture.
+        :return: Whether the cursor is busy.
+        """
+        return self._state(self.busy)
+
+
+@dataclass
+class WaitResult:
+    """
+    The result of a wait for the UI.
+    """
+
+    idle: bool
+    elapsed: float
+    polls: int
+
+
+class UIIdleWaiter:
+    """
+    Poll the UI until it is idle or the timeout is reached.
+    """
+
+    def __init__(
+        self,
+        probe: UIStateProbe,
+        timeout: float,
+        interval: float = 0.2,
+        threshold: float = 0.005,
+        stable_frames: int = 2,
+        min_wait: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+        Create a new UIIdleWaiter.
+        :param probe: The probe of the UI state.
+        :param timeout: The maximum wait time in seconds.
+        :param interval: The time in seconds between two polls.
+        :param threshold: The maximum share of changed pixels between two frames of an idle UI.
+        :param stable_frames: The number of consecutive unchanged frames of an idle UI.
+        :param min_wait: The time in seconds before the first poll, so that a UI which only starts to change some time after the action is not taken as idle.
+        :param clock: The clock, replaceable to replay the wait without sleeping.
+        :param sleep: The sleep function, replaceable to replay the wait without sleeping.
+        """
+        self.probe = probe
+        self.timeout = timeout
+        self.interval = interval
+        self.threshold = threshold
+        self.stable_frames = stable_frames
+        self.min_wait = min_wait
+        self.clock = clock
+        self.sleep = sleep
+
+    def wait(self) -> WaitResult:
+        """
+        Wait until the UI is idle.
+        :return: The result of the wait. idle is False if the timeout is reached first.
+        """
+        start = self.clock()
+        previous = None
+        stable = 0
+        polls = 0
+
+        if self.min_wait > 0:
+            self.sleep(min(self.min_wait, self.timeout))
+
+        while True:
+            polls += 1
+            frame = self.probe.capture_frame()
+            current = normalize_frame(frame) if frame is not None else None
+
+            if (
+                current is not None
+                and previous is not None
+                and frame_difference(previous, current) <= self.threshold
+            ):
+                stable += 1
+            else:
+                stable = 0
+            previous = current
+
+            if (
+                stable >= self.stable_frames
+                and self.probe.is_ready()
+                and not self.probe.is_busy()
+            ):
+                return WaitResult(True, self.clock() - start, polls)
+
+            remaining = self.timeout - (self.clock() - start)
+            if remaining <= 0:
+                return WaitResult(False, self.clock() - start, polls)
+
+            self.sleep(min(self.interval, remaining))
+
+
+def wait_for_ui_idle(
+    window: Optional["UIAWrapper"] = None, timeout: Optional[float] = None
+) -> WaitResult:
+    """
+    Wait until the UI is idle, or sleep for the timeout if UI_IDLE_WAIT is disabled.
+    :param window: The application window, default is the desktop.
+    :param timeout: The maximum wait time in seconds, default is SLEEP_TIME.
+    :return: The result of the wait.
+    """
+    timeout = configs.get("SLEEP_TIME", 5) if timeout is None else timeout
+
+    if not configs.get("UI_IDLE_WAIT", False):
+        time.sleep(timeout)
+        return WaitResult(False, timeout, 0)
+
+    return UIIdleWaiter(
+        WindowStateProbe(window),
+        timeout,
+        interval=configs.get("UI_IDLE_INTERVAL", 0.2),
+        threshold=configs.get("UI_IDLE_THRESHOLD", 0.005),
+        stable_frames=configs.get("UI_IDLE_STABLE_FRAMES", 2),
+        min_wait=configs.get("UI_IDLE_MIN_WAIT", 0.5),
+    ).wait()